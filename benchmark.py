@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+"""Benchmark how the cost of CACTUS scales with the simulation parameters.
+
+A fixed matrix of cases is run, varying one parameter at a time from a base
+case, and power-law scaling exponents of the solver time are fitted for each
+parameter. Reports are written to `processed/benchmark` so they can be
+compared across CACTUS versions. With `--stub`, a stub solver writing
+realistic output files is used to measure the overhead of the run pipeline.
+"""
+
+from __future__ import division, print_function
+import os
+import sys
+import json
+import time
+import socket
+import platform
+import subprocess
+from collections import OrderedDict
+from multiprocessing import cpu_count
+import numpy as np
+import pandas as pd
+import run
+
+BENCH_DIR = os.path.join(run.RUNS_DIR, "benchmark")
+REPORT_DIR = "processed/benchmark"
+STUB_SOLVER = [sys.executable, os.path.abspath("scripts/stubcactus.py")]
+
+# Base case, from which one parameter at a time is varied
+BASE_CASE = OrderedDict([("tsr", 3.1), ("u_infty", 1.0), ("dynamic_stall", 2),
+                         ("tp", 1.7), ("foildata", "Sheldahl"), ("nti", 24),
+                         ("nbelem", 16), ("nrevs", 4), ("walls", 0),
+                         ("probes", 0), ("threads", 1)])
+
+# Values of each parameter in the case matrix
+CASE_MATRIX = OrderedDict([("nti", [12, 24, 48]),
+                           ("nbelem", [8, 16, 32]),
+                           ("nrevs", [2, 4, 8]),
+                           ("walls", [0, 1]),
+                           ("probes", [0, 1]),
+                           ("threads", [1, 2, 4, 8])])
+
+# Parameters for which scaling exponents are fitted; others are on/off
+SCALING_PARAMS = ["nti", "nbelem", "nrevs", "threads"]
+
+
+def cactus_version():
+    """Return the CACTUS submodule version from `git describe`."""
+    try:
+        out = subprocess.check_output(["git", "describe", "--always",
+                                       "--dirty", "--tags"], cwd="cactus",
+                                      stderr=subprocess.STDOUT)
+        return out.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def case_matrix(factors=CASE_MATRIX, max_threads=None):
+    """Return a list of unique benchmark cases, each a dictionary of
+    parameters, varying each parameter in `factors` from the base case.
+    """
+    if max_threads is None:
+        max_threads = cpu_count()
+    cases = []
+    for param, vals in factors.items():
+        for val in vals:
+            if param == "threads" and val > max_threads:
+                continue
+            case = BASE_CASE.copy()
+            case[param] = val
+            if case not in cases:
+                cases.append(case)
+    return cases
+
+
+def run_case(case, solver=None, repeat=1):
+    """Run a benchmark case `repeat` times, returning the median wall and CPU
+    time of each stage, and the resource use of the solver.
+    """
+    params = dict(case)
+    nthreads = params.pop("threads")
+    case_dir = os.path.join(BENCH_DIR, run.case_dir_name(threads=nthreads,
+                                                         **params))
+    records = []
+    for n in range(repeat):
+        run.run_cactus(case_dir=case_dir, overwrite=True, use_cache=False,
+                       nthreads=nthreads, solver=solver, **params)
+        run.log_perf(fpath=os.path.join(BENCH_DIR, "perf.csv"),
+                     case_dir=case_dir)
+        with open(os.path.join(case_dir, "timing.json")) as f:
+            stages = json.load(f)["stages"]
+        run_info = run.load_run_info(case_dir)
+        d = {"cpu_time": run_info["user_time"] + run_info["sys_time"],
+             "max_rss_mb": run_info["max_rss_mb"],
+             "max_threads": run_info["threads"],
+             "returncode": run_info["returncode"]}
+        for stage, s in stages.items():
+            d[stage + "_time"] = s["wall_time"]
+        d["solver_time"] = d.pop("cactus_time")
+        d["overhead_time"] = sum(v for k, v in d.items()
+                                 if k.endswith("_time") and k not in
+                                 ["solver_time", "cpu_time"])
+        records.append(d)
+    result = pd.DataFrame(records).median()
+    result["repeat"] = repeat
+    revdata = run.read_revdata(case_dir)
+    result["cp"] = revdata["Power Coeff. (-)"].iloc[-1]
+    return result
+
+
+def fit_exponent(x, y):
+    """Fit the exponent `b` of `y = a*x**b` by least squares in log space."""
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    ok = (x > 0) & (y > 0)
+    if ok.sum() < 2 or len(np.unique(x[ok])) < 2:
+        return np.nan
+    return np.polyfit(np.log(x[ok]), np.log(y[ok]), 1)[0]
+
+
+def fit_scaling(df, quantity="solver_time"):
+    """Compute scaling of `quantity` with each parameter of the case matrix.
+
+    Exponents are fitted for `SCALING_PARAMS`, and on/off parameters are
+    reported as the ratio of their cost with the parameter on to off.
+    """
+    scaling = OrderedDict()
+    for param in CASE_MATRIX:
+        others = [p for p in BASE_CASE if p != param]
+        base = (df[others] == pd.Series(BASE_CASE)[others]).all(axis=1)
+        sub = df[base].sort_values(param)
+        if param in SCALING_PARAMS:
+            scaling[param] = fit_exponent(sub[param], sub[quantity])
+        else:
+            on = sub[sub[param] == 1][quantity]
+            off = sub[sub[param] == 0][quantity]
+            ratio = np.nan
+            if len(on) and len(off):
+                ratio = on.iloc[0]/off.iloc[0]
+            scaling[param + "_ratio"] = ratio
+    return scaling
+
+
+def run_benchmark(stub=False, repeat=1, label=None, max_threads=None):
+    """Run the benchmark case matrix and write a report to `REPORT_DIR`.
+
+    Returns
+    -------
+    report : dict
+        Metadata, cases with their timing, and fitted scaling of the solver
+        and pipeline overhead times.
+    """
+    solver = STUB_SOLVER if stub else None
+    version = "stub" if stub else cactus_version()
+    if label is None:
+        label = version
+    cases = case_matrix(max_threads=max_threads)
+    results = []
+    for n, case in enumerate(cases):
+        print("Benchmark case {} of {}: {}".format(n + 1, len(cases),
+              run.case_dir_name(**case)))
+        result = run_case(case, solver=solver, repeat=repeat)
+        results.append(pd.concat([pd.Series(case), result]))
+    df = pd.DataFrame(results)
+    report = OrderedDict()
+    report["label"] = label
+    report["cactus_version"] = version
+    report["host"] = socket.gethostname()
+    report["platform"] = platform.platform()
+    report["cpu_count"] = cpu_count()
+    report["time"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    report["repeat"] = repeat
+    report["base_case"] = BASE_CASE
+    report["scaling"] = {"solver_time": fit_scaling(df, "solver_time"),
+                         "overhead_time": fit_scaling(df, "overhead_time"),
+                         "cpu_time": fit_scaling(df, "cpu_time")}
+    report["cases"] = json.loads(df.to_json(orient="records"))
+    if not os.path.isdir(REPORT_DIR):
+        os.makedirs(REPORT_DIR)
+    fpath = os.path.join(REPORT_DIR, "{}.json".format(label))
+    with open(fpath, "w") as f:
+        json.dump(report, f, indent=4)
+    df.to_csv(fpath.replace(".json", ".csv"), index=False)
+    print("Benchmark report written to {}".format(fpath))
+    print_report(report)
+    return report
+
+
+def load_report(fpath):
+    """Load a benchmark report, given its path or label."""
+    if not os.path.isfile(fpath):
+        fpath = os.path.join(REPORT_DIR, "{}.json".format(fpath))
+    with open(fpath) as f:
+        return json.load(f, object_pairs_hook=OrderedDict)
+
+
+def print_report(report):
+    """Print the scaling and per-case timing of a benchmark report."""
+    print("\nScaling for {} ({} on {}):".format(report["label"],
+          report["cactus_version"], report["host"]))
+    print(pd.DataFrame(report["scaling"]).to_string(
+          float_format="{:.3f}".format))
+    df = pd.DataFrame(report["cases"])
+    cols = list(CASE_MATRIX) + ["solver_time", "overhead_time", "cpu_time",
+                                "max_rss_mb"]
+    print()
+    print(df[cols].to_string(index=False, float_format="{:.3f}".format))
+
+
+def compare_reports(fpath1, fpath2):
+    """Compare two benchmark reports, e.g., from different CACTUS versions,
+    printing the ratio of their solver times and their scaling side by side.
+    """
+    r1, r2 = load_report(fpath1), load_report(fpath2)
+    l1, l2 = r1["label"], r2["label"]
+    if l1 == l2:
+        l1, l2 = l1 + " (1)", l2 + " (2)"
+    print("Comparing {} ({}) with {} ({})".format(l1, r1["cactus_version"],
+          l2, r2["cactus_version"]))
+    if r1["host"] != r2["host"]:
+        print("Warning: reports are from different hosts ({} and {})".format(
+              r1["host"], r2["host"]))
+    cols = list(CASE_MATRIX)
+    df1 = pd.DataFrame(r1["cases"]).set_index(cols)
+    df2 = pd.DataFrame(r2["cases"]).set_index(cols)
+    cases = pd.DataFrame({l1: df1.solver_time, l2: df2.solver_time,
+                          "cp " + l1: df1.cp, "cp " + l2: df2.cp}).dropna()
+    cases["ratio"] = cases[l2]/cases[l1]
+    print("\nSolver time (s):")
+    print(cases.to_string(float_format="{:.4g}".format))
+    scaling = pd.DataFrame({l1: r1["scaling"]["solver_time"],
+                            l2: r2["scaling"]["solver_time"]})
+    print("\nSolver time scaling:")
+    print(scaling.to_string(float_format="{:.3f}".format))
+    return cases, scaling
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark CACTUS cost "
+                                     "scaling for the RM2.")
+    parser.add_argument("--stub", default=False, action="store_true",
+                        help="Use the stub solver to measure pipeline "
+                        "overhead")
+    parser.add_argument("--repeat", "-r", type=int, default=1,
+                        help="Number of runs per case")
+    parser.add_argument("--label", help="Report name (default: CACTUS "
+                        "version)")
+    parser.add_argument("--max-threads", type=int,
+                        help="Largest OpenMP thread count to benchmark")
+    parser.add_argument("--show", metavar="REPORT",
+                        help="Print a report, given its path or label")
+    parser.add_argument("--compare", nargs=2, metavar="REPORT",
+                        help="Compare two reports")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_reports(*args.compare)
+    elif args.show:
+        print_report(load_report(args.show))
+    else:
+        run_benchmark(stub=args.stub, repeat=args.repeat, label=args.label,
+                      max_threads=args.max_threads)
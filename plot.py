@@ -6,8 +6,18 @@ import pandas as pd
 import numpy as np
 from pxl.styleplot import set_sns
 import os
+import re
+import glob
+import json
+import time
+import hashlib
 import argparse
-from itertools import islice
+from scipy.stats import t as student_t
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from scripts.outputdata import load_csv, clean_name
+from scripts.dmst import performance as dmst_performance
+from scripts import foildata as foildata_db
+from scripts import refdata
 
 R = 0.5375
 D = R*2
@@ -15,94 +25,403 @@ nu = 1e-6
 c = (0.04 + 0.06667)/2
 H = 0.807
 
+# Probe output directory
+PROBE_DIR = "output/probe"
+
+# Input hashes and render times of figures rendered in batch
+FIGURE_MANIFEST = "figures/manifest.json"
+
 
 def clean_column_names(df):
     """Rename CSV column names so they are easier to work with."""
-    df.columns = [n.replace("(-)", "").lower().replace(".", "").strip()\
-                  .replace(" ", "_").replace("(", "").replace(")", "") \
-                  for n in df.columns]
+    df.columns = [clean_name(n) for n in df.columns]
     return df
 
 
 def load_timedata():
-    df = pd.read_csv("output/RM2_TimeData.csv")
-    df = clean_column_names(df)
+    df = load_csv("output/RM2_TimeData.csv")
     df["theta_deg"] = np.rad2deg(df.theta_rad)
     return df
 
 
 def load_raw_xfoil_data(Re=1.5e6, alpha_name="alpha_deg"):
     """Load raw XFOIL data as DataFrame."""
-    fdir = "config/foildata/xfoil-raw"
-    fname = "NACA 0021_T1_Re{:.3f}_M0.00_N9.0.dat".format(Re/1e6)
-    fpath = os.path.join(fdir, fname)
-    alpha_deg = []
-    cl = []
-    cd = []
+    df = foildata_db.table("NACA_0021_XFOIL-raw", Re)[["alpha_deg", "cl",
+                                                        "cd"]]
+    return df.rename(columns={"alpha_deg": alpha_name})
+
+
+def read_probe_file(fpath):
+    """Read a probe file, returning its coordinates and an array of time
+    series with columns `t, u, v, w, u_fs, v_fs, w_fs`.
+    """
     with open(fpath) as f:
-        for n, line in enumerate(f.readlines()):
-            if n >= 14:
-                ls = line.split()
-                alpha_deg.append(float(ls[0]))
-                cl.append(float(ls[1]))
-                cd.append(float(ls[2]))
-    df = pd.DataFrame()
-    df[alpha_name] = alpha_deg
-    df["cl"] = cl
-    df["cd"] = cd
-    return df
+        f.readline()
+        coords = np.array(f.readline().split(","), dtype=float)
+    data = pd.read_csv(fpath, skiprows=4, header=None, engine="c",
+                       dtype=np.float64).values
+    return coords, data
 
 
-def load_probe_data(t1_fraction=0.5):
-    """Load velocity probe data to dictionary of NumPy arrays.
+def _probe_signature(probe_dir, fnames):
+    """Return names, sizes, and modification times of probe files."""
+    sig = []
+    for fname in fnames:
+        st = os.stat(os.path.join(probe_dir, fname))
+        sig.append([fname, st.st_size, st.st_mtime_ns])
+    return json.dumps(sig)
 
-    Parameters
-    ----------
-    t1_fraction : float
-        Fraction of simulation time after which statistics are computed.
+
+def probe_cache_paths(probe_dir=PROBE_DIR):
+    """Return the paths of the probe data cache and its index, stored next
+    to `probe_dir`, e.g., `output/probe_data.npy` for `output/probe`.
     """
-    # First, obtain a list of all probe file names
-    probe_dir = "./output/probe"
+    parent = os.path.dirname(os.path.normpath(probe_dir))
+    return (os.path.join(parent, "probe_data.npy"),
+            os.path.join(parent, "probe_index.npz"))
+
+
+def load_probe_array(probe_dir=PROBE_DIR, nprocs=None, use_cache=True):
+    """Load all probe files, parsing them in parallel.
+
+    The stacked data are cached as a `.npy` file next to `probe_dir`, with
+    coordinates and time in a `.npz` index (see `probe_cache_paths`), and
+    reloaded memory-mapped while the probe files are unchanged.
+
+    Returns
+    -------
+    coords : numpy.ndarray
+        Probe coordinates, shape `(nprobes, 3)`.
+    t : numpy.ndarray
+        Time, shape `(nt,)`.
+    data : numpy.ndarray
+        Velocity `u, v, w, u_fs, v_fs, w_fs` of each probe, shape
+        `(nprobes, nt, 6)`.
+    """
+    cache_fpath, index_fpath = probe_cache_paths(probe_dir)
     fnames = sorted(os.listdir(probe_dir))
-    # For all probe files, read coordinates and average velocities
-    x_R = []
-    y_R = []
-    z_R = []
-    mean_u = []
-    mean_v = []
-    mean_w = []
-    for fname in fnames:
-        with open(os.path.join(probe_dir, fname)) as f:
-            for line in islice(f, 1, 2):
-                line = line.split(",")
-                x_R.append(float(line[0]))
-                y_R.append(float(line[1]))
-                z_R.append(float(line[2]))
-            t, u, v, w, _, _, _ = np.loadtxt(f, skiprows=2, delimiter=",",
-                                             unpack=True)
-            i1 = int(len(t)*t1_fraction)
-            mean_u.append(u[i1:].mean())
-            mean_w.append(v[i1:].mean()) # Swap v and w since y-up coord sys
-            mean_v.append(-w[i1:].mean())
-    x_R = np.array(x_R)
-    y_R_org = np.array(y_R)
-    z_R_org = np.array(z_R)
+    sig = _probe_signature(probe_dir, fnames)
+    if (use_cache and os.path.isfile(cache_fpath)
+            and os.path.isfile(index_fpath)):
+        with np.load(index_fpath) as index:
+            if str(index["signature"]) == sig:
+                return (index["coords"], index["t"],
+                        np.load(cache_fpath, mmap_mode="r"))
+    fpaths = [os.path.join(probe_dir, fname) for fname in fnames]
+    with ProcessPoolExecutor(max_workers=nprocs) as executor:
+        results = list(executor.map(read_probe_file, fpaths,
+                                    chunksize=max(1, len(fpaths)//64)))
+    coords = np.array([r[0] for r in results])
+    # Probes may have different lengths if CACTUS is still running
+    nt = min(len(r[1]) for r in results)
+    t = results[0][1][:nt, 0]
+    tmp = cache_fpath + ".tmp{}.npy".format(os.getpid())
+    data = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float64,
+                                     shape=(len(results), nt, 6))
+    for n, (_, d) in enumerate(results):
+        data[n] = d[:nt, 1:]
+    data.flush()
+    del data
+    os.replace(tmp, cache_fpath)
+    np.savez(index_fpath, coords=coords, t=t, signature=sig)
+    return coords, t, np.load(cache_fpath, mmap_mode="r")
+
+
+def _reshape_probe_fields(coords, fields):
+    """Convert probe coordinates to `y_R` and `z_H` and reshape them and the
+    arrays in `fields` so y_R indicates columns and z_R rows.
+    """
+    x_R, y_R_org, z_R_org = np.asarray(coords).T
     # Swap y and z since this is a y-up coord sys
     z_R = y_R_org.copy()
     y_R = -z_R_org.copy()
     z_H = z_R*R/H
     nz = len(np.unique(z_H))
     ny = len(np.unique(y_R))
-    mean_u, mean_v, mean_w = (np.array(mean_u), np.array(mean_v),
-                              np.array(mean_w))
-    # Reshape arrays so y_R indicates columns and z_R rows
-    y_R = y_R.reshape(nz, ny)
-    z_H = z_H.reshape(nz, ny)
-    mean_u = mean_u.reshape(nz, ny)
-    mean_v = mean_v.reshape(nz, ny)
-    mean_w = mean_w.reshape(nz, ny)
-    return {"y_R": y_R, "z_H": z_H, "mean_u": mean_u, "mean_v": mean_v,
-            "mean_w": mean_w}
+    data = {"y_R": y_R.reshape(nz, ny), "z_H": z_H.reshape(nz, ny)}
+    for name, val in fields.items():
+        data[name] = np.asarray(val).reshape(nz, ny)
+    return data
+
+
+def load_probe_data(t1_fraction=0.5, nprocs=None, use_cache=True,
+                    probe_dir=PROBE_DIR):
+    """Load velocity probe data to dictionary of NumPy arrays.
+
+    Parameters
+    ----------
+    t1_fraction : float
+        Fraction of simulation time after which statistics are computed.
+    nprocs : int
+        Number of processes used to read probe files.
+    use_cache : bool
+        Whether to use cached probe data if present and up to date.
+    probe_dir : str
+        Probe output directory of the run.
+    """
+    coords, t, data = load_probe_array(probe_dir, nprocs=nprocs,
+                                       use_cache=use_cache)
+    i1 = int(len(t)*t1_fraction)
+    mean = data[:, i1:, :3].mean(axis=1)
+    # Swap v and w since y-up coord sys
+    return _reshape_probe_fields(coords, {"mean_u": mean[:, 0],
+                                          "mean_v": -mean[:, 2],
+                                          "mean_w": mean[:, 1]})
+
+
+def _count_lines(fpath, blocksize=2**20):
+    """Count lines of a file reading it in fixed-size blocks."""
+    n = 0
+    last = b"\n"
+    with open(fpath, "rb") as f:
+        for block in iter(lambda: f.read(blocksize), b""):
+            n += block.count(b"\n")
+            last = block[-1:]
+    return n + (last != b"\n")
+
+
+def probe_file_stats(fpath, t1_fraction=0.5, chunksize=50000):
+    """Compute velocity statistics of a probe file in a single pass over
+    chunks of `chunksize` time steps, so memory use does not depend on the
+    length of the time series.
+
+    Chunk means and covariances are combined with the pairwise update of
+    Chan et al. (1979), which is numerically stable.
+
+    Returns
+    -------
+    coords : numpy.ndarray
+        Probe coordinates.
+    n : int
+        Number of samples after the `t1_fraction` cutoff.
+    mean : numpy.ndarray
+        Mean of `u, v, w`.
+    cov : numpy.ndarray
+        3x3 covariance matrix of `u, v, w`.
+    """
+    with open(fpath) as f:
+        f.readline()
+        coords = np.array(f.readline().split(","), dtype=float)
+    nt = _count_lines(fpath) - 4
+    i1 = int(nt*t1_fraction)
+    n = 0
+    mean = np.zeros(3)
+    m2 = np.zeros((3, 3))
+    reader = pd.read_csv(fpath, skiprows=4 + i1, header=None,
+                         usecols=[1, 2, 3], engine="c", dtype=np.float64,
+                         chunksize=chunksize)
+    for chunk in reader:
+        x = chunk.values
+        nb = len(x)
+        mean_b = x.mean(axis=0)
+        dx = x - mean_b
+        delta = mean_b - mean
+        ntot = n + nb
+        mean += delta*nb/ntot
+        m2 += dx.T.dot(dx) + np.outer(delta, delta)*n*nb/ntot
+        n = ntot
+    return coords, n, mean, m2/max(n, 1)
+
+
+def load_probe_stats(t1_fraction=0.5, nprocs=None, chunksize=50000,
+                     probe_dir=PROBE_DIR):
+    """Compute velocity probe statistics without loading full time series.
+
+    Returns the same dictionary of `(nz, ny)` arrays as `load_probe_data`,
+    plus Reynolds stresses `upup`, `vpvp`, `wpwp`, `upvp`, `upwp`, `vpwp`,
+    turbulence kinetic energy `k`, and number of samples `n`, all normalized
+    by the free stream velocity.
+
+    Parameters
+    ----------
+    t1_fraction : float
+        Fraction of simulation time after which statistics are computed.
+    nprocs : int
+        Number of processes used to read probe files.
+    chunksize : int
+        Number of time steps read at once from each probe file.
+    probe_dir : str
+        Probe output directory of the run.
+    """
+    fpaths = [os.path.join(probe_dir, fname)
+              for fname in sorted(os.listdir(probe_dir))]
+    with ProcessPoolExecutor(max_workers=nprocs) as executor:
+        results = list(executor.map(probe_file_stats, fpaths,
+                                    [t1_fraction]*len(fpaths),
+                                    [chunksize]*len(fpaths)))
+    coords = np.array([r[0] for r in results])
+    n = np.array([r[1] for r in results])
+    mean = np.array([r[2] for r in results])
+    cov = np.array([r[3] for r in results])
+    # Swap v and w since y-up coord sys, i.e., v = -w_cactus, w = v_cactus
+    fields = {"mean_u": mean[:, 0], "mean_v": -mean[:, 2],
+              "mean_w": mean[:, 1], "upup": cov[:, 0, 0],
+              "vpvp": cov[:, 2, 2], "wpwp": cov[:, 1, 1],
+              "upvp": -cov[:, 0, 2], "upwp": cov[:, 0, 1],
+              "vpwp": -cov[:, 1, 2], "n": n}
+    fields["k"] = 0.5*(fields["upup"] + fields["vpvp"] + fields["wpwp"])
+    return _reshape_probe_fields(coords, fields)
+
+
+def detect_nti(theta_rad):
+    """Detect the number of time steps per revolution from azimuthal angle."""
+    return int(np.round(2*np.pi/np.median(np.diff(theta_rad))))
+
+
+def phase_average(theta_rad, values, nbins, groups=None, ngroups=None,
+                  confidence=0.95):
+    """Phase average `values` in `nbins` azimuthal bins centered on multiples
+    of `360/nbins` degrees, separately for each integer group in `groups`.
+
+    Parameters
+    ----------
+    theta_rad : numpy.ndarray
+        Azimuthal angle (any number of revolutions) of each sample.
+    values : numpy.ndarray
+        Samples, shape `(n,)` or `(n, nquantities)`.
+    groups : numpy.ndarray
+        Group index of each sample, e.g., blade or run.
+    confidence : float
+        Confidence level of the bands about the mean.
+
+    Returns
+    -------
+    stats : dict
+        Bin centers `theta_deg`, and `mean`, `std`, number of samples `n`,
+        and confidence interval half-width `ci`, each of shape
+        `(ngroups, nbins)` (with a trailing quantity axis for 2-D `values`),
+        or `(nbins,)` without groups.
+    """
+    values = np.asarray(values, dtype=float)
+    width = 2*np.pi/nbins
+    bins = np.round(np.mod(theta_rad, 2*np.pi)/width).astype(int) % nbins
+    if groups is None:
+        index = bins
+        ngroups = 1
+    else:
+        if ngroups is None:
+            ngroups = int(np.max(groups)) + 1
+        index = np.asarray(groups, dtype=int)*nbins + bins
+    size = ngroups*nbins
+    n = np.bincount(index, minlength=size).astype(float)
+    vals = values.reshape(len(values), -1)
+    s1 = np.column_stack([np.bincount(index, weights=v, minlength=size)
+                          for v in vals.T])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = s1/n[:, None]
+        # Sum squared deviations from the bin means in a second pass, which
+        # avoids cancellation for signals with a large mean
+        dev = vals - mean[index]
+        s2 = np.column_stack([np.bincount(index, weights=d**2,
+                                          minlength=size) for d in dev.T])
+        std = np.sqrt(s2/(n[:, None] - 1))
+        tval = student_t.ppf(0.5 + confidence/2, n - 1)
+        ci = tval[:, None]*std/np.sqrt(n[:, None])
+    shape = (ngroups, nbins) + (vals.shape[1:] if values.ndim > 1 else ())
+    if groups is None:
+        shape = shape[1:]
+    return {"theta_deg": np.rad2deg(np.arange(nbins)*width),
+            "mean": mean.reshape(shape), "std": std.reshape(shape),
+            "n": n.reshape(shape[:len(shape) - (values.ndim > 1)]),
+            "ci": ci.reshape(shape)}
+
+
+def phase_average_timedata(df=None, quantities=["power_coeff", "torque_coeff"],
+                           nbins=None, t1_fraction=0.5, confidence=0.95):
+    """Phase average rotor and per-blade quantities from time data.
+
+    Per-blade quantities are given without their blade prefix, e.g.,
+    `"fx_coeff"` for the `blade1_fx_coeff`, `blade2_fx_coeff`, ... columns,
+    and are averaged against each blade's own azimuthal angle, assuming
+    evenly spaced blades.
+
+    Returns
+    -------
+    stats : dict
+        Phase average statistics (see `phase_average`) for each quantity,
+        with a leading blade axis for per-blade quantities.
+    """
+    if df is None:
+        df = load_timedata()
+    df = df.iloc[int(len(df)*t1_fraction):]
+    theta = df.theta_rad.values
+    if nbins is None:
+        nbins = detect_nti(theta)
+    stats = {}
+    for q in quantities:
+        if q in df:
+            stats[q] = phase_average(theta, df[q].values, nbins,
+                                     confidence=confidence)
+            continue
+        cols = sorted((int(m.group(1)), c) for c in df.columns
+                      for m in [re.match(r"blade(\d+)_" + q + "$", c)] if m)
+        if not cols:
+            raise KeyError("{} not found in time data".format(q))
+        nblades = len(cols)
+        values = df[[c for _, c in cols]].values
+        phase = 2*np.pi*np.arange(nblades)/nblades
+        stats[q] = phase_average((theta[:, None] + phase).ravel(),
+                                 values.ravel(), nbins,
+                                 groups=np.tile(np.arange(nblades),
+                                                len(theta)),
+                                 ngroups=nblades, confidence=confidence)
+    return stats
+
+
+def phase_average_elements(data, quantities=["cl", "aoa25_deg"], nbins=None,
+                           t1_fraction=0.5, confidence=0.95):
+    """Phase average element quantities from blade element data, e.g., as
+    loaded with `scripts.outputdata.load_output("element")`, per blade and
+    element.
+
+    Returns
+    -------
+    stats : dict
+        Phase average statistics (see `phase_average`) for each quantity,
+        with arrays of shape `(nblades, nelem, nbins)`.
+    """
+    i1 = data["offsets"][int((len(data["offsets"]) - 1)*t1_fraction)]
+    theta = np.asarray(data["theta_rad"][i1:], dtype=float)
+    blade = np.asarray(data["blade"][i1:]).astype(int) - 1
+    elem = np.asarray(data["element"][i1:]).astype(int) - 1
+    nblades, nelem = blade.max() + 1, elem.max() + 1
+    if nbins is None:
+        nbins = detect_nti(np.unique(theta))
+    values = np.column_stack([data[q][i1:] for q in quantities])
+    res = phase_average(theta, values, nbins, groups=blade*nelem + elem,
+                        ngroups=nblades*nelem, confidence=confidence)
+    stats = {}
+    for j, q in enumerate(quantities):
+        stats[q] = {"theta_deg": res["theta_deg"],
+                    "n": res["n"].reshape(nblades, nelem, nbins)}
+        for k in ["mean", "std", "ci"]:
+            stats[q][k] = res[k][..., j].reshape(nblades, nelem, nbins)
+    return stats
+
+
+def phase_average_runs(case_dirs, quantity="power_coeff", nbins=None,
+                       t1_fraction=0.5, confidence=0.95):
+    """Phase average a rotor quantity for multiple runs at once, which must
+    have the same number of time steps per revolution.
+
+    Returns
+    -------
+    stats : dict
+        Phase average statistics (see `phase_average`) with arrays of shape
+        `(len(case_dirs), nbins)`.
+    """
+    thetas, values, groups = [], [], []
+    for n, case_dir in enumerate(case_dirs):
+        df = load_csv(os.path.join(case_dir, "output", "RM2_TimeData.csv"))
+        df = df.iloc[int(len(df)*t1_fraction):]
+        thetas.append(df.theta_rad.values)
+        values.append(df[quantity].values)
+        groups.append(np.full(len(df), n))
+    if nbins is None:
+        nbins = detect_nti(thetas[0])
+    return phase_average(np.concatenate(thetas), np.concatenate(values),
+                         nbins, groups=np.concatenate(groups),
+                         ngroups=len(case_dirs), confidence=confidence)
 
 
 def plot_perf(print_perf=True, save=False):
@@ -123,18 +442,56 @@ def plot_perf(print_perf=True, save=False):
         fig.savefig("figures/perf.png", dpi=300)
 
 
-def plot_perf_curves(exp=False, single_ds=False, alm=True, save=False):
+def plot_phase_average(case_dirs=["."], quantity="power_coeff", save=False):
+    """Plot phase-averaged rotor quantity versus azimuthal angle with 95%
+    confidence bands, for one or more runs.
+    """
+    stats = phase_average_runs(case_dirs, quantity=quantity)
+    labels = {"power_coeff": r"$C_P$", "torque_coeff": r"$C_T$",
+              "fx_coeff": r"$C_D$"}
+    fig, ax = plt.subplots()
+    theta = np.append(stats["theta_deg"], 360)
+    for case_dir, mean, ci in zip(case_dirs, stats["mean"], stats["ci"]):
+        # Repeat first bin at 360 degrees to close the cycle
+        mean, ci = np.append(mean, mean[0]), np.append(ci, ci[0])
+        label = os.path.basename(os.path.normpath(os.path.abspath(case_dir)))
+        lines = ax.plot(theta, mean, label=label)
+        ax.fill_between(theta, mean - ci, mean + ci, alpha=0.3, lw=0,
+                        color=lines[0].get_color())
+    ax.set_xlabel(r"$\theta$ (degrees)")
+    ax.set_ylabel(labels.get(quantity, quantity))
+    ax.set_xlim(0, 360)
+    if len(case_dirs) > 1:
+        ax.legend(loc="best")
+    fig.tight_layout()
+    if save:
+        fig.savefig("figures/phase-average.pdf")
+        fig.savefig("figures/phase-average.png", dpi=300)
+
+
+def plot_perf_curves(exp=False, single_ds=False, alm=True, dmst=False,
+                     save=False):
     """Plot performance curves.
 
     Parameters
     ----------
     single_ds : bool
         Whether or not to plot results from multiple dynamic stall models.
+    dmst : bool
+        Whether or not to plot the DMST model curves for the free stream
+        velocity and foil data of the sweep.
     """
     fig, ax = plt.subplots(figsize=(7.5, 3), nrows=1, ncols=2)
     df = pd.read_csv("processed/tsr_sweep.csv")
     ax[0].plot(df.tsr, df.cp, marker="o", label="CACTUS LB")
     ax[1].plot(df.tsr, df.cd, marker="o", label="CACTUS LB")
+    if dmst:
+        u_infty = df.u_infty.iloc[0] if "u_infty" in df else 1.0
+        foildata = df.foildata.iloc[0] if "foildata" in df else "Sheldahl"
+        df_dmst = dmst_performance(np.linspace(df.tsr.min(), df.tsr.max(),
+                                               100), u_infty, foildata)
+        ax[0].plot(df_dmst.tsr, df_dmst.cp, color="gray", label="DMST")
+        ax[1].plot(df_dmst.tsr, df_dmst.cd, color="gray", label="DMST")
     ax[0].set_ylabel("$C_P$")
     ax[1].set_ylabel("$C_D$")
     [a.set_xlabel(r"$\lambda$") for a in ax]
@@ -148,24 +505,16 @@ def plot_perf_curves(exp=False, single_ds=False, alm=True, save=False):
             ax[0].plot(df.tsr, df.cp, marker="d", label="CACTUS no DS")
             ax[1].plot(df.tsr, df.cd, marker="d", label="CACTUS no DS")
     if alm:
-        df_alm = pd.read_csv("https://raw.githubusercontent.com/"
-                             "petebachant/RM2-turbinesFoam/master/processed/"
-                             "tsr_sweep.csv")
+        df_alm = refdata.load("alm-perf")
         ax[0].plot(df_alm.tsr, df_alm.cp, marker="v", label="ALM")
         ax[1].plot(df_alm.tsr, df_alm.cd, marker="v", label="ALM")
     if exp:
-        df_exp = pd.read_csv("https://raw.githubusercontent.com/UNH-CORE/"
-                             "RM2-tow-tank/master/Data/Processed/Perf-1.0.csv")
-        df_exp2 = pd.read_csv("https://raw.githubusercontent.com/UNH-CORE/"
-                              "RM2-tow-tank/master/Data/Processed/"
-                              "Perf-1.0-b.csv")
-        df_exp = df_exp.append(df_exp2, ignore_index=True)
-        df_exp = df_exp.groupby("tsr_nom").mean()
+        df_exp = refdata.load_exp_perf()
         ax[0].plot(df_exp.mean_tsr, df_exp.mean_cp, marker="^",
                    markerfacecolor="none", color="black", label="Exp.")
         ax[1].plot(df_exp.mean_tsr, df_exp.mean_cd, marker="^",
                    markerfacecolor="none", color="black", label="Exp.")
-    if exp or not single_ds or alm:
+    if exp or not single_ds or alm or dmst:
         ax[1].legend(loc="upper left")
     fig.tight_layout()
     if save:
@@ -206,13 +555,7 @@ def plot_perf_curves_foildata(exp=False, ds="bv", xfoil=False, save=False):
         ax[0].plot(df.tsr, df.cp, marker="x", label="XFOIL")
         ax[1].plot(df.tsr, df.cd, marker="x", label="XFOIL")
     if exp:
-        df_exp = pd.read_csv("https://raw.githubusercontent.com/UNH-CORE/"
-                             "RM2-tow-tank/master/Data/Processed/Perf-1.0.csv")
-        df_exp2 = pd.read_csv("https://raw.githubusercontent.com/UNH-CORE/"
-                              "RM2-tow-tank/master/Data/Processed/"
-                              "Perf-1.0-b.csv")
-        df_exp = df_exp.append(df_exp2, ignore_index=True)
-        df_exp = df_exp.groupby("tsr_nom").mean()
+        df_exp = refdata.load_exp_perf()
         ax[0].plot(df_exp.mean_tsr, df_exp.mean_cp, marker="^",
                    markerfacecolor="none", color="black", label="Exp.")
         ax[1].plot(df_exp.mean_tsr, df_exp.mean_cd, marker="^",
@@ -236,14 +579,7 @@ def plot_perf_re_dep(exp=False, save=False):
         ax.set_xlabel("$Re_{c,\mathrm{ave}}$")
         ax.set_ylabel("$C_P$")
         if exp:
-            df_exp = pd.read_csv("https://raw.githubusercontent.com/UNH-CORE/"
-                                 "RM2-tow-tank/master/Data/Processed/"
-                                 "Perf-tsr_0.csv")
-            df_exp2 = pd.read_csv("https://raw.githubusercontent.com/UNH-CORE/"
-                                  "RM2-tow-tank/master/Data/Processed/"
-                                  "Perf-tsr_0-b.csv")
-            df_exp = df_exp.append(df_exp2, ignore_index=True)
-            df_exp = df_exp.groupby("tow_speed_nom").mean()
+            df_exp = refdata.load_exp_re_dep()
             df_exp["Re_c"] = df_exp.mean_tow_speed*df_exp.mean_tsr*c/nu
             ax.plot(df_exp.Re_c, df_exp.mean_cp, color="black", marker="^",
                     markerfacecolor="none", label="Exp.")
@@ -339,24 +675,15 @@ def plot_meancontquiv(t1_fraction=0.5, cb_orientation="vertical", save=False):
 def plot_foildata(save=False):
     """Plot static foil data for comparison."""
     fig, ax = plt.subplots(figsize=(7.5, 3.25), nrows=1, ncols=2)
-    data = {"Gregorek": pd.read_csv("config/foildata/NACA_0021_Gregorek.csv"),
-            "Sheldahl": pd.read_csv("config/foildata/"
-                                    "NACA_0021_Sheldahl_1.5e6.csv"),
-            "Jacobs": pd.read_csv("config/foildata/"
-                                  "NACA_0021_Jacobs_1.5e6.csv"),
-            "XFOIL": load_raw_xfoil_data(Re=1.5e6)}
-    for d, m in zip(["Gregorek", "Sheldahl", "Jacobs", "XFOIL"],
+    for d, m in zip(["Gregorek", "Sheldahl", "Jacobs", "XFOIL-raw"],
                     ["o", "^", "s", "x"]):
-        df = data[d]
-        if d == "Sheldahl" or d == "Jacobs" or d == "XFOIL":
+        df = foildata_db.table("NACA_0021_" + d, 1.5e6)
+        if d != "Gregorek":
             df = df[df.alpha_deg >= -2]
             df = df[df.alpha_deg <= 45]
-            df["alpha"] = df.alpha_deg
-        elif d == "Gregorek":
-            df["cd"] = df.cd_wake
-        df = df.sort_values(by="alpha")
-        ax[0].plot(df.alpha, df.cl, marker=m, label=d)
-        ax[1].plot(df.alpha, df.cd, marker=m, label=d)
+        label = d.replace("-raw", "")
+        ax[0].plot(df.alpha_deg, df.cl, marker=m, label=label)
+        ax[1].plot(df.alpha_deg, df.cd, marker=m, label=label)
     [a.set_xlabel(r"$\alpha$ (degrees)") for a in ax]
     ax[0].set_ylabel("$C_l$")
     ax[1].set_ylabel("$C_d$")
@@ -370,15 +697,9 @@ def plot_foildata(save=False):
 def plot_foildata_lowre(xfoil=True, cfd=False, save=False):
     """Plot 0021 lift coefficient for low Reynolds number."""
     fig, ax = plt.subplots()
-    data = {"Sheldahl": pd.read_csv("config/foildata/"
-                                    "NACA_0021_Sheldahl_1.6e5.csv"),
-            "Jacobs": pd.read_csv("config/foildata/"
-                                  "NACA_0021_Jacobs_1.6e5.csv")}
     for d, m in zip(["Sheldahl", "Jacobs"], ["o", "^"]):
-        df = data[d]
-        if "alpha_deg" in df:
-            df["alpha"] = df["alpha_deg"]
-        df = df.sort_values(by="alpha")
+        df = foildata_db.table("NACA_0021_" + d, 1.6e5)
+        df = df.rename(columns={"alpha_deg": "alpha"})
         df = df[df.alpha >= -0.1]
         df = df[df.alpha <= 30]
         ax.plot(df.alpha, df.cl, marker=m, label=d)
@@ -389,9 +710,7 @@ def plot_foildata_lowre(xfoil=True, cfd=False, save=False):
         df = df[df.alpha <= 30]
         ax.plot(df.alpha, df.cl, label="XFOIL", marker="x")
     if cfd:
-        df_cfd = pd.read_csv("https://raw.githubusercontent.com/petebachant/"
-                             "NACAFoil-OpenFOAM/master/processed/"
-                             "NACA0021_2.0e%2B05.csv")
+        df_cfd = refdata.load("cfd-foildata")
         ax.plot(df_cfd.alpha_deg, df_cfd.cl, marker="s",
                 label="2-D SST RANS")
     ax.set_ylabel("$C_l$")
@@ -419,6 +738,139 @@ def plot_tp_dep(save=False):
         print(fpath, "not found")
 
 
+def batch_figures(single_ds=False, alm=True, dmst=False, xfoil=False,
+                  ds="bv", cfd=False):
+    """Return the figures made by `--all` as a dictionary of the function
+    making each figure, its keyword arguments, matplotlib rc parameters, and
+    glob patterns of its input files, keyed by figure file name.
+    """
+    exp_perf = [refdata.fpath("exp-perf"), refdata.fpath("exp-perf-b")]
+    exp_re_dep = [refdata.fpath("exp-re-dep"), refdata.fpath("exp-re-dep-b")]
+    foildata_files = [os.path.join(foildata_db.FOILDATA_DIR, "**", "*")]
+    mathtext = {"axes.formatter.use_mathtext": True}
+    return {"perf-curves": (plot_perf_curves,
+                            dict(exp=True, single_ds=single_ds, alm=alm,
+                                 dmst=dmst), {},
+                            ["processed/tsr_sweep.csv",
+                             "processed/tsr_sweep_bv.csv",
+                             "processed/tsr_sweep_no_ds.csv",
+                             refdata.fpath("alm-perf")] + exp_perf
+                            + (foildata_files if dmst else [])),
+            "perf-curves-jacobs": (plot_perf_curves_foildata,
+                                   dict(exp=True, xfoil=xfoil, ds=ds), {},
+                                   ["processed/tsr_sweep*.csv"] + exp_perf),
+            "perf-re-dep": (plot_perf_re_dep, dict(exp=True), mathtext,
+                            ["processed/u_infty_sweep.csv"] + exp_re_dep),
+            "verification": (plot_verification, {}, {},
+                             ["processed/nti_sweep.csv",
+                              "processed/nbelem_sweep.csv"]),
+            "foil-data": (plot_foildata, {}, {}, foildata_files),
+            "foil-data-low-Re": (plot_foildata_lowre,
+                                 dict(xfoil=xfoil, cfd=cfd), {},
+                                 foildata_files
+                                 + [refdata.fpath("cfd-foildata")]),
+            "tp-dep": (plot_tp_dep, {}, {}, ["processed/tp_sweep.csv"])}
+
+
+def _input_hash(inputs, kwargs):
+    """Hash a figure's keyword arguments and the contents of its input files,
+    this script, and the `scripts` modules it may use.
+    """
+    fpaths = sorted(set(f for pattern in inputs
+                        for f in glob.glob(pattern, recursive=True)
+                        if os.path.isfile(f)))
+    here = os.path.dirname(os.path.abspath(__file__))
+    code = [os.path.abspath(__file__)] + sorted(
+        glob.glob(os.path.join(here, "scripts", "*.py")))
+    h = hashlib.sha1(json.dumps(kwargs, sort_keys=True).encode())
+    for fpath in code + fpaths:
+        h.update(os.path.relpath(fpath, here).encode())
+        with open(fpath, "rb") as f:
+            h.update(hashlib.sha1(f.read()).digest())
+    return h.hexdigest()
+
+
+def _init_render():
+    plt.switch_backend("Agg")
+    set_sns()
+    plt.rcParams["axes.grid"] = True
+
+
+def _render(func, kwargs, rc):
+    """Make and save a figure, returning the time it took."""
+    t0 = time.time()
+    try:
+        with plt.rc_context(rc=rc):
+            func(save=True, **kwargs)
+    finally:
+        plt.close("all")
+    return time.time() - t0
+
+
+def render_all(jobs=None, force=False, **kwargs):
+    """Render and save all figures in parallel with a non-interactive
+    backend, skipping those whose files exist and whose inputs have not
+    changed since they were last rendered, as recorded in
+    `FIGURE_MANIFEST`.
+
+    Parameters
+    ----------
+    jobs : int
+        Number of processes; all CPUs by default.
+    force : bool
+        Whether to render all figures.
+    **kwargs
+        Options passed to `batch_figures`.
+    """
+    t0 = time.time()
+    figures = batch_figures(**kwargs)
+    manifest = {}
+    if os.path.isfile(FIGURE_MANIFEST):
+        with open(FIGURE_MANIFEST) as f:
+            manifest = json.load(f)
+    hashes = {}
+    for name, (func, fkwargs, rc, inputs) in sorted(figures.items()):
+        hashes[name] = _input_hash(inputs, fkwargs)
+        exists = all(os.path.isfile("figures/{}.{}".format(name, ext))
+                     for ext in ["pdf", "png"])
+        if (not force and exists
+                and manifest.get(name, {}).get("inputs") == hashes[name]):
+            print("{}: up to date".format(name))
+            del hashes[name]
+    # Start the slowest figures first
+    todo = sorted(hashes, key=lambda n: -manifest.get(n, {}).get(
+                  "render_time", np.inf))
+    failed = []
+    if todo:
+        nprocs = min(jobs or os.cpu_count(), len(todo))
+        with ProcessPoolExecutor(max_workers=nprocs,
+                                 initializer=_init_render) as executor:
+            futures = {executor.submit(_render, *figures[name][:3]): name
+                       for name in todo}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    dt = future.result()
+                except Exception as e:
+                    print("{}: failed ({}: {})".format(name,
+                                                       type(e).__name__, e))
+                    manifest.pop(name, None)
+                    failed.append(name)
+                    continue
+                manifest[name] = {"inputs": hashes[name],
+                                  "render_time": round(dt, 3)}
+                exists = os.path.isfile("figures/{}.png".format(name))
+                print("{}: {} in {:.2f} s".format(
+                      name, "rendered" if exists else "no data", dt))
+    tmp = "{}.tmp{}".format(FIGURE_MANIFEST, os.getpid())
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=4, sort_keys=True)
+    os.replace(tmp, FIGURE_MANIFEST)
+    print("Rendered {} of {} figures in {:.1f} s{}".format(
+          len(todo) - len(failed), len(figures), time.time() - t0,
+          "; failed: " + ", ".join(failed) if failed else ""))
+
+
 if __name__ == "__main__":
     set_sns()
     plt.rcParams["axes.grid"] = True
@@ -428,14 +880,22 @@ if __name__ == "__main__":
                         choices=["perf", "perf-curves", "perf-curves-exp",
                                  "verification", "foil-data", "re-dep",
                                  "re-dep-exp", "tp-dep",
-                                 "perf-curves-foil-data"])
+                                 "perf-curves-foil-data", "phase-average"])
     parser.add_argument("--single-ds", "-d", default=False, action="store_true",
                         help="Plot perf curves for LB dynamic stall model "
                         "only")
     parser.add_argument("--no-alm", default=False, action="store_true",
                         help="Do not plot ALM results")
+    parser.add_argument("--dmst", default=False, action="store_true",
+                        help="Plot DMST model performance curves")
     parser.add_argument("--all", "-A", help="Generate all figures",
                         default=False, action="store_true")
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                        help="Number of processes for rendering all figures "
+                        "with --save and --no-show (default: all CPUs)")
+    parser.add_argument("--force", "-f", default=False, action="store_true",
+                        help="Render all figures even if their inputs have "
+                        "not changed")
     parser.add_argument("--save", "-s", help="Save to `figures` directory",
                         default=False, action="store_true")
     parser.add_argument("--no-show", default=False, action="store_true",
@@ -448,36 +908,52 @@ if __name__ == "__main__":
                         help="Plot XFOIL results")
     parser.add_argument("--dynamic-stall", choices=["lb", "bv"],
                         help="Dynamic stall model", default="bv")
+    parser.add_argument("--case-dirs", nargs="+", default=["."],
+                        help="Run directories for phase-averaged plots")
+    parser.add_argument("--quantity", default="power_coeff",
+                        help="Time data quantity for phase-averaged plots")
     args = parser.parse_args()
 
     if args.save:
         if not os.path.isdir("figures"):
             os.mkdir("figures")
 
+    # Without showing, all figures are rendered in parallel
+    batch = args.all and args.save and args.no_show
+    if batch:
+        render_all(jobs=args.jobs, force=args.force,
+                   single_ds=args.single_ds, alm=not args.no_alm,
+                   dmst=args.dmst, xfoil=args.xfoil, ds=args.dynamic_stall,
+                   cfd=args.cfd)
+    plot_all = args.all and not batch
+
     if "perf" in args.plot and not args.all:
         plot_perf(save=args.save)
     if "perf-curves" in args.plot:
         plot_perf_curves(exp=False, single_ds=args.single_ds,
-                         alm=not args.no_alm, save=args.save)
-    if "perf-curves-exp" in args.plot or args.all:
+                         alm=not args.no_alm, dmst=args.dmst, save=args.save)
+    if "perf-curves-exp" in args.plot or plot_all:
         plot_perf_curves(exp=True, single_ds=args.single_ds,
-                         alm=not args.no_alm, save=args.save)
-    if "perf-curves-foil-data" in args.plot or args.all:
+                         alm=not args.no_alm, dmst=args.dmst, save=args.save)
+    if "perf-curves-foil-data" in args.plot or plot_all:
         plot_perf_curves_foildata(exp=True, xfoil=args.xfoil,
                                   ds=args.dynamic_stall, save=args.save)
-    if "re-dep" in args.plot or args.all:
+    if "re-dep" in args.plot or plot_all:
         with plt.rc_context(rc={"axes.formatter.use_mathtext": True}):
             plot_perf_re_dep(save=args.save)
-    if "re-dep-exp" in args.plot or args.all:
+    if "re-dep-exp" in args.plot or plot_all:
         with plt.rc_context(rc={"axes.formatter.use_mathtext": True}):
             plot_perf_re_dep(exp=True, save=args.save)
-    if "verification" in args.plot or args.all:
+    if "verification" in args.plot or plot_all:
         plot_verification(save=args.save)
-    if "foil-data" in args.plot or args.all:
+    if "foil-data" in args.plot or plot_all:
         plot_foildata(save=args.save)
         plot_foildata_lowre(xfoil=args.xfoil, cfd=args.cfd, save=args.save)
-    if "tp-dep" in args.plot or args.all:
+    if "tp-dep" in args.plot or plot_all:
         plot_tp_dep(save=args.save)
+    if "phase-average" in args.plot:
+        plot_phase_average(case_dirs=args.case_dirs, quantity=args.quantity,
+                           save=args.save)
 
     if not args.no_show:
         plt.show()
@@ -1,137 +1,1423 @@
 #!/usr/bin/env python
 
 from __future__ import division, print_function
-from subprocess import call, check_output
+from subprocess import Popen
 import os
 import sys
+import glob
+import shutil
+import hashlib
+import time
+import re
+import io
+import json
+import sqlite3
+import socket
+import resource
+from contextlib import contextmanager
+from collections import OrderedDict
 import numpy as np
 import pandas as pd
 from multiprocessing import cpu_count
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from scripts.makegeom import write_geom, cached_octave_geom, geom_method
+from scripts.makewalls import make_walls, wall_inputs, QUADS, DS as WALL_DS
+from scripts.outputdata import load_csv, clean_name
+from scripts import dmst
+from scripts.makefoildata import build as build_foildata, SPECS as FOIL_SPECS
 
 
 R = 0.5375
 
+# CACTUS executable
+CACTUS_BIN = "cactus/bin/cactus"
 
-def create_input_file(u_infty=1.0, tsr=3.1, dynamic_stall=2, **kwargs):
-    """Create CACTUS input file `config/RM2.in`."""
+# Directory in which each sweep case gets its own run directory
+RUNS_DIR = "runs"
+
+# Wall spacing parameters for each face of the tank
+WALL_DS_PARAMS = ["wall_ds_" + face for face in QUADS]
+
+# Columns of the sweep CSVs that define a case
+CASE_COLS = ["tsr", "u_infty", "dsflag", "tp", "nti", "nbelem", "walls",
+             "foildata", "iwall"] + WALL_DS_PARAMS
+
+# Values assumed for case columns missing from older results
+CASE_DEFAULTS = dict({"tp": 1.7, "foildata": "Sheldahl", "iwall": 0},
+                     **{p: WALL_DS for p in WALL_DS_PARAMS})
+
+# Case columns fixed by the name of a sweep's results file, so missing values
+# of older results are those of the sweep rather than `CASE_DEFAULTS`
+SWEEP_COLS = ["foildata"]
+
+# Column types for the results database
+RESULT_COLS = dict({"tsr": "REAL", "cp": "REAL", "cd": "REAL",
+                    "u_infty": "REAL", "dsflag": "INTEGER", "tp": "REAL",
+                    "nti": "INTEGER", "nbelem": "INTEGER", "nrevs": "INTEGER",
+                    "walls": "INTEGER", "foildata": "TEXT",
+                    "cpu_hrs_per_sec": "REAL", "iwall": "INTEGER",
+                    "solver_time": "REAL"},
+                   **{p: "REAL" for p in WALL_DS_PARAMS})
+
+# Case parameters that must be integers
+INT_PARAMS = ["nti", "nbelem", "dynamic_stall", "walls", "nrevs", "probes",
+              "iwall"]
+
+# Sweep CSV column names for parameters named differently in `run_cactus`
+PARAM_COLS = {"dynamic_stall": "dsflag"}
+
+# Result cache location and eviction limits
+CACHE_DIR = "cache"
+CACHE_MAX_SIZE_GB = 5.0
+CACHE_MAX_AGE_DAYS = 90.0
+
+# Wall meshes shared by all cases, which are not evicted
+WALLS_CACHE_DIR = os.path.join(CACHE_DIR, "walls")
+
+# Run directory files stored in the result cache
+CACHE_FILES = ["cactus.log", "run_info.json", "output/RM2_Param.csv",
+               "output/RM2_RevData.csv", "output/RM2_TimeData.csv"]
+
+# Input file keys pointing to files that define a case
+CASE_FILE_KEYS = ["GeomFilePath", "AFDPath", "WallMeshPath"]
+
+# Case parameters the DMST surrogate model depends on
+SURROGATE_PARAMS = ["tsr", "u_infty", "foildata"]
+
+
+def case_dir_name(**params):
+    """Create a unique run directory name from case parameters."""
+    parts = []
+    for name in sorted(params):
+        val = params[name]
+        if isinstance(val, (float, np.floating)):
+            val = "{:g}".format(val)
+        parts.append("{}{}".format(name, val))
+    return "_".join(parts)
+
+
+def setup_case_dir(case_dir="."):
+    """Create a run directory holding its own copies of the shared config
+    files, so that multiple cases can run at once without overwriting each
+    other.
+    """
+    config_dir = os.path.join(case_dir, "config")
+    if not os.path.isdir(config_dir):
+        os.makedirs(config_dir)
+    if os.path.abspath(case_dir) == os.path.abspath("."):
+        return
+    for fname in ["probes.txt"]:
+        src = os.path.join("config", fname)
+        if os.path.isfile(src):
+            shutil.copy(src, os.path.join(config_dir, fname))
+    # Foil data is read-only, so link rather than copy
+    foildata = os.path.join(config_dir, "foildata")
+    if not os.path.lexists(foildata):
+        os.symlink(os.path.abspath("config/foildata"), foildata)
+
+
+def clean_case(case_dir="."):
+    """Remove log and output files from a run directory."""
+    for fpath in glob.glob(os.path.join(case_dir, "*.log")):
+        os.remove(fpath)
+    shutil.rmtree(os.path.join(case_dir, "output"), ignore_errors=True)
+    if os.path.isfile(os.path.join(case_dir, "run_info.json")):
+        os.remove(os.path.join(case_dir, "run_info.json"))
+
+
+def create_input_file(u_infty=1.0, tsr=3.1, dynamic_stall=2, case_dir=".",
+                      nrevs=8, probes=1, iwall=0, **kwargs):
+    """Create CACTUS input file `config/RM2.in` in `case_dir`."""
     params = {"dynamic_stall": dynamic_stall,
+              "nrevs": nrevs,
+              "probes": probes,
+              "iwall": iwall,
               "tsr": tsr,
               "rpm": tsr*u_infty/R/(2*np.pi)*60}
     params.update(kwargs)
     with open("config/RM2.in.template") as f:
         txt = f.read()
-    with open("config/RM2.in", "w") as f:
+    with open(os.path.join(case_dir, "config", "RM2.in"), "w") as f:
         f.write(txt.format(**params))
 
 
-def create_geom_file(nbelem=12):
-    """Create CACTUS geometry file using Octave script."""
-    call("octave -q scripts/makegeom.m {}".format(nbelem), shell=True)
+def create_geom_file(nbelem=12, case_dir="."):
+    """Create CACTUS geometry file, using the (cached) output of the Octave
+    script unless the NumPy version has been checked against its reference
+    output.
+    """
+    fpath = os.path.join(case_dir, "config", "RM2.geom")
+    if geom_method() == "octave":
+        cached_octave_geom(nbelem, fpath)
+    else:
+        write_geom(nbelem, fpath)
+
+
+def create_wall_file(wall_ds=WALL_DS, case_dir=".", **kwargs):
+    """Create wall mesh with grid spacing `wall_ds` normalized by R, which is
+    overridden for individual faces by `wall_ds_<face>` keyword arguments,
+    e.g., `wall_ds_top`.
+
+    Meshes are stored in `WALLS_CACHE_DIR` by a hash of their inputs and
+    linked, or copied, into the case directory.
+    """
+    ds = {face: kwargs.get("wall_ds_" + face, wall_ds) for face in QUADS}
+    key = hashlib.sha1(json.dumps(wall_inputs(ds=ds),
+                                  sort_keys=True).encode()).hexdigest()
+    if not os.path.isdir(WALLS_CACHE_DIR):
+        os.makedirs(WALLS_CACHE_DIR, exist_ok=True)
+    fpath = os.path.join(WALLS_CACHE_DIR, key + ".xyz")
+    make_walls(ds=ds, fpath=fpath)
+    for ext in [".xyz", ".json"]:
+        src = os.path.join(WALLS_CACHE_DIR, key + ext)
+        dst = os.path.join(case_dir, "config", "walls" + ext)
+        if os.path.lexists(dst):
+            os.remove(dst)
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copyfile(src, dst)
 
 
-def get_param(param="nti", dtype=float):
+def get_wall_ds(case_dir="."):
+    """Read the grid spacing of each wall face, or `None` if no wall mesh
+    was created.
+    """
+    fpath = os.path.join(case_dir, "config", "walls.json")
+    if not os.path.isfile(fpath):
+        return None
+    with open(fpath) as f:
+        return json.load(f)["ds"]
+
+
+def get_param(param="nti", dtype=float, case_dir="."):
     """Get parameter value by reading input file."""
-    with open("config/RM2.in") as f:
+    with open(os.path.join(case_dir, "config", "RM2.in")) as f:
         for line in f:
             line = line.lower()
             if param.lower() in line and "=" in line:
                 return dtype(line.replace("=", " ").split()[1])
 
 
-def cpu_hrs_per_sec(hyperthreading=True, tsr=3.1, u_infty=1.0, nrevs=8):
-    """Compute CPU hours per simulated second metric."""
+def cpu_hrs_per_sec(hyperthreading=True, tsr=3.1, u_infty=1.0, nrevs=8,
+                    case_dir="."):
+    """Compute CPU hours per simulated second metric.
+
+    The CPU time of the CACTUS process is used if it was recorded in
+    `run_info.json`, otherwise it is estimated from the wall time and number
+    of cores.
+    """
+    omega = tsr*u_infty/R
+    total_seconds = nrevs/(omega/(2*np.pi))
+    try:
+        run_info = load_run_info(case_dir)
+        cpu_time = run_info["user_time"] + run_info["sys_time"]
+        return (cpu_time/3600)/total_seconds
+    except (IOError, KeyError, ValueError):
+        pass
     cores = cpu_count()
     # If hyperthreading is enabled, it may not be fair to count all "cores"
     if hyperthreading:
         cores /= 2
-    omega = tsr*u_infty/R
-    wall_time = check_output("tail cactus.log -n10 | grep Total", shell=True)
-    wall_time = float(wall_time.decode().split()[-1])
-    revs_per_second = omega/(2*np.pi)
-    total_seconds = nrevs/revs_per_second
+    with open(os.path.join(case_dir, "cactus.log")) as f:
+        lines = [line for line in f.readlines()[-10:] if "Total" in line]
+    if lines:
+        wall_time = float(lines[-1].split()[-1])
+    else:
+        # CACTUS was stopped before writing its timing summary
+        wall_time = load_run_info(case_dir)["wall_time"]
     return cores*(wall_time/3600)/(total_seconds)
 
 
-def get_nbelem():
+def get_foildata(case_dir="."):
+    """Read name of foil coefficient database from input file."""
+    with open(os.path.join(case_dir, "config", "RM2.in")) as f:
+        match = re.search(r"NACA_0021_(\w+)\.dat", f.read())
+    return match.group(1)
+
+
+def get_nbelem(case_dir="."):
     """Read number of blade elements."""
-    with open("config/RM2.geom") as f:
+    with open(os.path.join(case_dir, "config", "RM2.geom")) as f:
         for line in f:
             line = line.lower()
             if "nelem" in line:
                 return int(line.split()[1])
 
 
-def run_cactus(tsr=3.1, nbelem=12, overwrite=False, **kwargs):
-    """Run CACTUS and write output to `cactus.log`."""
-    if not os.path.isfile("cactus.log") or overwrite:
-        create_geom_file(nbelem)
-        create_input_file(tsr=tsr, **kwargs)
-        call("./clean.sh")
-        print("Running CACTUS for TSR={}".format(tsr))
-        call("./cactus/bin/cactus ./config/RM2.in > ./cactus.log",
-             shell=True)
+def load_run_info(case_dir="."):
+    """Load information about how CACTUS was run in `case_dir`."""
+    with open(os.path.join(case_dir, "run_info.json")) as f:
+        return json.load(f)
+
+
+def read_revdata(case_dir="."):
+    """Read revolution data, ignoring a partially written last line, so it can
+    be read while CACTUS is running.
+    """
+    fpath = os.path.join(case_dir, "output", "RM2_RevData.csv")
+    if not os.path.isfile(fpath):
+        return None
+    with open(fpath) as f:
+        txt = f.read()
+    txt = txt[:txt.rfind("\n") + 1]
+    if txt.count("\n") < 2:
+        return None
+    return pd.read_csv(io.StringIO(txt))
+
+
+def is_converged(revdata, tol=0.01, nrevs=3):
+    """Detect whether revolution-averaged power and drag coefficients have
+    each changed by less than `tol` over the last `nrevs` revolutions.
+
+    The first revolution is never considered converged.
+    """
+    if revdata is None or len(revdata) < nrevs + 1:
+        return False
+    last = revdata[["Power Coeff. (-)", "Fx Coeff. (-)"]].iloc[-nrevs:]
+    return bool(((last.max() - last.min()) < tol).all())
+
+
+def case_hash(case_dir=".", extra=""):
+    """Compute a hash of the full case definition: the input file, with
+    comments and whitespace removed, and the contents of the geometry, foil
+    data, and wall files it references. `extra` describes anything else that
+    affects the results, e.g., convergence settings.
+    """
+    sha = hashlib.sha1(extra.encode())
+    with open(os.path.join(case_dir, "config", "RM2.in")) as f:
+        txt = f.read()
+    lines = [line.split("!")[0].strip() for line in txt.splitlines()]
+    lines = [re.sub(r"\s+", " ", line) for line in lines if line]
+    sha.update("\n".join(lines).encode())
+    for key in CASE_FILE_KEYS:
+        match = re.search(r"^\s*{}\s*=\s*['\"](.+?)['\"]".format(key), txt,
+                          flags=re.MULTILINE)
+        if match is None:
+            continue
+        fpath = os.path.join(case_dir, match.group(1))
+        if os.path.isfile(fpath):
+            sha.update(key.encode())
+            with open(fpath, "rb") as f:
+                sha.update(f.read())
+    return sha.hexdigest()
+
+
+def load_cached(key, case_dir="."):
+    """Restore cached results for `key` into `case_dir`.
+
+    Returns `True` on a cache hit.
+    """
+    entry = os.path.join(CACHE_DIR, key)
+    if not os.path.isdir(entry):
+        return False
+    clean_case(case_dir)
+    for fname in CACHE_FILES:
+        src = os.path.join(entry, fname)
+        if os.path.isfile(src):
+            dst = os.path.join(case_dir, fname)
+            if not os.path.isdir(os.path.dirname(dst)):
+                os.makedirs(os.path.dirname(dst))
+            shutil.copy(src, dst)
+    # Mark entry as recently used
+    os.utime(entry, None)
+    return True
+
+
+def store_cached(key, case_dir="."):
+    """Store results from `case_dir` in the cache under `key`."""
+    entry = os.path.join(CACHE_DIR, key)
+    if os.path.isdir(entry):
+        return
+    # Write to a temporary directory first so concurrent runs never see a
+    # partial entry
+    tmp = "{}.tmp{}".format(entry, os.getpid())
+    for fname in CACHE_FILES:
+        src = os.path.join(case_dir, fname)
+        if os.path.isfile(src):
+            dst = os.path.join(tmp, fname)
+            if not os.path.isdir(os.path.dirname(dst)):
+                os.makedirs(os.path.dirname(dst))
+            shutil.copy(src, dst)
+    try:
+        os.rename(tmp, entry)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def evict_cache(max_size_gb=CACHE_MAX_SIZE_GB,
+                max_age_days=CACHE_MAX_AGE_DAYS):
+    """Remove cache entries not used in `max_age_days`, then remove least
+    recently used entries until the cache is smaller than `max_size_gb`.
+    """
+    if not os.path.isdir(CACHE_DIR):
+        return
+    entries = []
+    for key in os.listdir(CACHE_DIR):
+        entry = os.path.join(CACHE_DIR, key)
+        if (".tmp" in key or not os.path.isdir(entry)
+                or entry == WALLS_CACHE_DIR):
+            continue
+        size = sum(os.path.getsize(os.path.join(d, fname))
+                   for d, _, fnames in os.walk(entry) for fname in fnames)
+        entries.append((os.path.getmtime(entry), size, entry))
+    entries.sort(reverse=True)
+    now = time.time()
+    total = 0
+    for mtime, size, entry in entries:
+        total += size
+        if now - mtime > max_age_days*86400 or total > max_size_gb*1e9:
+            shutil.rmtree(entry, ignore_errors=True)
+
+
+@contextmanager
+def timed_stage(stages, name):
+    """Record wall time and CPU time of the current process and any child
+    processes it waits for, e.g., Octave, for a stage of the run pipeline in
+    the dictionary `stages`. Times of repeated stages are accumulated. Peak
+    memory use is only recorded for the CACTUS process, since that of this
+    process is its lifetime peak, not the stage's.
+    """
+    t0 = time.time()
+    r0 = resource.getrusage(resource.RUSAGE_SELF)
+    c0 = resource.getrusage(resource.RUSAGE_CHILDREN)
+    try:
+        yield
+    finally:
+        r1 = resource.getrusage(resource.RUSAGE_SELF)
+        c1 = resource.getrusage(resource.RUSAGE_CHILDREN)
+        stage = stages.setdefault(name, {"wall_time": 0.0, "user_time": 0.0,
+                                         "sys_time": 0.0})
+        stage["wall_time"] += time.time() - t0
+        stage["user_time"] += (r1.ru_utime - r0.ru_utime
+                               + c1.ru_utime - c0.ru_utime)
+        stage["sys_time"] += (r1.ru_stime - r0.ru_stime
+                              + c1.ru_stime - c0.ru_stime)
+
+
+def count_threads(pid):
+    """Read the number of threads of a running process from `/proc`."""
+    try:
+        with open("/proc/{}/status".format(pid)) as f:
+            for line in f:
+                if line.startswith("Threads:"):
+                    return int(line.split()[1])
+    except IOError:
+        pass
+    return 0
+
+
+def wait_rusage(proc, block=True):
+    """Wait for a `Popen` process with `os.wait4`, setting its return code.
+
+    Returns the process's resource usage, or `None` if `block` is `False` and
+    it is still running.
+    """
+    pid, status, rusage = os.wait4(proc.pid, 0 if block else os.WNOHANG)
+    if pid == 0:
+        return None
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return rusage
+
+
+def write_timing(case_dir=".", stages=None, **kwargs):
+    """Write or update the timing record `timing.json` of a run directory
+    with the stages in `stages`.
+    """
+    fpath = os.path.join(case_dir, "timing.json")
+    if os.path.isfile(fpath):
+        with open(fpath) as f:
+            record = json.load(f)
     else:
+        record = {"case_dir": case_dir, "host": socket.gethostname(),
+                  "stages": {}}
+    record.update(kwargs)
+    record["stages"].update(stages or {})
+    with open(fpath, "w") as f:
+        json.dump(record, f, indent=4)
+
+
+def run_cactus(tsr=3.1, nbelem=12, overwrite=False, case_dir=".",
+               nthreads=None, use_cache=True, conv_tol=None, conv_revs=3,
+               poll_interval=1.0, solver=None, **kwargs):
+    """Run CACTUS in `case_dir` and write output to `cactus.log`.
+
+    `solver` is the command used to run CACTUS, e.g., to run a stub solver,
+    and defaults to `CACTUS_BIN`.
+
+    `nthreads` sets `OMP_NUM_THREADS` for the CACTUS process. If `use_cache`
+    is `True`, results from a previous run of an identical case with the same
+    solver are restored from the cache instead of running CACTUS.
+
+    The CACTUS process is monitored at most every `poll_interval` seconds. If
+    `conv_tol` is set, CACTUS is stopped once the mean power and drag
+    coefficients have changed by less than `conv_tol` over the last
+    `conv_revs` revolutions.
+
+    The wall time, CPU time, and peak memory use of each stage are written
+    to `timing.json`.
+
+    Returns the CACTUS exit code, which is zero for cached or converged runs.
+    """
+    logfile = os.path.join(case_dir, "cactus.log")
+    if os.path.isfile(logfile) and not overwrite:
         sys.exit("Simulation results present; use ./clean.sh to remove "
                  "or -f to overwrite")
+    stages = OrderedDict()
+    with timed_stage(stages, "setup"):
+        setup_case_dir(case_dir)
+        if os.path.isfile(os.path.join(case_dir, "timing.json")):
+            os.remove(os.path.join(case_dir, "timing.json"))
+    with timed_stage(stages, "geometry"):
+        create_geom_file(nbelem, case_dir=case_dir)
+    wall_kwargs = {k: kwargs.pop(k) for k in ["wall_ds"] + WALL_DS_PARAMS
+                   if k in kwargs}
+    if kwargs.get("walls"):
+        with timed_stage(stages, "walls"):
+            create_wall_file(case_dir=case_dir, **wall_kwargs)
+    with timed_stage(stages, "input"):
+        create_input_file(tsr=tsr, case_dir=case_dir, **kwargs)
+    if use_cache:
+        with timed_stage(stages, "cache"):
+            extra = ""
+            if conv_tol is not None:
+                extra = "conv_tol={} conv_revs={}".format(conv_tol, conv_revs)
+            # Keep results of other solvers, e.g., the stub, apart
+            if solver is not None:
+                extra += " solver={}".format(" ".join(solver))
+            key = case_hash(case_dir, extra=extra)
+            cached = load_cached(key, case_dir)
+        if cached:
+            print("Using cached results for TSR={} in {}".format(tsr,
+                                                                 case_dir))
+            write_timing(case_dir, stages, cached=True, time=time.time())
+            return 0
+    clean_case(case_dir)
+    print("Running CACTUS for TSR={} in {}".format(tsr, case_dir))
+    env = os.environ.copy()
+    if nthreads is not None:
+        env["OMP_NUM_THREADS"] = str(nthreads)
+    converged = False
+    threads = 0
+    if solver is None:
+        solver = [os.path.abspath(CACTUS_BIN)]
+    t0 = time.time()
+    with open(logfile, "w") as f, timed_stage(stages, "cactus"):
+        proc = Popen(list(solver) + ["./config/RM2.in"], stdout=f,
+                     cwd=case_dir, env=env)
+        while True:
+            threads = max(threads, count_threads(proc.pid))
+            rusage = wait_rusage(proc, block=False)
+            if rusage is not None:
+                break
+            if conv_tol is not None and is_converged(read_revdata(case_dir),
+                                                     tol=conv_tol,
+                                                     nrevs=conv_revs):
+                print("Stopping converged case in {}".format(case_dir))
+                converged = True
+                proc.terminate()
+                rusage = wait_rusage(proc)
+                break
+            # Poll quickly at first so that short runs are timed accurately
+            time.sleep(min(poll_interval, max(0.005, 0.02*(time.time() - t0))))
+    revdata = read_revdata(case_dir)
+    returncode = 0 if converged else proc.returncode
+    run_info = {"wall_time": time.time() - t0, "converged": converged,
+                "nrevs": 0 if revdata is None else len(revdata),
+                "returncode": returncode, "user_time": rusage.ru_utime,
+                "sys_time": rusage.ru_stime,
+                "max_rss_mb": rusage.ru_maxrss/1024, "threads": threads,
+                "omp_num_threads": env.get("OMP_NUM_THREADS")}
+    with open(os.path.join(case_dir, "run_info.json"), "w") as f:
+        json.dump(run_info, f, indent=4)
+    # Replace this process's resource usage with that of CACTUS
+    stages["cactus"].update(user_time=rusage.ru_utime,
+                            sys_time=rusage.ru_stime,
+                            max_rss_mb=rusage.ru_maxrss/1024, threads=threads)
+    if use_cache and returncode == 0:
+        with timed_stage(stages, "cache"):
+            store_cached(key, case_dir)
+            evict_cache()
+    write_timing(case_dir, stages, cached=False, time=time.time())
+    return returncode
+
 
+def log_perf(fpath="processed/tsr_sweep.csv", case_dir=".", sort_by=None):
+    """Log mean performance from last revolution.
 
-def log_perf(fpath="processed/tsr_sweep.csv"):
-    """Log mean performance from last revolution."""
-    params = pd.read_csv("output/RM2_Param.csv")
-    tsr = params["TSR (-)"].iloc[0]
-    u_infty = np.round(params["U (ft/s)"].iloc[0]*0.3048, decimals=5)
-    run = pd.read_csv("output/RM2_RevData.csv")
-    nrevs = int(run["Rev"].max())
+    Rows for a case already present in `fpath` are replaced, and the table is
+    sorted by the `sort_by` column(s) so results may be logged in any order.
+    """
+    stages = {}
+    with timed_stage(stages, "postprocessing"):
+        _log_perf(fpath=fpath, case_dir=case_dir, sort_by=sort_by)
+    write_timing(case_dir, stages)
+
+
+def _log_perf(fpath="processed/tsr_sweep.csv", case_dir=".", sort_by=None):
+    params = load_csv(os.path.join(case_dir, "output", "RM2_Param.csv"))
+    tsr = params["tsr"].iloc[0]
+    u_infty = np.round(params["u_ft/s"].iloc[0]*0.3048, decimals=5)
+    # Revolution data of a stopped run may end in a partially written line
+    run = read_revdata(case_dir)
+    if run is None:
+        raise IOError("No complete revolutions in {}".format(case_dir))
+    run = run.rename(columns=clean_name)
+    nrevs = int(run["rev"].max())
     run = run.iloc[len(run)//2:].mean()
-    cp = run["Power Coeff. (-)"]
-    cd = run["Fx Coeff. (-)"]
-    savedir = os.path.split(fpath)[0]
-    if not os.path.isdir(savedir):
-        os.makedirs(savedir)
-    if os.path.isfile(fpath):
-        df = pd.read_csv(fpath)
-    else:
-        df = pd.DataFrame(columns=["tsr", "cp", "cd", "u_infty", "dsflag", "tp",
-                                   "nti", "nbelem", "nrevs", "walls",
-                                   "cpu_hrs_per_sec"])
+    cp = run["power_coeff"]
+    cd = run["fx_coeff"]
     d = {"tsr": tsr, "cp": cp, "cd": cd, "u_infty": u_infty}
-    d["dsflag"] = get_param("dsflag", dtype=int)
-    d["tp"] = get_param("LBDynStallTp", dtype=float)
-    d["nbelem"] = get_nbelem()
-    d["nti"] = get_param("nti", dtype=int)
+    d["dsflag"] = get_param("dsflag", dtype=int, case_dir=case_dir)
+    d["tp"] = get_param("LBDynStallTp", dtype=float, case_dir=case_dir)
+    d["nbelem"] = get_nbelem(case_dir=case_dir)
+    d["nti"] = get_param("nti", dtype=int, case_dir=case_dir)
     d["nrevs"] = nrevs
-    d["walls"] = get_param("WPFlag", dtype=int)
+    d["walls"] = get_param("WPFlag", dtype=int, case_dir=case_dir)
+    d["foildata"] = get_foildata(case_dir=case_dir)
+    if d["walls"]:
+        d["iwall"] = get_param("iWall", dtype=int, case_dir=case_dir)
+        for face, ds in (get_wall_ds(case_dir) or {}).items():
+            d["wall_ds_" + face] = ds
     d["cpu_hrs_per_sec"] = cpu_hrs_per_sec(tsr=tsr, u_infty=u_infty,
-                                           nrevs=d["nrevs"])
-    df = df.append(d, ignore_index=True)
-    df.to_csv(fpath, index=False)
+                                           nrevs=d["nrevs"],
+                                           case_dir=case_dir)
+    try:
+        d["solver_time"] = load_run_info(case_dir)["wall_time"]
+    except IOError:
+        pass
+    store_result(d, fpath)
+    export_results(fpath, sort_by=sort_by)
+
+
+def results_db(fpath):
+    """Open the results database for the sweep results file `fpath`, which
+    is stored alongside it as `results.db`.
+
+    Results are kept in a single `perf` table with a `sweep` column holding
+    the results file name, and a unique index on the case parameter columns.
+    """
+    savedir = os.path.split(fpath)[0]
+    if savedir and not os.path.isdir(savedir):
+        os.makedirs(savedir)
+    con = sqlite3.connect(os.path.join(savedir, "results.db"), timeout=60)
+    con.execute("PRAGMA journal_mode=WAL")
+    cols = ", ".join("{} {}".format(c, t) for c, t in RESULT_COLS.items())
+    con.execute("CREATE TABLE IF NOT EXISTS perf (sweep TEXT, {})".format(
+                cols))
+    existing = [row[1] for row in con.execute("PRAGMA table_info(perf)")]
+    for col, dtype in RESULT_COLS.items():
+        if col not in existing:
+            con.execute("ALTER TABLE perf ADD COLUMN {} {}".format(col, dtype))
+    # Missing case values are treated as their defaults, so that new results
+    # replace older ones without those columns
+    exprs = ", ".join(
+        "IFNULL({}, {!r})".format(c, CASE_DEFAULTS[c]) if c in CASE_DEFAULTS
+        else c for c in CASE_COLS)
+    index = "CREATE UNIQUE INDEX perf_case ON perf (sweep, {})".format(exprs)
+    row = con.execute("SELECT sql FROM sqlite_master WHERE name='perf_case'")
+    row = row.fetchone()
+    if row is None or row[0] != index:
+        con.execute("DROP INDEX IF EXISTS perf_case")
+        # Keep only the latest row for cases duplicated under the new index
+        con.execute("DELETE FROM perf WHERE rowid NOT IN (SELECT MAX(rowid) "
+                    "FROM perf GROUP BY sweep, {})".format(exprs))
+        con.execute(index)
+    con.commit()
+    return con
+
+
+def _sweep_name(fpath):
+    return os.path.splitext(os.path.basename(fpath))[0]
+
+
+def store_result(d, fpath):
+    """Insert a row of results for the sweep results file `fpath`, replacing
+    any existing row for the same case.
+
+    Results already in `fpath` but not yet in the database, e.g., from before
+    the database existed, are imported first. Case columns missing from such
+    files take their values from `d`, since they were fixed for the sweep,
+    e.g., `foildata` for `tsr_sweep_Jacobs.csv`.
+    """
+    sweep = _sweep_name(fpath)
+    con = results_db(fpath)
+    with con:
+        nrows = con.execute("SELECT COUNT(*) FROM perf WHERE sweep=?",
+                            (sweep,)).fetchone()[0]
+        rows = [d]
+        if nrows == 0 and os.path.isfile(fpath):
+            legacy = pd.read_csv(fpath)
+            for col in CASE_COLS:
+                if col not in legacy and d.get(col) is not None:
+                    legacy[col] = d[col]
+            rows = legacy.to_dict("records") + rows
+        # Rows imported before missing columns were filled have nulls in
+        # `SWEEP_COLS`, which are the values of the sweep; any that duplicate
+        # a newer row are removed
+        for col in SWEEP_COLS:
+            if d.get(col) is None:
+                continue
+            con.execute("UPDATE OR IGNORE perf SET {0}=? WHERE sweep=? AND "
+                        "{0} IS NULL".format(col), (d[col], sweep))
+            con.execute("DELETE FROM perf WHERE sweep=? AND {} IS "
+                        "NULL".format(col), (sweep,))
+        for row in rows:
+            row = {k: v for k, v in row.items() if k in RESULT_COLS
+                   and not (isinstance(v, float) and np.isnan(v))}
+            for k, v in row.items():
+                if isinstance(v, (np.integer, np.floating)):
+                    v = v.item()
+                if RESULT_COLS[k] == "REAL":
+                    v = round(float(v), 10)
+                elif RESULT_COLS[k] == "INTEGER":
+                    v = int(v)
+                row[k] = v
+            cols = ["sweep"] + list(row)
+            con.execute("INSERT OR REPLACE INTO perf ({}) VALUES ({})".format(
+                        ", ".join(cols), ", ".join("?"*len(cols))),
+                        [sweep] + list(row.values()))
+    con.close()
+
+
+def export_results(fpath, sort_by=None):
+    """Write results for a sweep from the database to the CSV file `fpath`.
+
+    Columns with no values are omitted, and rows are sorted by the `sort_by`
+    column(s) present, otherwise in the order they were stored.
+    """
+    con = results_db(fpath)
+    df = pd.read_sql_query("SELECT * FROM perf WHERE sweep=? ORDER BY rowid",
+                           con, params=(_sweep_name(fpath),))
+    con.close()
+    df = df.drop(columns="sweep").dropna(axis=1, how="all")
+    # Integer columns with missing values are read as float
+    for col in df:
+        if RESULT_COLS.get(col) == "INTEGER":
+            df[col] = df[col].astype("Int64")
+    if sort_by is not None:
+        # Design parameters such as `probes` are not result columns
+        if isinstance(sort_by, str):
+            sort_by = [sort_by]
+        sort_by = [col for col in sort_by if col in df]
+        if sort_by:
+            df = df.sort_values(by=sort_by, kind="mergesort")
+    # Write to a temporary file first so readers never see a partial file
+    tmp = "{}.tmp{}".format(fpath, os.getpid())
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, fpath)
+
+
+def clear_results(fpath):
+    """Remove results for a sweep from both the database and `fpath`."""
+    con = results_db(fpath)
+    with con:
+        con.execute("DELETE FROM perf WHERE sweep=?", (_sweep_name(fpath),))
+    con.close()
+    if os.path.isfile(fpath):
+        os.remove(fpath)
+
+
+def export_all_results(savedir="processed"):
+    """Export all sweeps in the results database to CSV files."""
+    con = results_db(os.path.join(savedir, "x.csv"))
+    sweeps = [row[0] for row in
+              con.execute("SELECT DISTINCT sweep FROM perf ORDER BY sweep")]
+    con.close()
+    for sweep in sweeps:
+        print("Exporting {}".format(sweep))
+        export_results(os.path.join(savedir, sweep + ".csv"))
+
+
+def journal_path(fpath):
+    """Return the path of the journal for the sweep results file `fpath`."""
+    return os.path.join(RUNS_DIR, "journal", _sweep_name(fpath) + ".jsonl")
+
+
+def write_journal(jpath, case_dir, state, **kwargs):
+    """Append the state of a case to a sweep journal.
+
+    Each record is a single line written with one `write` call on a file
+    opened in append mode and synced to disk, so records from concurrent
+    processes never interleave and survive a crash.
+    """
+    if jpath is None:
+        return
+    if not os.path.isdir(os.path.dirname(jpath)):
+        os.makedirs(os.path.dirname(jpath))
+    record = dict(case_dir=case_dir, state=state, time=time.time(), **kwargs)
+    fd = os.open(jpath, os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+    try:
+        os.write(fd, (json.dumps(record) + "\n").encode())
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def read_journal(jpath):
+    """Read a sweep journal.
+
+    Returns
+    -------
+    status : dict
+        The latest state (`"pending"`, `"running"`, `"done"`, or `"failed"`)
+        and number of failures of each case, keyed by run directory.
+    """
+    status = {}
+    if jpath is None or not os.path.isfile(jpath):
+        return status
+    with open(jpath) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Partially written record from a crash
+                continue
+            s = status.setdefault(record["case_dir"], {"failures": 0})
+            s["state"] = record["state"]
+            if record["state"] == "failed":
+                s["failures"] += 1
+    return status
+
+
+def run_complete(case_dir="."):
+    """Detect whether CACTUS finished successfully in `case_dir`."""
+    try:
+        run_info = load_run_info(case_dir)
+    except (IOError, ValueError):
+        return False
+    return (run_info.get("returncode") == 0
+            and read_revdata(case_dir) is not None)
+
+
+def _run_case(case, journal=None):
+    """Run a single case in a worker process and return its run directory."""
+    write_journal(journal, case["case_dir"], "running")
+    returncode = run_cactus(overwrite=True, **case)
+    if returncode != 0:
+        raise RuntimeError("CACTUS exited with code {}".format(returncode))
+    return case["case_dir"]
+
+
+def run_cases(cases, fpath, jobs=1, threads_per_job=None, sort_by=None,
+              journal=None, resume=False, max_retries=2, **kwargs):
+    """Run multiple cases concurrently, logging performance to `fpath` as
+    each one finishes.
+
+    Parameters
+    ----------
+    cases : list of dict
+        Keyword arguments for `run_cactus`, each including `case_dir`.
+    jobs : int
+        Number of cases to run at once.
+    threads_per_job : int
+        OpenMP threads for each case. By default the machine's cores are
+        split evenly between jobs.
+    sort_by : str
+        Column by which to sort the results table.
+    journal : str
+        Path of a journal recording the state of each case.
+    resume : bool
+        Whether to resume from the journal, skipping completed cases and
+        cases that have failed more than `max_retries` times, and logging
+        cases whose run finished before being logged.
+    max_retries : int
+        Number of times a failed case is rerun.
+
+    Additional keyword arguments are passed to `run_cactus` for every case.
+    """
+    if threads_per_job is None:
+        threads_per_job = max(1, cpu_count()//jobs)
+    status = read_journal(journal) if resume else {}
+    if journal is not None and not resume and os.path.isfile(journal):
+        os.remove(journal)
+    failures = {}
+    todo = []
+    for case in cases:
+        case = dict(case, nthreads=threads_per_job, **kwargs)
+        case_dir = case["case_dir"]
+        s = status.get(case_dir, {})
+        failures[case_dir] = s.get("failures", 0)
+        if s.get("state") == "done":
+            print("Skipping completed case in {}".format(case_dir))
+            continue
+        if failures[case_dir] > max_retries:
+            print("Skipping case failed {} times in {}".format(
+                  failures[case_dir], case_dir))
+            continue
+        if s.get("state") == "running" and run_complete(case_dir):
+            print("Recovering results from {}".format(case_dir))
+            log_perf(fpath=fpath, case_dir=case_dir, sort_by=sort_by)
+            write_journal(journal, case_dir, "done")
+            continue
+        write_journal(journal, case_dir, "pending")
+        todo.append(case)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(_run_case, case, journal): case
+                   for case in todo}
+        while futures:
+            for future in as_completed(list(futures)):
+                case = futures.pop(future)
+                case_dir = case["case_dir"]
+                try:
+                    future.result()
+                    log_perf(fpath=fpath, case_dir=case_dir, sort_by=sort_by)
+                except Exception as e:
+                    failures[case_dir] += 1
+                    print("Case in {} failed: {}".format(case_dir, e))
+                    write_journal(journal, case_dir, "failed", error=str(e))
+                    if failures[case_dir] <= max_retries:
+                        futures[executor.submit(_run_case, case,
+                                                journal)] = case
+                    continue
+                write_journal(journal, case_dir, "done")
+
+
+def timing_summary(runs_dir=RUNS_DIR):
+    """Aggregate timing records of all runs under `runs_dir` by stage.
+
+    Returns
+    -------
+    summary : pandas.DataFrame
+        Total and mean wall and CPU times of each stage, and maximum peak
+        memory use of the CACTUS stage.
+    """
+    records = []
+    for dirpath, _, fnames in os.walk(runs_dir):
+        if "timing.json" not in fnames:
+            continue
+        with open(os.path.join(dirpath, "timing.json")) as f:
+            record = json.load(f)
+        for n, (stage, d) in enumerate(record["stages"].items()):
+            d = dict(d, stage=stage, order=n, case_dir=dirpath,
+                     cached=record.get("cached", False))
+            records.append(d)
+    if not records:
+        print("No timing records found in {}".format(runs_dir))
+        return None
+    df = pd.DataFrame(records)
+    df["cpu_time"] = df.user_time + df.sys_time
+    if "max_rss_mb" not in df:
+        df["max_rss_mb"] = np.nan
+    summary = df.groupby("stage").agg(
+        runs=("case_dir", "nunique"), order=("order", "median"),
+        total_wall_time=("wall_time", "sum"),
+        mean_wall_time=("wall_time", "mean"),
+        total_cpu_time=("cpu_time", "sum"),
+        mean_cpu_time=("cpu_time", "mean"),
+        max_rss_mb=("max_rss_mb", "max"))
+    summary = summary.sort_values("order").drop(columns="order")
+    summary["wall_time_fraction"] = (summary.total_wall_time
+                                     / summary.total_wall_time.sum())
+    ncached = df[df.cached].case_dir.nunique()
+    print("Timing summary for {} runs ({} cached) in {}".format(
+          df.case_dir.nunique(), ncached, runs_dir))
+    print(summary.to_string(float_format="{:.3f}".format))
+    return summary
+
+
+def sweep_fpath(param="tsr", foildata="Sheldahl", dynamic_stall=2):
+    """Return the path of the results file for a parameter sweep."""
+    fpath = "processed/{}_sweep.csv".format(param)
+    if foildata != "Sheldahl":
+        fpath = fpath.replace(".csv", "_{}.csv".format(foildata))
+    if dynamic_stall == 1:
+        fpath = fpath.replace(".csv", "_bv.csv")
+    return fpath
 
 
 def param_sweep(param="tsr", start=None, stop=None, step=None, dtype=float,
-                overwrite=False, append=False, **kwargs):
+                overwrite=False, append=False, resume=False, jobs=1,
+                threads_per_job=None, use_cache=True, conv_tol=None,
+                conv_revs=3, cp_min=None, dry_run=False, **kwargs):
     """Run multiple simulations, varying `quantity`.
 
-    `step` is not included.
+    `step` is not included. Up to `jobs` cases are run at once, each using
+    `threads_per_job` OpenMP threads. See `run_cactus` for `use_cache`,
+    `conv_tol`, and `conv_revs`, and `run_cases` for `resume`. Cases are
+    pre-screened with `prescreen` if `cp_min` is set or, with `dry_run`,
+    only pre-screened.
     """
     print("Running {} sweep".format(param))
-    fpath = "processed/{}_sweep.csv".format(param)
-    if kwargs["foildata"] != "Sheldahl":
-        fpath = fpath.replace(".csv", "_{}.csv".format(kwargs["foildata"]))
-    if kwargs["dynamic_stall"] == 1:
-        fpath = fpath.replace(".csv", "_bv.csv")
-    if os.path.isfile(fpath):
+    fpath = sweep_fpath(param, kwargs["foildata"], kwargs["dynamic_stall"])
+    if os.path.isfile(fpath) and not resume and not dry_run:
         if not overwrite and not append:
             sys.exit("{} sweep results present; remove, --append, or "
                      "--overwrite".format(param))
         if not append or overwrite:
-            os.remove(fpath)
+            clear_results(fpath)
     param_list = np.arange(start, stop, step, dtype=dtype)
+    cases = []
     for p in param_list:
         print("Setting {} to {}".format(param, p))
         args = kwargs.copy()
         args[param] = p
-        run_cactus(overwrite=True, **args)
-        log_perf(fpath=fpath)
+        args["case_dir"] = os.path.join(RUNS_DIR, case_dir_name(**args))
+        cases.append(args)
+    if cp_min is not None or dry_run:
+        cases = prescreen(cases, cp_min=cp_min)
+        if dry_run:
+            return
+    run_cases(cases, fpath, jobs=jobs, threads_per_job=threads_per_job,
+              sort_by=PARAM_COLS.get(param, param),
+              journal=journal_path(fpath), resume=resume,
+              use_cache=use_cache, conv_tol=conv_tol, conv_revs=conv_revs)
+
+
+def matching_rows(df, **kwargs):
+    """Select rows of a sweep results table matching the case parameters in
+    `kwargs`, ignoring any without a corresponding column. Missing values
+    are treated as their `CASE_DEFAULTS`, as in the results database, except
+    in `SWEEP_COLS`, where they match any value.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for name, val in kwargs.items():
+        col = PARAM_COLS.get(name, name)
+        if col not in df or col not in CASE_COLS:
+            continue
+        vals = df[col]
+        if col in SWEEP_COLS:
+            vals = vals.fillna(val)
+        elif col in CASE_DEFAULTS:
+            vals = vals.fillna(CASE_DEFAULTS[col])
+        if isinstance(val, str):
+            mask &= (vals == val).values
+        else:
+            mask &= np.isclose(vals.astype(float), float(val))
+    return df[mask]
+
+
+def prescreen(cases, cp_min=None):
+    """Predict the power and drag coefficients of sweep cases with the DMST
+    surrogate model (see `scripts/dmst.py`), which depends only on
+    `SURROGATE_PARAMS`, and print them.
+
+    Returns
+    -------
+    cases : list of dict
+        Cases whose predicted power coefficient is at least `cp_min`.
+    """
+    cp, cd = dmst.predict(cases)
+    names = [p for p in SURROGATE_PARAMS if any(p in c for c in cases)]
+    df = pd.DataFrame([{p: c.get(p) for p in names} for c in cases],
+                      columns=names)
+    df["cp_dmst"], df["cd_dmst"] = cp, cd
+    print("DMST predictions:")
+    print(df.to_string(index=False, float_format="{:.3f}".format))
+    if cp_min is None:
+        return cases
+    keep = [c for c, p in zip(cases, cp) if p >= cp_min]
+    print("Skipping {} of {} cases with predicted C_P below {}".format(
+          len(cases) - len(keep), len(cases), cp_min))
+    return keep
+
+
+def seed_points(param="tsr", start=None, stop=None, npoints=5,
+                min_step=0.05, **kwargs):
+    """Choose initial points of an adaptive sweep from the power coefficient
+    curve of the DMST surrogate model.
+
+    The end points and the surrogate's peak are always included. The rest
+    are spaced with a density proportional to the square root of the
+    curve's curvature, plus a uniform part, which roughly equalizes the
+    interpolation error between points. Points are rounded to multiples of
+    `min_step`.
+    """
+    x = np.arange(start, stop + min_step/2, min_step)
+    cp, _ = dmst.predict([dict(kwargs, **{param: xi}) for xi in x])
+    density = np.sqrt(np.abs(np.gradient(np.gradient(cp, x), x)))
+    density += density.mean() + 1e-12
+    cdf = np.append(0, np.cumsum(0.5*(density[1:] + density[:-1])
+                                 * np.diff(x)))
+    points = np.interp(np.linspace(0, cdf[-1], max(npoints - 1, 2)), cdf, x)
+    points = np.append(points, x[np.argmax(cp)])
+    points = np.round(np.round(points/min_step)*min_step, decimals=6)
+    return np.unique(np.clip(points, start, stop))
+
+
+def refine_points(x, y, tol=0.005, min_step=0.05, max_points=None):
+    """Choose new sweep points by bisecting intervals of a sampled curve.
+
+    Intervals adjacent to the maximum of `y` are always bisected, then those
+    whose linear interpolation error, estimated from the local second
+    derivative, exceeds `tol`, largest first. Intervals narrower than
+    `2*min_step` are never bisected. Values of `y` at repeated `x` are
+    averaged.
+
+    Returns
+    -------
+    x_new : numpy.ndarray
+        Midpoints of the intervals to refine, at most `max_points` long.
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    ok = ~np.isnan(y)
+    # Repeated points, e.g., reruns, are averaged so intervals are nonzero
+    x, index = np.unique(x[ok], return_inverse=True)
+    y = np.bincount(index, weights=y[ok])/np.bincount(index)
+    if len(x) < 3:
+        return np.array([])
+    h = np.diff(x)
+    slope = np.diff(y)/h
+    # Second derivative at interior nodes, then the largest at either end of
+    # each interval
+    d2 = np.zeros(len(x))
+    d2[1:-1] = np.abs(2*np.diff(slope)/(h[1:] + h[:-1]))
+    d2[0], d2[-1] = d2[1], d2[-2]
+    err = h**2/8*np.maximum(d2[1:], d2[:-1])
+    imax = np.argmax(y)
+    err[max(imax - 1, 0):imax + 1] = np.inf
+    candidates = np.where((err > tol) & (h >= 2*min_step))[0]
+    candidates = candidates[np.argsort(-err[candidates], kind="mergesort")]
+    if max_points is not None:
+        candidates = candidates[:max_points]
+    return np.round(0.5*(x[candidates] + x[candidates + 1]), decimals=6)
+
+
+def evaluate_points(param, points, fpath, jobs=1, threads_per_job=None,
+                    use_cache=True, conv_tol=None, conv_revs=3, **kwargs):
+    """Run cases for values of `param` in `points` not already present in
+    the results file `fpath`.
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        All results in `fpath` matching the case parameters in `kwargs`.
+    nruns : int
+        Number of new cases run.
+    """
+    col = PARAM_COLS.get(param, param)
+    if os.path.isfile(fpath):
+        done = matching_rows(pd.read_csv(fpath), **kwargs)[col].values
+    else:
+        done = np.array([])
+    cases = []
+    for p in points:
+        if np.any(np.isclose(done.astype(float), p)):
+            continue
+        print("Setting {} to {}".format(param, p))
+        args = kwargs.copy()
+        args[param] = p
+        args["case_dir"] = os.path.join(RUNS_DIR, case_dir_name(**args))
+        cases.append(args)
+    if cases:
+        run_cases(cases, fpath, jobs=jobs, threads_per_job=threads_per_job,
+                  sort_by=col, use_cache=use_cache, conv_tol=conv_tol,
+                  conv_revs=conv_revs)
+    if not os.path.isfile(fpath):
+        return pd.DataFrame(columns=[col, "cp", "cd"]), len(cases)
+    return matching_rows(pd.read_csv(fpath), **kwargs), len(cases)
+
+
+def adaptive_sweep(param="tsr", start=None, stop=None, ninit=5, tol=0.005,
+                   min_step=0.05, max_runs=20, overwrite=False, jobs=1,
+                   threads_per_job=None, use_cache=True, conv_tol=None,
+                   conv_revs=3, seed=False, **kwargs):
+    """Run a parameter sweep that starts from a coarse grid of `ninit` points
+    and refines around the peak and where the power coefficient curve bends
+    most, until no interval needs refining (see `refine_points`) or
+    `max_runs` new cases have been run. With `seed`, the initial points are
+    instead chosen from the DMST surrogate model (see `seed_points`).
+
+    Matching results already in the sweep file are reused. Up to `jobs` new
+    points are run concurrently in each iteration.
+    """
+    print("Running adaptive {} sweep".format(param))
+    fpath = sweep_fpath(param, kwargs["foildata"], kwargs["dynamic_stall"])
+    if overwrite and os.path.isfile(fpath):
+        clear_results(fpath)
+    col = PARAM_COLS.get(param, param)
+    if seed and param in SURROGATE_PARAMS:
+        points = seed_points(param, start, stop, npoints=ninit,
+                             min_step=min_step, **kwargs)
+        print("Initial points from DMST model: {}".format(
+              ", ".join("{:g}".format(p) for p in points)))
+    else:
+        points = np.linspace(start, stop, ninit)
+    nruns = 0
+    while len(points) and nruns < max_runs:
+        df, n = evaluate_points(param, points[:max_runs - nruns], fpath,
+                                jobs=jobs, threads_per_job=threads_per_job,
+                                use_cache=use_cache, conv_tol=conv_tol,
+                                conv_revs=conv_revs, **kwargs)
+        nruns += n
+        df = df[(df[col] >= start) & (df[col] <= stop)]
+        points = refine_points(df[col], df.cp, tol=tol, min_step=min_step,
+                               max_points=jobs)
+
+
+def parabola_peak(x, y):
+    """Return the location and value of the vertex of a parabola through
+    three points.
+    """
+    a, b, c = np.polyfit(x, y, 2)
+    if a == 0:
+        i = np.argmax(y)
+        return x[i], y[i]
+    x0 = -b/(2*a)
+    return x0, c - b**2/(4*a)
+
+
+def _best_point(df, col, quantity, lower, upper, param, points):
+    """Return the sorted unique values of `col` and mean `quantity` in `df`
+    within `[lower, upper]` and the index of the maximum, raising an error
+    naming the cases run for `points` if there are none.
+    """
+    df = df[(df[col] >= lower) & (df[col] <= upper)
+            & df[quantity].notnull()]
+    # Reruns at the same point are averaged
+    y = df[quantity].astype(float).groupby(df[col].astype(float)).mean()
+    x, y = y.index.values, y.values
+    if len(x) == 0:
+        raise RuntimeError("No results for {} in [{}, {}]; cases with {} = "
+                           "{} failed".format(param, lower, upper, param,
+                                              ", ".join("{:g}".format(p)
+                                                        for p in points)))
+    return x, y, int(np.argmax(y))
+
+
+def optimize(param="tsr", lower=None, upper=None, quantity="cp", xtol=0.05,
+             max_iter=10, npoints=None, jobs=1, threads_per_job=None,
+             use_cache=True, conv_tol=None, conv_revs=3, **kwargs):
+    """Find the value of `param` that maximizes `quantity` with a parallel
+    bracketed search.
+
+    Each iteration runs `npoints` (default `max(jobs, 2)`) equally spaced
+    interior points of the bracket concurrently, then shrinks the bracket to
+    the neighbors of the best point found so far, until it is narrower than
+    `xtol` or `max_iter` iterations have been run. The optimum is estimated
+    from a parabola through the best point and its neighbors. Results are
+    logged to, and reused from, the parameter's sweep file.
+
+    Returns
+    -------
+    result : dict
+        Optimal `param` and `quantity` values with uncertainty estimates
+        `<param>_err`, half the final bracket width, and `<quantity>_err`,
+        the difference between the parabolic and best sampled values.
+    """
+    print("Optimizing {} for maximum {}".format(param, quantity))
+    if npoints is None:
+        npoints = max(jobs, 2)
+    fpath = sweep_fpath(param, kwargs["foildata"], kwargs["dynamic_stall"])
+    col = PARAM_COLS.get(param, param)
+    a, b = float(lower), float(upper)
+    points = np.linspace(a, b, npoints + 2)
+    for n in range(max(max_iter, 1)):
+        df, _ = evaluate_points(param, points, fpath, jobs=jobs,
+                                threads_per_job=threads_per_job,
+                                use_cache=use_cache, conv_tol=conv_tol,
+                                conv_revs=conv_revs, **kwargs)
+        evaluated = points
+        x, y, i = _best_point(df, col, quantity, lower, upper, param,
+                              evaluated)
+        a, b = x[max(i - 1, 0)], x[min(i + 1, len(x) - 1)]
+        print("Iteration {}: best {} = {} at {} = {}; bracket [{}, {}]".format(
+              n + 1, quantity, y[i], param, x[i], a, b))
+        if b - a < xtol:
+            break
+        points = np.round(np.linspace(a, b, npoints + 2)[1:-1], decimals=6)
+    # Fit the results of the last iteration
+    x, y, i = _best_point(df, col, quantity, lower, upper, param,
+                          evaluated)
+    if 0 < i and i + 1 < len(x):
+        x_opt, y_opt = parabola_peak(x[i-1:i+2], y[i-1:i+2])
+    else:
+        x_opt, y_opt = x[i], y[i]
+    result = {param: float(x_opt), quantity: float(y_opt),
+              param + "_err": float(b - a)/2,
+              quantity + "_err": float(abs(y_opt - y[i]))}
+    print("Optimum {0} = {1:.3f} +/- {2:.3f} at {3} = {4:.3f} +/- {5:.3f}"
+          .format(quantity, y_opt, result[quantity + "_err"], param, x_opt,
+                  result[param + "_err"]))
+    return result
+
+
+def load_design(fpath):
+    """Load a sweep design specification from a JSON or YAML file.
+
+    The specification has the form::
+
+        {"name": "tsr-u_infty",
+         "design": "factorial",
+         "params": {"tsr": {"start": 1.1, "stop": 4.7, "step": 0.5},
+                    "u_infty": [0.6, 1.0, 1.4],
+                    "foildata": ["Sheldahl", "Jacobs"]}}
+
+    where each parameter is either a list of values or a range. For a
+    `"lhs"` (Latin hypercube) design, ranges are given as `"lower"` and
+    `"upper"` bounds, and `"samples"` and optionally `"seed"` are set.
+    """
+    with open(fpath) as f:
+        if os.path.splitext(fpath)[-1] in [".yml", ".yaml"]:
+            import yaml
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def expand_design(spec):
+    """Expand a sweep design specification (see `load_design`) into a list
+    of dictionaries of case parameters.
+    """
+    params = spec["params"]
+    names = sorted(params)
+    design = spec.get("design", "factorial")
+    if design == "factorial":
+        values = []
+        for name in names:
+            p = params[name]
+            if isinstance(p, dict):
+                dtype = int if name in INT_PARAMS else float
+                p = np.arange(p["start"], p["stop"], p["step"], dtype=dtype)
+            values.append(list(p))
+        grids = np.meshgrid(*[np.arange(len(v)) for v in values],
+                            indexing="ij")
+        index = np.column_stack([g.ravel() for g in grids])
+    elif design == "lhs":
+        n = int(spec["samples"])
+        rng = np.random.RandomState(spec.get("seed"))
+        # One stratified, randomly permuted sample per parameter in [0, 1)
+        u = (np.argsort(rng.rand(len(names), n), axis=1)
+             + rng.rand(len(names), n))/n
+        values = []
+        index = np.zeros((n, len(names)), dtype=int)
+        for j, name in enumerate(names):
+            p = params[name]
+            if isinstance(p, dict):
+                x = p["lower"] + u[j]*(p["upper"] - p["lower"])
+                if name in INT_PARAMS:
+                    x = np.round(x).astype(int)
+                values.append(list(x))
+                index[:, j] = np.arange(n)
+            else:
+                values.append(list(p))
+                index[:, j] = (u[j]*len(p)).astype(int)
+    else:
+        raise ValueError("Unknown design type: {}".format(design))
+    cases = []
+    for row in index:
+        case = {}
+        for name, v, i in zip(names, values, row):
+            val = v[i]
+            if isinstance(val, (np.integer, np.floating)):
+                val = val.item()
+            case[name] = val
+        cases.append(case)
+    return cases
+
+
+def design_sweep(spec, overwrite=False, append=False, resume=False, jobs=1,
+                 threads_per_job=None, use_cache=True, conv_tol=None,
+                 conv_revs=3, cp_min=None, dry_run=False, **kwargs):
+    """Run all cases of a multi-parameter sweep design as one job set,
+    writing results to a single table `processed/<name>_design.csv` with all
+    case parameters as columns.
+
+    Parameters not varied by the design are taken from `kwargs`. See
+    `param_sweep` for `cp_min` and `dry_run`.
+    """
+    names = sorted(spec["params"])
+    name = spec.get("name", "-".join(names))
+    print("Running {} design with {}".format(spec.get("design", "factorial"),
+                                            ", ".join(names)))
+    fpath = "processed/{}_design.csv".format(name)
+    if os.path.isfile(fpath) and not resume and not dry_run:
+        if not overwrite and not append:
+            sys.exit("{} design results present; remove, --append, or "
+                     "--overwrite".format(name))
+        if not append or overwrite:
+            clear_results(fpath)
+    cases = []
+    for point in expand_design(spec):
+        args = kwargs.copy()
+        args.update(point)
+        args["case_dir"] = os.path.join(RUNS_DIR, case_dir_name(**args))
+        cases.append(args)
+    if cp_min is not None or dry_run:
+        cases = prescreen(cases, cp_min=cp_min)
+        if dry_run:
+            return
+    print("Running {} cases".format(len(cases)))
+    run_cases(cases, fpath, jobs=jobs, threads_per_job=threads_per_job,
+              sort_by=[PARAM_COLS.get(n, n) for n in names],
+              journal=journal_path(fpath), resume=resume, use_cache=use_cache,
+              conv_tol=conv_tol, conv_revs=conv_revs)
+
+
+def wall_study(wall_ds, iwall=(0,), faces=None, tol=0.005, overwrite=False,
+               resume=False, jobs=1, threads_per_job=None, use_cache=True,
+               conv_tol=None, conv_revs=3, **kwargs):
+    """Run a wall resolution study over grid spacings `wall_ds` and wall
+    update intervals `iwall`, writing results to `processed/wall_study.csv`.
+
+    The spacing of the faces in `faces` (all faces by default) is varied
+    together; other faces keep the spacing given in `kwargs`.
+
+    Returns the table from `wall_study_report`.
+    """
+    if faces is None:
+        faces = list(QUADS)
+    fpath = "processed/wall_study.csv"
+    if os.path.isfile(fpath) and not resume:
+        if not overwrite:
+            sys.exit("Wall study results present; remove, --resume, or "
+                     "--overwrite")
+        clear_results(fpath)
+    kwargs["walls"] = 1
+    cases = []
+    for ds in wall_ds:
+        for n in iwall:
+            args = dict(kwargs, iwall=n)
+            args.update({"wall_ds_" + face: ds for face in faces})
+            args["case_dir"] = os.path.join(RUNS_DIR, case_dir_name(**args))
+            cases.append(args)
+    print("Running wall study with {} cases".format(len(cases)))
+    run_cases(cases, fpath, jobs=jobs, threads_per_job=threads_per_job,
+              sort_by=WALL_DS_PARAMS + ["iwall"], journal=journal_path(fpath),
+              resume=resume, use_cache=use_cache, conv_tol=conv_tol,
+              conv_revs=conv_revs)
+    return wall_study_report(fpath, tol=tol)
+
+
+def wall_study_report(fpath="processed/wall_study.csv", tol=0.005):
+    """Compare the results of a wall resolution study with those of its
+    finest wall mesh and most frequent wall updates.
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        Spacing, update interval, number of wall panels, power and drag
+        coefficients and their differences from the reference case, and
+        solver time relative to the reference case. Cases whose power and
+        drag coefficients are within `tol` of the reference are marked
+        `accurate`.
+    """
+    from scripts.makewalls import wall_coords
+    df = pd.read_csv(fpath)
+    ds = df[WALL_DS_PARAMS]
+    df["wall_panels"] = [
+        sum((x.shape[0] - 1)*(x.shape[1] - 1)
+            for x, _, _ in wall_coords(ds=dict(zip(QUADS, row))))
+        for row in ds.values]
+    ref = df.sort_values(["wall_panels", "iwall"],
+                         ascending=[False, True]).iloc[0]
+    df["cp_diff"] = df.cp - ref.cp
+    df["cd_diff"] = df.cd - ref.cd
+    df["rel_solver_time"] = df.solver_time/ref.solver_time
+    df["accurate"] = (df.cp_diff.abs() < tol) & (df.cd_diff.abs() < tol)
+    cols = WALL_DS_PARAMS + ["iwall", "wall_panels", "cp", "cd", "cp_diff",
+                             "cd_diff", "solver_time", "rel_solver_time",
+                             "accurate"]
+    df = df[cols]
+    print(df.to_string(index=False, float_format="{:.4g}".format))
+    accurate = df[df.accurate]
+    if len(accurate):
+        best = accurate.sort_values("solver_time").iloc[0]
+        print("Cheapest case within {} of the reference: {} with "
+              "iwall={} ({:.2g} times the reference solver time)".format(
+              tol, ", ".join("{}={:g}".format(p, best[p])
+                             for p in WALL_DS_PARAMS),
+              int(best.iwall), best.rel_solver_time))
+    return df
 
 
 if __name__ == "__main__":
@@ -139,8 +1425,44 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run CACTUS for the RM2.")
     parser.add_argument("--tsr", default=3.1, type=float,
                         help="Tip speed ratio")
-    parser.add_argument("--param-sweep", "-p", nargs=4,
-                        help="Run parameter sweep [name] [start] [stop] [step]")
+    parser.add_argument("--param-sweep", "-p", nargs=4, action="append",
+                        help="Run parameter sweep [name] [start] [stop] "
+                        "[step]; repeat for a multi-parameter design")
+    parser.add_argument("--design", help="Sweep design specification file "
+                        "(JSON or YAML)")
+    parser.add_argument("--design-type", default="factorial",
+                        choices=["factorial", "lhs"],
+                        help="Design type for repeated --param-sweep options")
+    parser.add_argument("--samples", type=int, default=10,
+                        help="Number of samples for Latin hypercube designs")
+    parser.add_argument("--adaptive-sweep", nargs=3,
+                        help="Run adaptive parameter sweep [name] [start] "
+                        "[stop]")
+    parser.add_argument("--n-initial", type=int, default=5,
+                        help="Initial points for adaptive sweep")
+    parser.add_argument("--sweep-tol", type=float, default=0.005,
+                        help="C_P interpolation error tolerance for adaptive "
+                        "sweep")
+    parser.add_argument("--min-step", type=float, default=0.05,
+                        help="Smallest point spacing for adaptive sweep")
+    parser.add_argument("--max-runs", type=int, default=20,
+                        help="Maximum number of runs for adaptive sweep")
+    parser.add_argument("--seed-dmst", default=False, action="store_true",
+                        help="Choose initial adaptive sweep points with the "
+                        "DMST model")
+    parser.add_argument("--prescreen", default=False, action="store_true",
+                        help="Print DMST model predictions for sweep cases "
+                        "without running them")
+    parser.add_argument("--cp-min", type=float,
+                        help="Skip sweep cases with DMST predicted C_P below "
+                        "this")
+    parser.add_argument("--optimize", nargs=3,
+                        help="Find value of parameter maximizing C_P [name] "
+                        "[lower] [upper]")
+    parser.add_argument("--xtol", type=float, default=0.05,
+                        help="Bracket width at which to stop optimizing")
+    parser.add_argument("--max-iter", type=int, default=10,
+                        help="Maximum optimization iterations")
     parser.add_argument("--dynamic-stall", "-d", default=2, type=int,
                         help="Dynamic stall model; 0: None, 1: BV, 2: LB",
                         choices=[0, 1, 2])
@@ -153,6 +1475,23 @@ if __name__ == "__main__":
     parser.add_argument("--tp", type=float, default=1.7,
                         help="Leishman-Beddoes DS model Tp time constant")
     parser.add_argument("--no-walls", default=False, action="store_true")
+    parser.add_argument("--wall-ds", type=float,
+                        help="Wall grid spacing normalized by R")
+    parser.add_argument("--wall-face-ds", nargs=2, action="append",
+                        metavar=("FACE", "DS"),
+                        help="Wall grid spacing for one face ({}); may be "
+                        "repeated".format(", ".join(QUADS)))
+    parser.add_argument("--iwall", type=int,
+                        help="Time steps between wall model updates")
+    parser.add_argument("--wall-study", nargs="+", type=float, metavar="DS",
+                        help="Run wall resolution study over grid spacings")
+    parser.add_argument("--wall-study-iwall", nargs="+", type=int,
+                        default=[0], metavar="IWALL",
+                        help="Wall update intervals for wall study")
+    parser.add_argument("--wall-study-faces", nargs="+", choices=list(QUADS),
+                        help="Faces whose spacing is varied in wall study")
+    parser.add_argument("--wall-tol", type=float, default=0.005,
+                        help="C_P and C_D tolerance for wall study")
     parser.add_argument("--foil-data", default="Sheldahl",
                         choices=["Sheldahl", "Jacobs", "XFOIL"],
                         help="Foil coefficient database")
@@ -160,31 +1499,135 @@ if __name__ == "__main__":
                         help="Overwrite existing results")
     parser.add_argument("--append", "-a", default=False, action="store_true",
                         help="Append if running parameter sweep")
+    parser.add_argument("--resume", default=False, action="store_true",
+                        help="Resume an interrupted sweep from its journal")
+    parser.add_argument("--case-dir", "-C", default=".",
+                        help="Run directory for a single case")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="Number of cases to run concurrently")
+    parser.add_argument("--threads-per-job", type=int,
+                        help="OpenMP threads per case (default: cores/jobs)")
+    parser.add_argument("--no-cache", default=False, action="store_true",
+                        help="Always run CACTUS, ignoring cached results")
+    parser.add_argument("--timing-summary", nargs="?", const=RUNS_DIR,
+                        metavar="DIR",
+                        help="Summarize stage timing of all runs in DIR")
+    parser.add_argument("--export-results", default=False,
+                        action="store_true",
+                        help="Export all results in the database to CSV")
+    parser.add_argument("--conv-tol", type=float,
+                        help="Stop once mean C_P and C_D change by less than "
+                        "this over --conv-revs revolutions")
+    parser.add_argument("--conv-revs", type=int, default=3,
+                        help="Revolutions over which to check convergence")
 
     args = parser.parse_args()
 
+    if args.export_results:
+        export_all_results()
+        sys.exit()
+
+    if args.timing_summary:
+        timing_summary(args.timing_summary)
+        sys.exit()
+
     walls = not args.no_walls
-    if walls:
-        call(["python", "./scripts/makewalls.py"])
+    wall_kwargs = {}
+    if args.wall_ds is not None:
+        wall_kwargs["wall_ds"] = args.wall_ds
+    for face, ds in args.wall_face_ds or []:
+        if face not in QUADS:
+            sys.exit("Unknown wall face: {}".format(face))
+        wall_kwargs["wall_ds_" + face] = float(ds)
+    if args.iwall is not None:
+        wall_kwargs["iwall"] = args.iwall
+
+    if args.design:
+        design = load_design(args.design)
+    elif args.param_sweep and len(args.param_sweep) > 1:
+        design = {"design": args.design_type, "samples": args.samples,
+                  "params": {}}
+        for name, start, stop, step in args.param_sweep:
+            if args.design_type == "lhs":
+                p = {"lower": float(start), "upper": float(stop)}
+            else:
+                p = {"start": float(start), "stop": float(stop),
+                     "step": float(step)}
+            design["params"][name] = p
+    else:
+        design = None
 
-    if args.foil_data == "Jacobs":
-        print("Creating hybrid Jacobs foil coefficient database")
-        call(["python", "./scripts/jacobs-data.py"])
+    foildata = [args.foil_data]
+    if design is not None:
+        foildata += list(design["params"].get("foildata", []))
+    for name in sorted(set(foildata) & set(FOIL_SPECS)):
+        if build_foildata(name):
+            print("Created {} foil coefficient database".format(name))
 
-    if args.param_sweep:
-        name, start, stop, step = args.param_sweep
-        if name in ["nti", "nbelem", "dynamic_stall"]:
+    if args.wall_study:
+        wall_study(args.wall_study, iwall=args.wall_study_iwall,
+                   faces=args.wall_study_faces, tol=args.wall_tol,
+                   overwrite=args.overwrite, resume=args.resume,
+                   jobs=args.jobs, threads_per_job=args.threads_per_job,
+                   use_cache=not args.no_cache, conv_tol=args.conv_tol,
+                   conv_revs=args.conv_revs, tsr=args.tsr, tp=args.tp,
+                   dynamic_stall=args.dynamic_stall, u_infty=args.u_infty,
+                   nti=args.nti, nbelem=args.nbelem, foildata=args.foil_data,
+                   **{k: v for k, v in wall_kwargs.items() if k != "iwall"})
+    elif design is not None:
+        design_sweep(design, append=args.append, overwrite=args.overwrite,
+                     resume=args.resume,
+                     jobs=args.jobs, threads_per_job=args.threads_per_job,
+                     use_cache=not args.no_cache, conv_tol=args.conv_tol,
+                     conv_revs=args.conv_revs, cp_min=args.cp_min,
+                     dry_run=args.prescreen, tsr=args.tsr, tp=args.tp,
+                     dynamic_stall=args.dynamic_stall, u_infty=args.u_infty,
+                     nti=args.nti, nbelem=args.nbelem, walls=int(walls),
+                     foildata=args.foil_data, **wall_kwargs)
+    elif args.param_sweep:
+        name, start, stop, step = args.param_sweep[0]
+        if name in INT_PARAMS:
             dtype = int
         else:
             dtype = float
         start, stop, step = dtype(start), dtype(stop), dtype(step)
         param_sweep(name, start=start, stop=stop, step=step, dtype=dtype,
                     append=args.append, overwrite=args.overwrite, tp=args.tp,
-                    dynamic_stall=args.dynamic_stall, u_infty=args.u_infty,
-                    nti=args.nti, nbelem=args.nbelem, walls=int(walls),
-                    foildata=args.foil_data)
+                    resume=args.resume,
+                    jobs=args.jobs, threads_per_job=args.threads_per_job,
+                    use_cache=not args.no_cache, conv_tol=args.conv_tol,
+                    conv_revs=args.conv_revs, cp_min=args.cp_min,
+                    dry_run=args.prescreen, dynamic_stall=args.dynamic_stall,
+                    u_infty=args.u_infty, nti=args.nti, nbelem=args.nbelem,
+                    walls=int(walls), foildata=args.foil_data, **wall_kwargs)
+    elif args.adaptive_sweep:
+        name, start, stop = args.adaptive_sweep
+        adaptive_sweep(name, start=float(start), stop=float(stop),
+                       ninit=args.n_initial, tol=args.sweep_tol,
+                       min_step=args.min_step, max_runs=args.max_runs,
+                       overwrite=args.overwrite, jobs=args.jobs,
+                       threads_per_job=args.threads_per_job,
+                       use_cache=not args.no_cache, conv_tol=args.conv_tol,
+                       conv_revs=args.conv_revs, seed=args.seed_dmst,
+                       tp=args.tp, dynamic_stall=args.dynamic_stall,
+                       u_infty=args.u_infty, nti=args.nti,
+                       nbelem=args.nbelem, walls=int(walls),
+                       foildata=args.foil_data, **wall_kwargs)
+    elif args.optimize:
+        name, lower, upper = args.optimize
+        optimize(name, lower=float(lower), upper=float(upper), xtol=args.xtol,
+                 max_iter=args.max_iter, jobs=args.jobs,
+                 threads_per_job=args.threads_per_job,
+                 use_cache=not args.no_cache, conv_tol=args.conv_tol,
+                 conv_revs=args.conv_revs, tp=args.tp,
+                 dynamic_stall=args.dynamic_stall, u_infty=args.u_infty,
+                 nti=args.nti, nbelem=args.nbelem, walls=int(walls),
+                 foildata=args.foil_data, **wall_kwargs)
     else:
         run_cactus(tsr=args.tsr, dynamic_stall=args.dynamic_stall,
                    u_infty=args.u_infty, overwrite=args.overwrite, tp=args.tp,
                    nti=args.nti, nbelem=args.nbelem, walls=int(walls),
-                   foildata=args.foil_data)
+                   foildata=args.foil_data, case_dir=args.case_dir,
+                   nthreads=args.threads_per_job, use_cache=not args.no_cache,
+                   conv_tol=args.conv_tol, conv_revs=args.conv_revs,
+                   **wall_kwargs)
@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+"""Double-multiple streamtube (DMST) model of the RM2 for estimating
+performance curves in milliseconds, e.g., to pre-screen CACTUS sweeps.
+
+The rotor is divided into `nz` horizontal strips, each with the local chord
+of the tapered blades, and each strip into `nstreamtubes` streamtubes across
+the upstream and downstream halves of the swept circle. The induction factor
+of every streamtube is found by equating the time-averaged blade force to
+the momentum deficit of an actuator disk, first upstream, then downstream in
+the wake of the upstream half. Static lift and drag come from the same CACTUS
+foil coefficient files as the simulations, interpolated in Reynolds number
+and angle of attack. Strut drag is included; dynamic stall, tip losses, and
+blockage are not.
+
+All cases are solved at once as NumPy arrays, so evaluating a grid of tip
+speed ratios, free stream velocities, and foil databases costs about as much
+as a single case.
+"""
+
+from __future__ import division, print_function
+import time
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+from scripts.makegeom import R_m as R, HR, NBlade, NStrut, CT, CR, CRs
+from scripts import foildata as foildata_db
+
+H = HR*R
+NU = 1e-6
+
+# Angles of attack (deg) at which all foil coefficient tables are resampled
+ALPHA_DEG = np.arange(-180.0, 180.01, 0.5)
+
+# Bounds of streamtube velocity ratios, beyond which momentum theory fails
+U_MIN = 0.2
+U_MAX = 1.5
+
+
+@lru_cache(maxsize=None)
+def foil_tables(foildata=("Sheldahl",)):
+    """Load CACTUS foil coefficient databases (see `scripts/foildata.py`)
+    resampled onto a common grid.
+
+    Each database is resampled to `ALPHA_DEG` and the Reynolds numbers of
+    all databases, holding the nearest table constant outside a database's
+    Reynolds number range. Tables are loaded once per process.
+
+    Returns
+    -------
+    log_re : numpy.ndarray
+        Natural logarithm of the Reynolds numbers of the grid.
+    coeffs : numpy.ndarray
+        Lift and drag coefficients of shape (nfoil, nre, nalpha, 2).
+    """
+    dbs = [foildata_db.load("NACA_0021_{}.dat".format(name))
+           for name in foildata]
+    re = np.unique(np.concatenate([db["re"] for db in dbs]))
+    coeffs = np.zeros((len(dbs), len(re), len(ALPHA_DEG), 2))
+    for i, db in enumerate(dbs):
+        cl, cd, _ = foildata_db.lookup(db, re[:, None], ALPHA_DEG)
+        coeffs[i] = np.stack([cl, cd], axis=-1)
+    return np.log(re), coeffs
+
+
+def lookup(tables, ifoil, re, alpha_deg):
+    """Bilinearly interpolate lift and drag coefficients in log Reynolds
+    number and angle of attack, with `ifoil`, `re`, and `alpha_deg`
+    broadcast together.
+    """
+    log_re, coeffs = tables
+    nre, nalpha = coeffs.shape[1:3]
+    x = np.interp(np.log(re), log_re, np.arange(nre))
+    i = np.minimum(x.astype(int), max(nre - 2, 0))
+    wi = (x - i)[..., None]
+    y = np.clip((alpha_deg - ALPHA_DEG[0])/(ALPHA_DEG[1] - ALPHA_DEG[0]), 0,
+                nalpha - 1)
+    j = np.minimum(y.astype(int), nalpha - 2)
+    wj = (y - j)[..., None]
+    i1 = np.minimum(i + 1, nre - 1)
+    c = ((1 - wi)*((1 - wj)*coeffs[ifoil, i, j] + wj*coeffs[ifoil, i, j + 1])
+         + wi*((1 - wj)*coeffs[ifoil, i1, j] + wj*coeffs[ifoil, i1, j + 1]))
+    return c[..., 0], c[..., 1]
+
+
+def blade_chord(nz=8):
+    """Return the blade chord in m at the center of each of `nz` equal
+    spanwise strips, tapering linearly from root at midspan to tip.
+    """
+    z = (np.arange(nz) + 0.5)/nz - 0.5
+    return R*(CR + (CT - CR)*np.abs(2*z))
+
+
+def _blade_forces(tables, ifoil, psi, v, omega_r, chord):
+    """Return the relative velocity squared and the tangential and
+    streamwise force coefficients of blade elements at azimuth `psi` in a
+    local streamwise velocity `v`.
+    """
+    w_t = v*np.sin(psi) + omega_r
+    w_n = v*np.cos(psi)
+    w2 = w_t**2 + w_n**2
+    alpha = np.arctan2(w_n, w_t)
+    cl, cd = lookup(tables, ifoil, np.sqrt(w2)*chord/NU,
+                    np.rad2deg(alpha))
+    cn = cl*np.cos(alpha) + cd*np.sin(alpha)
+    ct = cl*np.sin(alpha) - cd*np.cos(alpha)
+    return w2, ct, cn*np.cos(psi) - ct*np.sin(psi)
+
+
+def _solve_half(tables, ifoil, psi, v_in, omega_r, chord, niter, relax,
+                tol):
+    """Solve for the velocity ratio of each streamtube in one half of the
+    rotor by fixed-point iteration of the momentum balance
+    `u = 1/(1 + g(u))`. Only streamtubes that have not yet converged are
+    updated in each iteration.
+    """
+    shape = np.broadcast(ifoil, psi, v_in, omega_r, chord).shape
+    ifoil, psi, v_in, omega_r, chord = [np.broadcast_to(a, shape).ravel()
+                                        for a in (ifoil, psi, v_in, omega_r,
+                                                  chord)]
+    k = NBlade*chord/(8*np.pi*R*np.abs(np.cos(psi)))
+    u = np.ones(len(psi))
+    active = np.arange(len(psi))
+    for n in range(niter):
+        i = active
+        v = u[i]*v_in[i]
+        w2, ct, fx = _blade_forces(tables, ifoil[i], psi[i], v, omega_r[i],
+                                   chord[i])
+        g = k[i]*w2*fx/v**2
+        with np.errstate(divide="ignore"):
+            u_new = np.where(1 + g > 0, 1/(1 + g), U_MAX)
+        u_new = (1 - relax)*u[i] + relax*np.clip(u_new, U_MIN, U_MAX)
+        converged = np.abs(u_new - u[i]) < tol
+        u[i] = u_new
+        active = i[~converged]
+        if not len(active):
+            break
+    w2, ct, fx = _blade_forces(tables, ifoil, psi, u*v_in, omega_r, chord)
+    return [a.reshape(shape) for a in (u, w2, ct, fx)]
+
+
+def dmst(tsr, u_infty=1.0, ifoil=0, tables=None, nz=8, nstreamtubes=36,
+         niter=100, relax=0.9, tol=1e-4):
+    """Compute power and drag coefficients with the DMST model.
+
+    Parameters
+    ----------
+    tsr, u_infty, ifoil : array_like
+        Tip speed ratios, free stream velocities (m/s), and indices into the
+        foil databases of `tables`, broadcast together.
+    tables : tuple
+        Foil coefficient tables from `foil_tables`; Sheldahl by default.
+
+    Returns
+    -------
+    cp, cd : numpy.ndarray
+        Power and drag coefficients with the broadcast shape of the inputs.
+    """
+    if tables is None:
+        tables = foil_tables()
+    tsr, u_infty, ifoil = np.broadcast_arrays(np.asarray(tsr, dtype=float),
+                                              np.asarray(u_infty,
+                                                         dtype=float),
+                                              np.asarray(ifoil, dtype=int))
+    shape = tsr.shape
+    # Case axes first, then strips and streamtubes
+    expand = (Ellipsis, None, None)
+    tsr, u_infty, ifoil = tsr[expand], u_infty[expand], ifoil[expand]
+    # Strips with the same chord are identical, so each is solved once
+    chord, nstrips = np.unique(blade_chord(nz), return_counts=True)
+    chord, nstrips = chord[:, None], nstrips[:, None]
+    dpsi = np.pi/nstreamtubes
+    psi_up = np.pi/2 + (np.arange(nstreamtubes) + 0.5)*dpsi
+    psi_down = np.pi - psi_up
+    omega_r = tsr*u_infty
+    u_up, w2_up, ct_up, fx_up = _solve_half(tables, ifoil, psi_up, u_infty,
+                                            omega_r, chord, niter, relax, tol)
+    # Downstream streamtubes see the equilibrium velocity between the disks
+    v_eq = u_infty*np.maximum(2*u_up - 1, U_MIN)
+    u_down, w2_down, ct_down, fx_down = _solve_half(tables, ifoil, psi_down,
+                                                    v_eq, omega_r, chord,
+                                                    niter, relax, tol)
+    scale = NBlade*dpsi*H/nz/(2*np.pi*2*R*H)/u_infty[..., 0, 0]**2
+    cp = tsr[..., 0, 0]*scale*np.sum(nstrips*chord*(w2_up*ct_up
+                                                    + w2_down*ct_down),
+                                     axis=(-2, -1))
+    cd = scale*np.sum(nstrips*chord*(w2_up*fx_up + w2_down*fx_down),
+                      axis=(-2, -1))
+    # Strut drag at zero angle of attack, ignoring the free stream
+    r = (np.arange(8) + 0.5)/8
+    chord_s = CRs*R
+    omega_r_s = omega_r[..., 0]*r
+    _, cd_s = lookup(tables, ifoil[..., 0], omega_r_s*chord_s/NU, 0.0)
+    cp -= NStrut*chord_s*R*tsr[..., 0, 0]**3*np.sum(r**3*cd_s/8,
+                                                     axis=-1)/(2*R*H)
+    return cp.reshape(shape), cd.reshape(shape)
+
+
+def performance(tsr, u_infty=1.0, foildata="Sheldahl", **kwargs):
+    """Compute power and drag coefficients for every combination of tip speed
+    ratio, free stream velocity, and foil database.
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        Columns `foildata`, `u_infty`, `tsr`, `cp`, and `cd`.
+    """
+    foildata = [foildata] if isinstance(foildata, str) else list(foildata)
+    tsr = np.atleast_1d(np.asarray(tsr, dtype=float))
+    u_infty = np.atleast_1d(np.asarray(u_infty, dtype=float))
+    ifoil, u, t = np.meshgrid(np.arange(len(foildata)), u_infty, tsr,
+                              indexing="ij")
+    cp, cd = dmst(t, u, ifoil, tables=foil_tables(tuple(foildata)),
+                  **kwargs)
+    return pd.DataFrame({"foildata": np.array(foildata)[ifoil.ravel()],
+                         "u_infty": u.ravel(), "tsr": t.ravel(),
+                         "cp": cp.ravel(), "cd": cd.ravel()},
+                        columns=["foildata", "u_infty", "tsr", "cp", "cd"])
+
+
+def predict(cases, **kwargs):
+    """Compute power and drag coefficients for a list of case parameter
+    dictionaries, using their `tsr`, `u_infty`, and `foildata` values.
+    """
+    foildata = sorted(set(c.get("foildata", "Sheldahl") for c in cases))
+    tsr = [c.get("tsr", 3.1) for c in cases]
+    u_infty = [c.get("u_infty", 1.0) for c in cases]
+    ifoil = [foildata.index(c.get("foildata", "Sheldahl")) for c in cases]
+    return dmst(tsr, u_infty, ifoil, tables=foil_tables(tuple(foildata)),
+                **kwargs)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Compute RM2 performance "
+                                     "curves with a DMST model.")
+    parser.add_argument("--tsr", nargs=3, type=float, default=[0.5, 5.05, 0.1],
+                        metavar=("START", "STOP", "STEP"),
+                        help="Tip speed ratio range")
+    parser.add_argument("--u-infty", "-U", nargs="+", type=float,
+                        default=[1.0], help="Free stream velocities in m/s")
+    parser.add_argument("--foil-data", nargs="+", default=["Sheldahl"],
+                        help="Foil coefficient databases")
+    parser.add_argument("--output", "-o", help="Save results to CSV")
+    args = parser.parse_args()
+
+    tsr = np.arange(*args.tsr)
+    foil_tables(tuple(args.foil_data))
+    t0 = time.time()
+    df = performance(tsr, args.u_infty, args.foil_data)
+    dt = time.time() - t0
+    for (foildata, u_infty), d in df.groupby(["foildata", "u_infty"]):
+        i = d.cp.idxmax()
+        print("{} at {} m/s: max C_P = {:.3f} at TSR = {:.2f} (C_D = "
+              "{:.3f})".format(foildata, u_infty, d.cp[i], d.tsr[i],
+                               d.cd[i]))
+    print("Computed {} cases in {:.1f} ms".format(len(df), 1000*dt))
+    if args.output:
+        df.to_csv(args.output, index=False)
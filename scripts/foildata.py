@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+"""Load all foil coefficient data in `config/foildata` into arrays indexed by
+Reynolds number and angle of attack.
+
+Each source is a database named after its files: CSV tables
+`NACA_<foil>_<source>_<Re>.csv` are grouped as `NACA_<foil>_<source>`,
+CACTUS input files keep their file name, e.g., `NACA_0021_Sheldahl.dat`, the
+raw XFOIL polars are `NACA_0021_XFOIL-raw`, and the Gregorek wind tunnel data
+are `NACA_0021_Gregorek`. A database is a dictionary of arrays:
+
+* `re`: Reynolds numbers of the tables, sorted.
+* `alpha_deg`: all angles of attack of the tables, sorted.
+* `coeffs`: `cl`, `cd`, and `cm` of shape (nre, nalpha, 3), interpolated in
+  angle of attack within each table's range and NaN outside it or where a
+  coefficient was not measured.
+* `raw`: the original angle of attack, `cl`, `cd`, and `cm` rows of all
+  tables, with table `i` in rows `offsets[i]:offsets[i + 1]`.
+
+All databases are read once per process, and saved to `cache/foildata.npz`,
+which is reused until any source file changes.
+"""
+
+from __future__ import division, print_function
+import os
+import re
+import glob
+import json
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+
+FOILDATA_DIR = "config/foildata"
+CACHE_FPATH = "cache/foildata.npz"
+
+COEFFS = ["cl", "cd", "cm"]
+
+# Column names of CSV tables, normalized
+CSV_COLS = {"alpha": "alpha_deg", "cd_wake": "cd"}
+
+
+def read_dat(fpath):
+    """Read a CACTUS foil coefficient file.
+
+    Returns
+    -------
+    tables : dict
+        Array of angle of attack (deg), `cl`, `cd`, and `cm` rows for each
+        Reynolds number.
+    """
+    tables = {}
+    rows = None
+    with open(fpath) as f:
+        for line in f:
+            if line.startswith("Reynolds Number:"):
+                rows = []
+                tables[float(line.split(":")[1])] = rows
+            elif line.startswith("AOA") or ":" in line:
+                continue
+            elif rows is not None and line.strip():
+                rows.append([float(v) for v in line.split()[:4]])
+    return {re: np.array(rows) for re, rows in tables.items()}
+
+
+def read_xfoil_polar(fpath):
+    """Read an XFOIL polar in AeroDyn format as rows of angle of attack
+    (deg), `cl`, `cd`, and `cm` (not included, so NaN).
+    """
+    with open(fpath) as f:
+        lines = f.read().splitlines()
+    # Header lines have a description after their values
+    start = max(n for n, line in enumerate(lines)
+                if "Minimum CD" in line) + 1
+    data = np.loadtxt(lines[start:], ndmin=2)
+    return np.column_stack([data[:, :3], np.full(len(data), np.nan)])
+
+
+def read_csv_table(fpath):
+    """Read a CSV foil coefficient table as rows of angle of attack (deg),
+    `cl`, `cd`, and `cm`, with NaN for missing coefficients.
+    """
+    df = pd.read_csv(fpath, skipinitialspace=True)
+    df.columns = [CSV_COLS.get(c.strip(), c.strip()) for c in df.columns]
+    cols = ["alpha_deg"] + COEFFS
+    return np.column_stack([pd.to_numeric(df[c], errors="coerce").values
+                            if c in df else np.full(len(df), np.nan)
+                            for c in cols])
+
+
+def source_files(foildata_dir=FOILDATA_DIR):
+    """Return the files of each database as a dictionary of lists of
+    `(re, fpath)`, with `re` None for files holding multiple tables.
+    """
+    sources = {}
+    for fpath in sorted(glob.glob(os.path.join(foildata_dir, "*.csv"))):
+        m = re.match(r"(NACA_\d{4}_[^_]+)_([\d.]+e\d+)\.csv$",
+                     os.path.basename(fpath))
+        name = m.group(1) if m else os.path.basename(fpath)[:-4]
+        sources.setdefault(name, []).append((float(m.group(2)) if m
+                                             else None, fpath))
+    for fpath in sorted(glob.glob(os.path.join(foildata_dir, "*.dat"))):
+        sources[os.path.basename(fpath)] = [(None, fpath)]
+    xfoil_raw_dir = os.path.join(foildata_dir, "xfoil-raw")
+    for fpath in sorted(glob.glob(os.path.join(xfoil_raw_dir, "*.dat"))):
+        m = re.match(r"(NACA) (\d{4})_T1_Re([\d.]+)_",
+                     os.path.basename(fpath))
+        name = "{}_{}_XFOIL-raw".format(m.group(1), m.group(2))
+        sources.setdefault(name, []).append((float(m.group(3))*1e6, fpath))
+    return sources
+
+
+def read_tables(files):
+    """Read the tables of a database from its files (see `source_files`)."""
+    tables = {}
+    for re_num, fpath in files:
+        if fpath.endswith(".dat") and re_num is None:
+            tables.update(read_dat(fpath))
+        elif fpath.endswith(".dat"):
+            tables[re_num] = read_xfoil_polar(fpath)
+        elif re_num is None:
+            # Wind tunnel runs at slightly different Reynolds numbers
+            # (in millions), grouped as one table
+            df = pd.read_csv(fpath)
+            re_num = float("{:.2g}".format(df.reynolds_number.median()*1e6))
+            tables[re_num] = read_csv_table(fpath)
+        else:
+            tables[re_num] = read_csv_table(fpath)
+    return tables
+
+
+def make_database(tables):
+    """Create a database (see module docstring) from a dictionary of tables
+    of angle of attack, `cl`, `cd`, and `cm` rows for each Reynolds number.
+    """
+    re_nums = np.array(sorted(tables))
+    raw = [tables[r][np.argsort(tables[r][:, 0], kind="mergesort")]
+           for r in re_nums]
+    alpha = np.unique(np.concatenate([t[:, 0] for t in raw]))
+    coeffs = np.full((len(re_nums), len(alpha), len(COEFFS)), np.nan)
+    for i, t in enumerate(raw):
+        inside = (alpha >= t[0, 0]) & (alpha <= t[-1, 0])
+        for k in range(len(COEFFS)):
+            ok = ~np.isnan(t[:, k + 1])
+            if ok.sum():
+                coeffs[i, inside, k] = np.interp(alpha[inside], t[ok, 0],
+                                                 t[ok, k + 1])
+    return {"re": re_nums, "alpha_deg": alpha, "coeffs": coeffs,
+            "raw": np.vstack(raw),
+            "offsets": np.cumsum([0] + [len(t) for t in raw])}
+
+
+def _signature(files):
+    return [[os.path.relpath(fpath, FOILDATA_DIR), os.path.getsize(fpath),
+             os.stat(fpath).st_mtime_ns] for fpath in files]
+
+
+@lru_cache(maxsize=None)
+def load_all(use_cache=True):
+    """Load all foil coefficient databases, from `CACHE_FPATH` if it is up
+    to date.
+
+    Returns
+    -------
+    databases : dict
+        Database (see module docstring) for each name.
+    """
+    sources = source_files()
+    sig = json.dumps(_signature([f for files in sources.values()
+                                 for _, f in files]))
+    fields = ["re", "alpha_deg", "coeffs", "raw", "offsets"]
+    if use_cache and os.path.isfile(CACHE_FPATH):
+        try:
+            with np.load(CACHE_FPATH) as data:
+                if str(data["signature"]) == sig:
+                    return {name: {f: data["{}__{}".format(name, f)]
+                                   for f in fields}
+                            for name in data["names"].astype(str)}
+        except (IOError, ValueError, KeyError):
+            pass
+    databases = {name: make_database(read_tables(files))
+                 for name, files in sources.items()}
+    if use_cache:
+        cache_dir = os.path.dirname(CACHE_FPATH)
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        arrays = {"{}__{}".format(name, f): db[f]
+                  for name, db in databases.items() for f in fields}
+        tmp = "{}.tmp{}.npz".format(CACHE_FPATH, os.getpid())
+        np.savez(tmp, names=np.array(sorted(databases)),
+                 signature=np.array(sig), **arrays)
+        os.replace(tmp, CACHE_FPATH)
+    return databases
+
+
+def load(name="NACA_0021_Sheldahl"):
+    """Load a foil coefficient database by name."""
+    databases = load_all()
+    if name not in databases:
+        # Files may have been created since the databases were loaded
+        load_all.cache_clear()
+        databases = load_all()
+    if name not in databases:
+        raise KeyError("No foil data named {}; available: {}".format(
+                       name, ", ".join(sorted(databases))))
+    return databases[name]
+
+
+def table(db, re_num):
+    """Return the original table with Reynolds number nearest `re_num` as a
+    DataFrame with columns `alpha_deg`, `cl`, `cd`, and `cm`.
+    """
+    if isinstance(db, str):
+        db = load(db)
+    i = np.argmin(np.abs(np.log(db["re"]/re_num)))
+    rows = db["raw"][db["offsets"][i]:db["offsets"][i + 1]]
+    return pd.DataFrame(rows, columns=["alpha_deg"] + COEFFS)
+
+
+def _blend(a, b, w):
+    """Linearly interpolate between `a` and `b`, ignoring `b` (which may be
+    NaN) where its weight `w` is zero.
+    """
+    return np.where(w == 0, a, (1 - w)*a + w*b)
+
+
+def lookup(db, re_num, alpha_deg, symmetric=False):
+    """Bilinearly interpolate foil coefficients in log Reynolds number and
+    angle of attack, for any shape of `re_num` and `alpha_deg` arrays, which
+    are broadcast together. Reynolds numbers outside the database are
+    clamped to its range.
+
+    With `symmetric`, coefficients at negative angles of attack are taken
+    from positive angles, with the sign of `cl` and `cm` reversed, for
+    databases of symmetric foils covering only positive angles.
+
+    Returns
+    -------
+    cl, cd, cm : numpy.ndarray
+    """
+    if isinstance(db, str):
+        db = load(db)
+    re_nums, alpha, coeffs = db["re"], db["alpha_deg"], db["coeffs"]
+    re_num, alpha_deg = np.broadcast_arrays(np.asarray(re_num, dtype=float),
+                                            np.asarray(alpha_deg,
+                                                       dtype=float))
+    sign = np.ones(alpha_deg.shape)
+    if symmetric:
+        sign = np.where(alpha_deg < 0, -1.0, 1.0)
+        alpha_deg = np.abs(alpha_deg)
+    x = np.interp(np.log(re_num), np.log(re_nums), np.arange(len(re_nums)))
+    i = np.minimum(x.astype(int), max(len(re_nums) - 2, 0))
+    i1 = np.minimum(i + 1, len(re_nums) - 1)
+    y = np.interp(alpha_deg, alpha, np.arange(len(alpha)),
+                  left=np.nan, right=np.nan)
+    outside = np.isnan(y)
+    y = np.where(outside, 0, y)
+    j = np.minimum(y.astype(int), max(len(alpha) - 2, 0))
+    j1 = np.minimum(j + 1, len(alpha) - 1)
+    wi, wj = (x - i)[..., None], (y - j)[..., None]
+    c = _blend(_blend(coeffs[i, j], coeffs[i, j1], wj),
+               _blend(coeffs[i1, j], coeffs[i1, j1], wj), wi)
+    c[outside] = np.nan
+    return c[..., 0]*sign, c[..., 1], c[..., 2]*sign
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Summarize foil coefficient "
+                                     "databases.")
+    parser.add_argument("--no-cache", default=False, action="store_true",
+                        help="Read all sources instead of the cache")
+    args = parser.parse_args()
+
+    for name, db in sorted(load_all(use_cache=not args.no_cache).items()):
+        print("{}: {} tables at Re = {}; alpha from {:g} to {:g} deg".format(
+              name, len(db["re"]), ", ".join("{:.3g}".format(r)
+                                             for r in db["re"]),
+              db["alpha_deg"][0], db["alpha_deg"][-1]))
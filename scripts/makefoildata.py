@@ -0,0 +1,287 @@
+#!/usr/bin/env python
+"""Create CACTUS foil coefficient files `NACA_0021_<name>.dat` by blending
+the tables in `config/foildata` (see `scripts/foildata.py`).
+
+A database is specified by a dictionary like those in `SPECS`:
+
+* `re`: Reynolds numbers of the tables to write.
+* `sources`: databases to blend, in order. The first supplies all
+  coefficients; each later one replaces the result within its range of
+  angle of attack, for the coefficients listed in its `coeffs`, with the
+  others interpolated from the result so far. With `mirror`, a source's
+  positive angles of attack are mirrored to negative ones.
+* `zero_cm`: whether to write zero moment coefficients, like the default
+  CACTUS data.
+* `bv_stall_angle`, `lb_lift_slope`, and `lb_crit_cl`: Boeing--Vertol
+  stall angles (deg), and Leishman--Beddoes lift slopes (per radian) and
+  critical lift coefficients, keyed by Reynolds number. Values that are not
+  given, or for which `calc_<param>` is set, are derived from the data.
+  `bv_stall_angle_offset` is added to all stall angles.
+
+A file is only rebuilt if its specification or the source files have
+changed since it was written, as recorded in a `<file>.json` sidecar.
+"""
+
+from __future__ import division, print_function
+import os
+import io
+import json
+import hashlib
+import numpy as np
+from scripts import foildata as foildata_db
+
+# Hybrid of Jacobs lift and Sheldahl drag and moment data, with the default
+# CACTUS dynamic stall parameters (but later BV stall angles)
+SPECS = {"Jacobs": {"re": ["8.3e4", "1.6e5", "3.8e5"],
+                    "sources": [{"name": "NACA_0021_Sheldahl"},
+                                {"name": "NACA_0021_Jacobs", "coeffs": ["cl"],
+                                 "mirror": True}],
+                    "zero_cm": True,
+                    "bv_stall_angle": {"8.3e4": 4.0, "1.6e5": 5.0,
+                                       "3.8e5": 5.0},
+                    "bv_stall_angle_offset": 1.5,
+                    "lb_lift_slope": {"8.3e4": 5.277, "1.6e5": 5.371,
+                                      "3.8e5": 6.303},
+                    "lb_crit_cl": {"8.3e4": 0.829, "1.6e5": 1.031,
+                                   "3.8e5": 1.32}}}
+
+# Default options for all specifications
+DEFAULTS = {"foil": "NACA0021", "thickness": 0.21, "zero_cm": False,
+            "bv_stall_angle": {}, "bv_stall_angle_offset": 0.0,
+            "lb_lift_slope": {}, "lb_crit_cl": {},
+            "calc_bv_stall_angle": False, "calc_lb_lift_slope": False,
+            "calc_lb_crit_cl": False,
+            # Largest angle of attack (deg) of the lift slope fit
+            "lift_slope_alpha_max": 9.0,
+            # Drag slope per degree at which static stall is detected
+            "stall_threshold": 0.03,
+            # LB model critical separation point and fraction of static
+            # stall angle
+            "fcrit": 0.7, "alpha1_fraction": 0.87}
+
+HEADER = """Title: {foil}
+Thickness to Chord Ratio: {thickness}
+Zero Lift AOA (deg): 0.0
+Reverse Camber Direction: 0
+
+"""
+
+SUBHEADER = """Reynolds Number: {re}
+BV Dyn. Stall Model - Positive Stall AOA (deg): {bv_stall_angle:g}
+BV Dyn. Stall Model - Negative Stall AOA (deg): {bv_stall_angle:g}
+LB Dyn. Stall Model - Lift Coeff. Slope at Zero Lift AOA (per radian): \
+{lb_lift_slope:g}
+LB Dyn. Stall Model - Positive Critical Lift Coeff.: {lb_crit_cl:g}
+LB Dyn. Stall Model - Negative Critical Lift Coeff.: {lb_crit_cl:g}
+AOA (deg) CL CD Cm25
+"""
+
+
+def foildata_fpath(name):
+    """Return the path of the CACTUS foil coefficient file for `name`."""
+    return os.path.join(foildata_db.FOILDATA_DIR,
+                        "NACA_0021_{}.dat".format(name))
+
+
+def source_table(name, re_num):
+    """Return a source's table at `re_num` as rows of angle of attack,
+    `cl`, `cd`, and `cm`, interpolating between the nearest tables if there
+    is none at that Reynolds number.
+    """
+    db = foildata_db.load(name)
+    i = np.argmin(np.abs(np.log(db["re"]/re_num)))
+    rows = db["raw"][db["offsets"][i]:db["offsets"][i + 1]]
+    if np.isclose(db["re"][i], re_num, rtol=1e-3):
+        return rows
+    alpha = rows[:, 0]
+    rows = np.column_stack([alpha] + list(foildata_db.lookup(db, re_num,
+                                                             alpha)))
+    return rows[~np.isnan(rows[:, 1])]
+
+
+def mirror(rows):
+    """Mirror rows with positive angle of attack to negative angles for a
+    symmetric foil, replacing any negative angles.
+    """
+    pos = rows[rows[:, 0] >= 0]
+    neg = pos[pos[:, 0] > 0][::-1]*[-1, -1, 1, -1]
+    return np.vstack([neg, pos])
+
+
+def blend(rows, new, coeffs):
+    """Replace `rows` within the angle of attack range of `new` by the
+    coefficients `coeffs` of `new`, interpolating the others from `rows`.
+    """
+    new = new.copy()
+    for k, name in enumerate(foildata_db.COEFFS):
+        if name not in coeffs:
+            ok = ~np.isnan(rows[:, k + 1])
+            new[:, k + 1] = np.interp(new[:, 0], rows[ok, 0],
+                                      rows[ok, k + 1]) if ok.any() \
+                else np.nan
+    alpha = rows[:, 0]
+    return np.vstack([rows[alpha < new[0, 0]], new,
+                      rows[alpha > new[-1, 0]]])
+
+
+def detect_ss_angle(rows, threshold=0.03):
+    """Detect static stall angle (deg) as the first angle of attack between
+    2 and 40 degrees at which the drag slope per degree reaches `threshold`.
+    """
+    rows = rows[(rows[:, 0] > 2) & (rows[:, 0] < 40)]
+    dcd_dalpha = np.diff(rows[:, 2])/np.diff(rows[:, 0])
+    i = np.flatnonzero(dcd_dalpha >= threshold)
+    if not len(i):
+        raise ValueError("No static stall detected")
+    return rows[i[0], 0]
+
+
+def calc_lift_slope(rows, alpha_max=9.0):
+    """Calculate the lift coefficient slope per radian with a linear fit
+    from zero to `alpha_max` degrees.
+    """
+    rows = rows[(rows[:, 0] >= 0) & (rows[:, 0] <= alpha_max)]
+    return np.polyfit(np.deg2rad(rows[:, 0]), rows[:, 1], 1)[0]
+
+
+def calc_crit_cl(lift_slope, ss_angle, fcrit=0.7, alpha1_fraction=0.87):
+    """Calculate the critical lift coefficient of the Leishman--Beddoes
+    model from the lift slope and static stall angle (deg), as in
+    turbinesFoam:
+
+        CN1_ = CNAlpha_*alpha1_*pow((1.0 + sqrt(f))/2.0, 2);
+
+    Technically this is the critical normal force coefficient.
+    """
+    alpha1 = np.deg2rad(alpha1_fraction*ss_angle)
+    return lift_slope*alpha1*((1.0 + np.sqrt(fcrit))/2.0)**2
+
+
+def _given(values, re_num):
+    """Return the value in `values` keyed by `re_num`, or None."""
+    for key, val in values.items():
+        if np.isclose(float(key), re_num, rtol=1e-3):
+            return val
+    return None
+
+
+def build_tables(spec):
+    """Blend the tables of a specification.
+
+    Returns
+    -------
+    tables : list of tuple
+        Reynolds number (as given), dynamic stall parameters, and rows of
+        angle of attack, `cl`, `cd`, and `cm` for each table.
+    """
+    spec = dict(DEFAULTS, **spec)
+    tables = []
+    for re in spec["re"]:
+        re_num = float(re)
+        base = source_table(spec["sources"][0]["name"], re_num)
+        rows = base.copy()
+        for source in spec["sources"][1:]:
+            new = source_table(source["name"], re_num)
+            if source.get("mirror"):
+                new = mirror(new)
+            rows = blend(rows, new, source.get("coeffs",
+                                               foildata_db.COEFFS))
+        if spec["zero_cm"]:
+            rows[:, 3] = 0.0
+        params = {p: None if spec["calc_" + p] else _given(spec[p], re_num)
+                  for p in ["bv_stall_angle", "lb_lift_slope", "lb_crit_cl"]}
+        # Stall is detected from the first source, which has drag data
+        if params["lb_lift_slope"] is None:
+            params["lb_lift_slope"] = calc_lift_slope(
+                rows, spec["lift_slope_alpha_max"])
+        if params["lb_crit_cl"] is None:
+            params["lb_crit_cl"] = calc_crit_cl(
+                params["lb_lift_slope"],
+                detect_ss_angle(base, spec["stall_threshold"]),
+                spec["fcrit"], spec["alpha1_fraction"])
+        if params["bv_stall_angle"] is None:
+            params["bv_stall_angle"] = detect_ss_angle(
+                base, spec["stall_threshold"])
+        params["bv_stall_angle"] += spec["bv_stall_angle_offset"]
+        tables.append((re, params, rows))
+    return tables
+
+
+def foildata_text(spec):
+    """Return the contents of a CACTUS foil coefficient file."""
+    spec = dict(DEFAULTS, **spec)
+    f = io.StringIO()
+    f.write(HEADER.format(**spec))
+    for re, params, rows in build_tables(spec):
+        f.write(SUBHEADER.format(re=re, **params))
+        np.savetxt(f, rows, fmt="%.10g", delimiter="\t")
+        f.write("\n")
+    return f.getvalue()
+
+
+def _inputs(spec):
+    """Return a hash of each source file of a specification."""
+    sources = foildata_db.source_files()
+    hashes = {}
+    for source in spec["sources"]:
+        for _, fpath in sources[source["name"]]:
+            with open(fpath, "rb") as f:
+                hashes[os.path.basename(fpath)] = \
+                    hashlib.sha1(f.read()).hexdigest()
+    return hashes
+
+
+def build(name="Jacobs", spec=None, fpath=None, force=False):
+    """Create the CACTUS foil coefficient file for `name` if it is missing,
+    or its specification or source files have changed.
+
+    Returns
+    -------
+    created : bool
+        Whether the file was (re)created.
+    """
+    if spec is None:
+        spec = SPECS[name]
+    if fpath is None:
+        fpath = foildata_fpath(name)
+    deps = {"spec": dict(DEFAULTS, **spec), "inputs": _inputs(spec)}
+    deps = json.loads(json.dumps(deps))
+    sidecar = fpath + ".json"
+    if not force and os.path.isfile(fpath) and os.path.isfile(sidecar):
+        with open(sidecar) as f:
+            if json.load(f) == deps:
+                return False
+    text = foildata_text(spec)
+    tmp = "{}.tmp{}".format(fpath, os.getpid())
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, fpath)
+    with open(sidecar, "w") as f:
+        json.dump(deps, f, indent=4)
+    # Databases loaded in this process are now out of date
+    foildata_db.load_all.cache_clear()
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Create CACTUS foil "
+                                     "coefficient files.")
+    parser.add_argument("names", nargs="*", default=sorted(SPECS),
+                        help="Databases to create (default: all)")
+    parser.add_argument("--spec", help="JSON file of additional "
+                        "specifications keyed by name")
+    parser.add_argument("--force", "-f", default=False, action="store_true",
+                        help="Create even if up to date")
+    args = parser.parse_args()
+
+    if args.spec:
+        with open(args.spec) as f:
+            SPECS.update(json.load(f))
+    for name in args.names:
+        if name not in SPECS:
+            parser.error("no specification for {}".format(name))
+        if build(name, force=args.force):
+            print("Created {}".format(foildata_fpath(name)))
+        else:
+            print("{} is up to date".format(foildata_fpath(name)))
@@ -1,12 +1,18 @@
 #!/usr/bin/octave -q
 
 % Parse any command line arguments to determine number of blade elements
+% and output file path
 arg_list = argv();
 if nargin > 0
     NBElem = round(str2num(arg_list{1}));
 else
     NBElem = 20;
 endif
+if nargin > 1
+    FN = arg_list{2};
+else
+    FN = 'config/RM2.geom';
+endif
 printf('Creating RM2 geometry with %d blade elements\n', NBElem);
 
 % Add geom creation scripts to path
@@ -32,9 +38,6 @@ CRr(1,1:NBElem/2) = CRr_2(1,1:NBElem/2);
 CRr(1,((NBElem/2)+1):(NBElem+1)) = CRr_1;
 
 
-% Output filename
-FN = 'config/RM2.geom';
-
 % Plot data?
 PlotTurbine = 0;
 
@@ -0,0 +1,333 @@
+#!/usr/bin/env python
+"""Create the RM2 CACTUS geometry file without Octave.
+
+This is a NumPy implementation of the `CreateTurbine` (VAWT type) and
+`WriteTurbineGeom` functions from the CACTUS-tools CreateGeom scripts, using
+the same parameters as `makegeom.m`.
+"""
+
+from __future__ import division, print_function
+import os
+import sys
+import shutil
+import hashlib
+import subprocess
+import tempfile
+import numpy as np
+from functools import lru_cache
+
+
+R_m = 0.5375                # Radius in m at midspan
+R = R_m*3.28084             # Center radius (ft)
+HR = 0.807/R_m              # Height to radius ratio
+eta = 0.5                   # Blade mount point ratio (mount point behind
+                            # leading edge as a fraction of chord)
+NBlade = 3                  # Number of blades
+NStrut = 3                  # Number of struts
+CRs = 0.06/R_m              # Strut chord to radius
+TCs = 0.21                  # Strut thickness to chord
+CT = 0.040/R_m              # Tip chord to radius
+CR = 0.067/R_m              # Root chord to radius
+
+# Output of `makegeom.m` to check this module against, made with
+# `python scripts/makegeom.py --make-reference` on a machine with Octave
+REFERENCE_FPATH = "config/RM2-octave.geom"
+
+# Geometry files written by `makegeom.m`, reused while it is unchanged
+OCTAVE_CACHE_DIR = "cache/geom"
+
+# Order of fields in the geometry file
+BLADE_FIELDS = ["QCx", "QCy", "QCz", "tx", "ty", "tz", "CtoR", "PEx", "PEy",
+                "PEz", "tEx", "tEy", "tEz", "nEx", "nEy", "nEz", "sEx", "sEy",
+                "sEz", "ECtoR", "EAreaR", "iSect"]
+STRUT_FIELDS = ["MCx", "MCy", "MCz", "CtoR", "PEx", "PEy", "PEz", "sEx", "sEy",
+                "sEz", "ECtoR", "EAreaR", "BIndS", "EIndS", "BIndE", "EIndE"]
+
+
+def tapered_chord(nbelem):
+    """Return chord to radius ratio at blade element ends, tapering linearly
+    from the tip chord at each end to the root chord at midspan.
+    """
+    half = nbelem//2
+    return np.append(np.linspace(CT, CR, half + 1)[:-1],
+                     np.linspace(CR, CT, nbelem - half + 1))
+
+
+def rotate(v, angles, axis=(0, 1, 0)):
+    """Rotate vectors `v` (..., 3) about `axis` by each of `angles`,
+    returning an array of shape (len(angles), ..., 3).
+    """
+    k = np.asarray(axis, dtype=float)
+    k /= np.linalg.norm(k)
+    angles = np.asarray(angles).reshape((-1,) + (1,)*(v.ndim - 1) + (1,))
+    # Rodrigues' rotation formula
+    return (v*np.cos(angles) + np.cross(k, v)*np.sin(angles)
+            + k*np.sum(k*v, axis=-1, keepdims=True)*(1 - np.cos(angles)))
+
+
+def create_turbine(nbelem=20, nselem=None, nblade=NBlade, nstrut=NStrut,
+                   chord=None, hr=HR, eta=eta, crs=CRs, tcs=TCs, ref_r=R,
+                   flipn=1):
+    """Create straight-bladed VAWT geometry.
+
+    All blades are generated at once by rotating a reference blade, located
+    at +z and moving in +x, about the y-axis. `flipn` is the blade normal
+    flip flag, which `makegeom.m` sets.
+
+    Returns
+    -------
+    turbine : dict
+        Turbine parameters, with lists of dictionaries of arrays for
+        `"blades"` and `"struts"`.
+    """
+    if nselem is None:
+        nselem = int(round(nbelem/2))
+    if chord is None:
+        chord = tapered_chord(nbelem)
+    chord = np.asarray(chord, dtype=float)
+    phase = 2*np.pi*np.arange(nblade)/nblade
+    # Reference blade end nodes; quarter chord ahead of mount point
+    y = np.linspace(-hr/2, hr/2, nbelem + 1)
+    qc = np.column_stack([(eta - 0.25)*chord, y, np.ones_like(y)])
+    t = np.tile([-1.0, 0.0, 0.0], (nbelem + 1, 1))
+    # Element center, spanwise, tangential, and normal vectors
+    pe = 0.5*(qc[1:] + qc[:-1])
+    se = qc[1:] - qc[:-1]
+    se_len = np.linalg.norm(se, axis=1)
+    se /= se_len[:, None]
+    te = 0.5*(t[1:] + t[:-1])
+    te -= np.sum(te*se, axis=1)[:, None]*se
+    te /= np.linalg.norm(te, axis=1)[:, None]
+    ne = np.cross(se, te)
+    echord = 0.5*(chord[1:] + chord[:-1])
+    earea = se_len*echord
+    qc, t, pe, se, te, ne = [rotate(v, phase) for v in (qc, t, pe, se, te, ne)]
+    blades = []
+    for i in range(nblade):
+        b = {"NElem": nbelem, "FlipN": flipn, "CtoR": chord, "ECtoR": echord,
+             "EAreaR": earea, "iSect": np.ones(nbelem, dtype=int)}
+        for name, v in zip(["QC", "t", "PE", "tE", "nE", "sE"],
+                           [qc, t, pe, te, ne, se]):
+            for j, c in enumerate("xyz"):
+                b[name + c] = v[i, :, j]
+        blades.append(b)
+    # Struts run radially from the axis to each blade's mount point at
+    # midspan
+    r = np.linspace(0, 1, nselem + 1)
+    mc = np.column_stack([np.zeros_like(r), np.zeros_like(r), r])
+    spe = 0.5*(mc[1:] + mc[:-1])
+    sse = np.tile([0.0, 0.0, 1.0], (nselem, 1))
+    slen = np.diff(r)
+    mc, spe, sse = [rotate(v, phase[:nstrut]) for v in (mc, spe, sse)]
+    struts = []
+    for i in range(nstrut):
+        s = {"NElem": nselem, "TtoC": tcs, "CtoR": np.full(nselem + 1, crs),
+             "ECtoR": np.full(nselem, crs), "EAreaR": slen*crs,
+             "BIndS": 0, "EIndS": 0, "BIndE": i + 1,
+             "EIndE": int(np.ceil(nbelem/2))}
+        for name, v in zip(["MC", "PE", "sE"], [mc, spe, sse]):
+            for j, c in enumerate("xyz"):
+                s[name + c] = v[i, :, j]
+        struts.append(s)
+    return {"NBlade": nblade, "NStrut": nstrut, "RotN": [0, 1, 0],
+            "RotP": [0, 0, 0], "RefAR": 2*hr, "RefR": ref_r, "Type": "VAWT",
+            "blades": blades, "struts": struts}
+
+
+def _fmt(vals):
+    """Format a field's values the way `WriteTurbineGeom` does."""
+    vals = np.atleast_1d(vals)
+    if vals.dtype.kind in "iu":
+        return " ".join(str(v) for v in vals)
+    return " ".join("{:.7e}".format(v) for v in vals)
+
+
+def geom_text(turbine):
+    """Return the contents of a CACTUS geometry file for `turbine`."""
+    lines = ["NBlade: {}".format(turbine["NBlade"]),
+             "NStrut: {}".format(turbine["NStrut"]),
+             "RotN: {}".format(_fmt(turbine["RotN"])),
+             "RotP: {}".format(_fmt(turbine["RotP"])),
+             "RefAR: {}".format(_fmt(turbine["RefAR"])),
+             "RefR: {}".format(_fmt(turbine["RefR"])),
+             "Type: {}".format(turbine["Type"])]
+    for n, b in enumerate(turbine["blades"]):
+        lines.append("Blade {}:".format(n + 1))
+        lines.append("    NElem: {}".format(b["NElem"]))
+        lines.append("    FlipN: {}".format(b["FlipN"]))
+        lines += ["    {}: {}".format(k, _fmt(b[k])) for k in BLADE_FIELDS]
+    for n, s in enumerate(turbine["struts"]):
+        lines.append("Strut {}:".format(n + 1))
+        lines.append("    NElem: {}".format(s["NElem"]))
+        lines.append("    TtoC: {}".format(_fmt(s["TtoC"])))
+        lines += ["    {}: {}".format(k, _fmt(s[k])) for k in STRUT_FIELDS]
+    return "\n".join(lines) + "\n"
+
+
+@lru_cache(maxsize=None)
+def rm2_geom_text(nbelem=20):
+    """Return RM2 geometry file contents, memoized per number of elements."""
+    return geom_text(create_turbine(nbelem=nbelem))
+
+
+def write_geom(nbelem=20, fpath="config/RM2.geom"):
+    """Write RM2 geometry file."""
+    with open(fpath, "w") as f:
+        f.write(rm2_geom_text(nbelem))
+
+
+def parse_geom(lines):
+    """Parse lines of a CACTUS geometry file into a dictionary of arrays
+    keyed by `"<block>/<field>"`, e.g., `"Blade 1/QCx"`.
+    """
+    data = {}
+    block = ""
+    for line in lines:
+        name, _, vals = line.strip().partition(":")
+        if not name:
+            continue
+        if not vals.strip():
+            block = name
+            continue
+        try:
+            vals = np.array(vals.split(), dtype=float)
+        except ValueError:
+            vals = vals.strip()
+        data[block + "/" + name if block else name] = vals
+    return data
+
+
+def read_geom(fpath):
+    """Read a CACTUS geometry file."""
+    with open(fpath) as f:
+        return parse_geom(f)
+
+
+def compare_geom(ref, new, rtol=1e-5, atol=1e-6):
+    """Compare parsed geometry files field by field, returning a sorted list
+    of fields that are missing from either, differ, or are out of order.
+    """
+    diffs = set(ref) ^ set(new)
+    for key in set(ref) & set(new):
+        a, b = ref[key], new[key]
+        if isinstance(a, str) or isinstance(b, str):
+            if a != b:
+                diffs.add(key)
+        elif a.shape != b.shape or not np.allclose(a, b, rtol=rtol,
+                                                   atol=atol):
+            diffs.add(key)
+    common = [k for k in ref if k in new]
+    diffs.update(k for k, k2 in zip(common, [k for k in new if k in ref])
+                 if k != k2)
+    return sorted(diffs)
+
+
+def octave_geom(nbelem=20, fpath="config/RM2.geom"):
+    """Write the RM2 geometry file with `makegeom.m`, which requires Octave
+    and the `cactus-tools` submodule.
+    """
+    subprocess.check_call(["octave", "-q", "scripts/makegeom.m",
+                           str(nbelem), fpath])
+
+
+def cached_octave_geom(nbelem=20, fpath="config/RM2.geom"):
+    """Write the RM2 geometry file with `makegeom.m`, running Octave only
+    once for each number of blade elements and version of the script.
+    """
+    with open("scripts/makegeom.m", "rb") as f:
+        key = hashlib.sha1(f.read()).hexdigest()[:12]
+    cached = os.path.join(OCTAVE_CACHE_DIR, "RM2-{}-{}.geom".format(nbelem,
+                                                                    key))
+    if not os.path.isfile(cached):
+        if not os.path.isdir(OCTAVE_CACHE_DIR):
+            os.makedirs(OCTAVE_CACHE_DIR, exist_ok=True)
+        tmp = "{}.tmp{}".format(cached, os.getpid())
+        octave_geom(nbelem, tmp)
+        os.replace(tmp, cached)
+    shutil.copyfile(cached, fpath)
+
+
+def compare_octave(nbelem=20, rtol=1e-5, atol=1e-6):
+    """Generate geometry with both this module and `makegeom.m` and return a
+    list of fields that differ.
+    """
+    fd, fpath = tempfile.mkstemp(suffix=".geom")
+    os.close(fd)
+    try:
+        octave_geom(nbelem, fpath)
+        ref = read_geom(fpath)
+    finally:
+        os.remove(fpath)
+    return compare_geom(ref, parse_geom(rm2_geom_text(nbelem).splitlines()),
+                        rtol, atol)
+
+
+def check_reference(fpath=REFERENCE_FPATH, rtol=1e-5, atol=1e-6):
+    """Compare geometry from this module against the committed output of
+    `makegeom.m` in `fpath`, with the same number of blade elements, and
+    return a list of fields that differ.
+    """
+    ref = read_geom(fpath)
+    nbelem = int(ref["Blade 1/NElem"][0])
+    return compare_geom(ref, parse_geom(rm2_geom_text(nbelem).splitlines()),
+                        rtol, atol)
+
+
+@lru_cache(maxsize=None)
+def geom_method():
+    """Return which implementation should write geometry files: `"numpy"`
+    if this module matches the Octave reference, otherwise `"octave"` if
+    it is installed, or `"numpy"` with a warning if not.
+    """
+    if os.path.isfile(REFERENCE_FPATH):
+        diffs = check_reference()
+        if not diffs:
+            return "numpy"
+        reason = "differs from {} in {}".format(REFERENCE_FPATH,
+                                                ", ".join(diffs))
+    else:
+        reason = "is unchecked; {} not found".format(REFERENCE_FPATH)
+    if shutil.which("octave"):
+        return "octave"
+    print("Warning: Octave not found; NumPy geometry {}".format(reason))
+    return "numpy"
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Create RM2 geometry file.")
+    parser.add_argument("nbelem", nargs="?", type=int, default=20,
+                        help="Number of blade elements")
+    parser.add_argument("fpath", nargs="?", default="config/RM2.geom",
+                        help="Output file path")
+    parser.add_argument("--compare", default=False, action="store_true",
+                        help="Compare against output of `makegeom.m`")
+    parser.add_argument("--check", default=False, action="store_true",
+                        help="Compare against the reference output of "
+                        "`makegeom.m` in " + REFERENCE_FPATH)
+    parser.add_argument("--make-reference", default=False,
+                        action="store_true", help="Write the reference "
+                        "output of `makegeom.m` to " + REFERENCE_FPATH)
+    args = parser.parse_args()
+
+    if args.make_reference:
+        octave_geom(args.nbelem, REFERENCE_FPATH)
+    elif args.check:
+        if not os.path.isfile(REFERENCE_FPATH):
+            sys.exit("{} not found; create it with --make-reference".format(
+                     REFERENCE_FPATH))
+        diffs = check_reference()
+        if diffs:
+            sys.exit("Geometry differs from {} in: {}".format(
+                     REFERENCE_FPATH, ", ".join(diffs)))
+        print("Geometry matches {}".format(REFERENCE_FPATH))
+    elif args.compare:
+        diffs = compare_octave(args.nbelem)
+        if diffs:
+            sys.exit("Geometry differs from Octave output in: "
+                     + ", ".join(diffs))
+        print("Geometry matches Octave output")
+    else:
+        print("Creating RM2 geometry with {} blade elements".format(
+              args.nbelem))
+        write_geom(args.nbelem, args.fpath)
@@ -7,10 +7,28 @@ https://gist.github.com/whophil/e5405071a143b38aa4d64dbcd4acef3a
 
 from __future__ import division, print_function
 import os
+import json
 import numpy as np
 import math
 import sys
 
+# Wall dimensions in meters
+W = 3.66
+H = 2.44
+L = 10.0
+
+# Turbine radius in meters
+R = 0.5375
+
+# Default grid spacing for the walls, normalized by R
+DS = 0.50
+
+# Corner node indices of each wall quad
+QUADS = {"right": (0,1,2,3),
+         "top": (1,5,6,2),
+         "left": (5,4,7,6),
+         "bottom": (4,0,3,7)}
+
 
 def gen_quad_grid(a, b, c, d, n1, n2):
     """Generate a structured grid for a quadrilateral with four specified
@@ -42,26 +60,18 @@ def gen_quad_grid(a, b, c, d, n1, n2):
         print("Error, points are not collinear.")
         return
 
-    # allocate storage for plane (since this is a plane, n3 = 1 always)
-    x = np.zeros([n1, n2, 1])
-    y = np.zeros([n1, n2, 1])
-    z = np.zeros([n1, n2, 1])
-
-    # define r,s coordinate system (for weighting)
-    r = np.linspace(-1, 1, n1)
-    s = np.linspace(-1, 1, n2)
+    # define r,s coordinate system (for weighting); since this is a plane,
+    # n3 = 1 always
+    r = np.linspace(-1, 1, n1)[:, None, None, None]
+    s = np.linspace(-1, 1, n2)[None, :, None, None]
 
     # compute coordinates of grid points by taking a weighted average of
     # node points
-    for i, r_i in enumerate(r):
-        for j, s_j in enumerate(s):
-            x[i,j,0], y[i,j,0], z[i,j,0] = 0.25 * ( (1-r_i)*(1-s_j)*a +
-                                                    (1+r_i)*(1-s_j)*b +
-                                                    (1+r_i)*(1+s_j)*c +
-                                                    (1-r_i)*(1+s_j)*d )
+    xyz = 0.25 * ( (1-r)*(1-s)*a + (1+r)*(1-s)*b + (1+r)*(1+s)*c +
+                   (1-r)*(1+s)*d )
 
     # return the grid arrays
-    return x, y, z
+    return xyz[..., 0], xyz[..., 1], xyz[..., 2]
 
 
 def write_to_p3d_multi(coords, p3d_filename):
@@ -76,39 +86,24 @@ def write_to_p3d_multi(coords, p3d_filename):
            Path to output filename.
        """
 
-    # see how many blocks were passed in
-    num_blocks = len(coords)
-
-    # allocate storage
-    size = np.zeros(num_blocks, dtype=int)
-
-    with open(p3d_filename, "w") as f:
-        # write number of blocks
-        f.write(str(num_blocks) + "\n")
+    # write number of blocks
+    lines = [str(len(coords))]
 
-        # write block dimensions
-        for nbi, (x, y, z) in enumerate(coords):
-            if x.shape != y.shape or y.shape != z.shape:
-                print("Error: X,Y,Z are different shape!")
-                sys.exit()
+    # write block dimensions
+    for x, y, z in coords:
+        if x.shape != y.shape or y.shape != z.shape:
+            print("Error: X,Y,Z are different shape!")
+            sys.exit()
 
-            nx, ny, nz = x.shape
-            size[nbi] = nx*ny*nz
+        lines.append("{} {} {}".format(*x.shape))
 
-            f.write("{} {} {}\n".format(nx, ny, nz))
+    # write block cordinates, with the first index varying fastest
+    for x, y, z in coords:
+        for v in (x, y, z):
+            lines += map(str, v.ravel(order="F").tolist())
 
-        # write block cordinates
-        for nbi, (x, y, z) in enumerate(coords):
-            x = x.T
-            y = y.T
-            z = z.T
-
-            for i in range(size[nbi]):
-                f.write(str(x.item(i)) + "\n")
-            for i in range(size[nbi]):
-                f.write(str(y.item(i)) + "\n")
-            for i in range(size[nbi]):
-                f.write(str(z.item(i)) + "\n")
+    with open(p3d_filename, "w") as f:
+        f.write("\n".join(lines) + "\n")
 
 
 def quad_nxny_from_ds(quadcoords, ds1max, ds2max=None):
@@ -138,84 +133,99 @@ def quad_nxny_from_ds(quadcoords, ds1max, ds2max=None):
     return n1, n2
 
 
-if __name__ == "__main__":
-    # Wall dimensions in meters
-    W = 3.66
-    H = 2.44
-    L = 10.0
-
-    print("Creating walls with W={} H={}, L={}".format(W, H, L))
-
-    coords = {0: np.array([0, 0, W]),
-              1: np.array([0, H, W]),
-              2: np.array([L, H, W]),
-              3: np.array([L, 0, W]),
-              4: np.array([0, 0, 0]),
-              5: np.array([0, H, 0]),
-              6: np.array([L, H, 0]),
-              7: np.array([L, 0, 0])}
-
-    quads = {"right": (0,1,2,3),
-             "top": (1,5,6,2),
-             "left": (5,4,7,6),
-             "bottom": (4,0,3,7)}
+def wall_coords(W=W, H=H, L=L, R=R, ds=DS):
+    """Generate the grid of each tank wall, centered at the turbine and
+    normalized by its radius.
 
-    # Relative position of turbine center
-    x_center = L/2 # m
-    y_center = H/2 # m
-    z_center = W/2 # m
-
-    p_rel = np.array([x_center, y_center, z_center])
+    Arguments
+    ---------
+    W, H, L : float
+        Tank width, depth, and length in meters.
+    R : float
+        Turbine radius in meters.
+    ds : float or dict
+        Maximum grid spacing normalized by R, for all walls or for each of
+        "right", "top", "left", and "bottom".
 
-    # Turbine radius in meters
-    R = 0.5375
+    Returns
+    -------
+    coords : list
+        (x,y,z) tuples of grid arrays for each wall.
+    """
+    if not isinstance(ds, dict):
+        ds = {quad_name: ds for quad_name in QUADS}
+
+    corners = np.array([[0, 0, W],
+                        [0, H, W],
+                        [L, H, W],
+                        [L, 0, W],
+                        [0, 0, 0],
+                        [0, H, 0],
+                        [L, H, 0],
+                        [L, 0, 0]], dtype=float)
 
     # transform to center at hub, N.D. by R
-    for key, coord in coords.items():
-        coords[key] = (coord - p_rel)/R
+    corners = (corners - np.array([L/2, H/2, W/2]))/R
 
-    # specify desired spacing for the quads
-    ds_quads = {"right": 0.50,
-                "top": 0.50,
-                "left": 0.50,
-                "bottom": 0.50}
+    coords = []
+    for quad_name, quad_node_ids in QUADS.items():
+        a, b, c, d = corners[list(quad_node_ids)]
 
-    n = {}
+        # compute how many elements are needed for the desired spacing
+        n1, n2 = quad_nxny_from_ds([a, b, c, d], ds[quad_name])
 
-    # loop through the quads
-    for quad_name, quad_node_ids in quads.items():
-        # get the coordinates of the four corners and put them into a list
-        quad_coords = [coords[node_id] for node_id in quad_node_ids]
+        coords.append(gen_quad_grid(a, b, c, d, n1, n2))
+    return coords
 
-        # compute how many elements are needed for the desired spacing
-        n1t, n2t = quad_nxny_from_ds(quad_coords, ds_quads[quad_name])
 
-        n[quad_name] = (n1t, n2t)
+def wall_inputs(W=W, H=H, L=L, R=R, ds=DS):
+    """Return the inputs defining a wall mesh, with the grid spacing `ds`
+    given for each face.
+    """
+    if not isinstance(ds, dict):
+        ds = {quad_name: ds for quad_name in QUADS}
+    return {"W": W, "H": H, "L": L, "R": R,
+            "ds": {k: float(v) for k, v in ds.items()}}
 
-    xs = []
-    ys = []
-    zs = []
 
-    # generate a mesh for all the points
-    for quad_name, quad_node_ids in quads.items():
-        # get the coordinates of the four corners and put them into a list
-        quad_coords = [coords[node_id] for node_id in quad_node_ids]
+def make_walls(W=W, H=H, L=L, R=R, ds=DS, fpath="./config/walls.xyz",
+               force=False):
+    """Write the wall mesh to `fpath`, unless it already exists and was
+    generated with the same inputs, which are recorded alongside it in a JSON
+    file.
 
-        # extract these elements
-        a = np.array(quad_coords[0])
-        b = np.array(quad_coords[1])
-        c = np.array(quad_coords[2])
-        d = np.array(quad_coords[3])
+    Returns
+    -------
+    created : bool
+        Whether or not the mesh was (re)generated.
+    """
+    inputs = wall_inputs(W, H, L, R, ds)
+    inputs_fpath = os.path.splitext(fpath)[0] + ".json"
+    if not force and os.path.isfile(fpath) and os.path.isfile(inputs_fpath):
+        with open(inputs_fpath) as f:
+            if json.load(f) == inputs:
+                return False
 
-        # generate the grids
-        n1 = n[quad_name][0]
-        n2 = n[quad_name][1]
-        x, y, z = gen_quad_grid(a, b, c, d, n1, n2)
+    print("Creating walls with W={} H={}, L={}".format(W, H, L))
+    # Write to temporary files first so concurrent runs never read a partial
+    # mesh
+    tmp = "{}.tmp{}".format(fpath, os.getpid())
+    write_to_p3d_multi(wall_coords(W, H, L, R, inputs["ds"]), tmp)
+    os.replace(tmp, fpath)
+    tmp = "{}.tmp{}".format(inputs_fpath, os.getpid())
+    with open(tmp, "w") as f:
+        json.dump(inputs, f, indent=4, sort_keys=True)
+    os.replace(tmp, inputs_fpath)
+    return True
 
-        # append them to a list of grids
-        xs.append(x)
-        ys.append(y)
-        zs.append(z)
 
-    coords = [(x, y, z) for x, y, z in zip(xs, ys, zs)]
-    write_to_p3d_multi(coords, "./config/walls.xyz")
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Generate CACTUS walls.")
+    parser.add_argument("--ds", type=float, default=DS,
+                        help="Maximum grid spacing normalized by R")
+    parser.add_argument("--force", "-f", default=False, action="store_true",
+                        help="Regenerate walls even if inputs are unchanged")
+    args = parser.parse_args()
+
+    make_walls(ds=args.ds, force=args.force)
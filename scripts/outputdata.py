@@ -0,0 +1,345 @@
+#!/usr/bin/env python
+"""Stream large CACTUS outputs by time step and convert them to a compact,
+memory-mappable columnar format.
+
+Supported outputs are blade element data (`BladeElemOutFlag`), dynamic stall
+data (`DynStallOutFlag`), wake element data (`WakeElemOutFlag`), and field
+data (`FieldOutFlag`). Element and dynamic stall data are single files with a
+row per element per time step; wake and field data are written as one file
+per output time step.
+
+Converted data are stored in `output/<kind>.cols` as one raw float32 file
+per column, numbered in order, with an `index.json` holding the column names,
+the time and first row of each time step, and the signature of the source
+files.
+
+Smaller CSV outputs such as time and revolution data are read with cleaned
+column names through `load_csv`, which keeps a typed `.npz` copy of each file
+alongside it.
+"""
+
+from __future__ import division, print_function
+import os
+import glob
+import json
+import numpy as np
+import pandas as pd
+
+TIME_COL = "Normalized Time (-)"
+
+# Per-run CSV outputs cached by `load_csv`
+CSV_OUTPUTS = ["RM2_Param.csv", "RM2_RevData.csv", "RM2_TimeData.csv"]
+
+# Output file (glob) patterns relative to the output directory
+OUTPUTS = {"element": "RM2_ElementData.csv",
+           "dynstall": "RM2_DSData.csv",
+           "wake": os.path.join("wake", "RM2_WakeData_*.csv"),
+           "field": os.path.join("field", "RM2_FieldData_*.csv")}
+
+
+def clean_name(name):
+    """Clean a CSV column name the same way as `plot.clean_column_names`."""
+    return (name.replace("(-)", "").lower().replace(".", "").strip()
+            .replace(" ", "_").replace("(", "").replace(")", ""))
+
+
+def output_files(kind, output_dir="output"):
+    """Return the sorted list of files for an output `kind`."""
+    return sorted(glob.glob(os.path.join(output_dir, OUTPUTS[kind])))
+
+
+def _signature(fpaths):
+    sig = []
+    for fpath in fpaths:
+        st = os.stat(fpath)
+        sig.append([os.path.basename(fpath), st.st_size, st.st_mtime_ns])
+    return sig
+
+
+def load_csv(fpath, use_cache=True):
+    """Read a CACTUS CSV output as a DataFrame with cleaned column names.
+
+    The data are saved as a `.npz` file next to the CSV with a column per
+    array, which is read instead of the CSV while the CSV's size and
+    modification time are unchanged.
+    """
+    cache = os.path.splitext(fpath)[0] + ".npz"
+    sig = _signature([fpath])[0][1:]
+    if use_cache and os.path.isfile(cache):
+        try:
+            with np.load(cache) as data:
+                if data["signature"].tolist() == sig:
+                    columns = [str(c) for c in data["columns"]]
+                    return pd.DataFrame(
+                        {c: data["col{}".format(j)]
+                         for j, c in enumerate(columns)}, columns=columns)
+        except (IOError, ValueError, KeyError):
+            pass
+    df = pd.read_csv(fpath)
+    df.columns = [clean_name(c) for c in df.columns]
+    if use_cache:
+        arrays = {"col{}".format(j): (df[c].values.astype(str)
+                                      if df[c].dtype == object
+                                      else df[c].values)
+                  for j, c in enumerate(df.columns)}
+        tmp = "{}.tmp{}.npz".format(cache, os.getpid())
+        np.savez(tmp, columns=np.array(df.columns, dtype=str),
+                 signature=np.array(sig), **arrays)
+        os.replace(tmp, cache)
+    return df
+
+
+def convert_csvs(output_dir="output"):
+    """Create or update the `.npz` copies of the CSV outputs in
+    `output_dir`.
+    """
+    for fname in CSV_OUTPUTS:
+        fpath = os.path.join(output_dir, fname)
+        if os.path.isfile(fpath):
+            load_csv(fpath)
+
+
+def _select(df, where):
+    """Select rows of `df` whose columns have values in `where`, a
+    dictionary of column names (raw or cleaned) and allowed values.
+    """
+    if not where:
+        return df
+    names = {clean_name(c): c for c in df.columns}
+    mask = np.ones(len(df), dtype=bool)
+    for col, vals in where.items():
+        col = names.get(col, col)
+        mask &= df[col].isin(np.atleast_1d(vals)).values
+    return df[mask]
+
+
+def _want_step(n, steps):
+    if steps is None:
+        return True
+    if isinstance(steps, slice):
+        start, stop, stride = steps.start or 0, steps.stop, steps.step or 1
+        return n >= start and (stop is None or n < stop) and \
+            (n - start) % stride == 0
+    return n in steps
+
+
+def _past_steps(n, steps):
+    """Whether no step at or after index `n` is wanted."""
+    if steps is None:
+        return False
+    if isinstance(steps, slice):
+        return steps.stop is not None and n >= steps.stop
+    return n > max(steps)
+
+
+def iter_steps(kind, output_dir="output", steps=None, where=None,
+               usecols=None, chunksize=200000):
+    """Iterate over time steps of an output, reading at most `chunksize` rows
+    at a time so memory use is bounded by the chunk and time step size.
+
+    Parameters
+    ----------
+    steps : slice or list of int
+        Indices of time steps to read, in order of output.
+    where : dict
+        Column names and values of rows to keep, e.g., `{"Blade": 1,
+        "Element": [8, 9]}`.
+    usecols : list
+        Columns to read, in addition to time.
+
+    Yields
+    ------
+    n : int
+        Time step index.
+    t : float
+        Normalized time.
+    df : pandas.DataFrame
+        Rows of the time step.
+    """
+    fpaths = output_files(kind, output_dir)
+    if not fpaths:
+        raise IOError("No {} output found in {}".format(kind, output_dir))
+    if usecols is not None:
+        usecols = [TIME_COL] + [c for c in usecols if c != TIME_COL]
+    if kind in ["wake", "field"]:
+        for n, fpath in enumerate(fpaths):
+            if _past_steps(n, steps):
+                return
+            if not _want_step(n, steps):
+                continue
+            df = _select(pd.read_csv(fpath, usecols=usecols), where)
+            yield n, df[TIME_COL].iloc[0], df
+        return
+    n = 0
+    rest = None
+    for chunk in pd.read_csv(fpaths[0], usecols=usecols,
+                             chunksize=chunksize):
+        if rest is not None:
+            chunk = pd.concat([rest, chunk])
+        t = chunk[TIME_COL].values
+        # Rows at which the time step changes; the last step may continue in
+        # the next chunk
+        starts = np.flatnonzero(np.r_[True, t[1:] != t[:-1]])
+        for i0, i1 in zip(starts[:-1], starts[1:]):
+            if _past_steps(n, steps):
+                return
+            if _want_step(n, steps):
+                yield n, t[i0], _select(chunk.iloc[i0:i1], where)
+            n += 1
+        rest = chunk.iloc[starts[-1]:]
+    if rest is not None and len(rest) and not _past_steps(n, steps) \
+            and _want_step(n, steps):
+        yield n, rest[TIME_COL].iloc[0], _select(rest, where)
+
+
+def convert_output(kind, output_dir="output", steps=None, where=None,
+                   usecols=None, chunksize=200000, force=False):
+    """Convert an output to float32 columnar files in `output/<kind>.cols`,
+    streaming it by time step. Conversion is skipped if it was already done
+    with the same source files and options.
+
+    Returns the path of the converted data directory.
+    """
+    fpaths = output_files(kind, output_dir)
+    out_dir = os.path.join(output_dir, kind + ".cols")
+    options = {"steps": [steps.start, steps.stop, steps.step]
+               if isinstance(steps, slice) else steps,
+               "where": {k: np.atleast_1d(v).tolist()
+                         for k, v in (where or {}).items()},
+               "usecols": usecols}
+    index_fpath = os.path.join(out_dir, "index.json")
+    sig = _signature(fpaths)
+    if not force and os.path.isfile(index_fpath):
+        with open(index_fpath) as f:
+            index = json.load(f)
+        if index["signature"] == sig and index["options"] == options:
+            return out_dir
+        os.remove(index_fpath)
+    if not os.path.isdir(out_dir):
+        os.makedirs(out_dir)
+    files = None
+    times = []
+    offsets = [0]
+    for n, t, df in iter_steps(kind, output_dir, steps=steps, where=where,
+                               usecols=usecols, chunksize=chunksize):
+        if files is None:
+            columns = [clean_name(c) for c in df.columns]
+            # Column names may contain slashes, so files are numbered
+            files = [open(os.path.join(out_dir, "{:03d}.f32".format(j)), "wb")
+                     for j in range(len(columns))]
+        values = df.values.astype(np.float32)
+        for j, f in enumerate(files):
+            f.write(values[:, j].tobytes())
+        times.append(float(t))
+        offsets.append(offsets[-1] + len(df))
+    for f in files or []:
+        f.close()
+    index = {"kind": kind, "columns": columns if files else [],
+             "dtype": "float32", "nrows": offsets[-1], "t": times,
+             "offsets": offsets, "signature": sig, "options": options}
+    # Written last so an interrupted conversion is never considered valid
+    with open(index_fpath, "w") as f:
+        json.dump(index, f)
+    return out_dir
+
+
+def load_output(kind, output_dir="output", steps=None, convert=True,
+                **kwargs):
+    """Load converted output data as memory-mapped float32 arrays.
+
+    Parameters
+    ----------
+    steps : slice
+        Range of converted time steps to return, with a stride of one.
+    convert : bool
+        Whether to convert the output first if needed. Additional keyword
+        arguments are passed to `convert_output`.
+
+    Returns
+    -------
+    data : dict
+        Memory-mapped array for each (cleaned) column name, plus `"t"`, the
+        time of each step, and `"offsets"`, the first row of each step and
+        total number of rows.
+    """
+    out_dir = os.path.join(output_dir, kind + ".cols")
+    if convert:
+        convert_output(kind, output_dir, **kwargs)
+    with open(os.path.join(out_dir, "index.json")) as f:
+        index = json.load(f)
+    offsets = np.array(index["offsets"])
+    t = np.array(index["t"])
+    rows = slice(None)
+    if steps is not None:
+        # Steps are contiguous, so their rows are too
+        i = np.arange(len(t))[steps]
+        i1 = i[-1] + 1 if len(i) else 0
+        i0 = i[0] if len(i) else 0
+        rows = slice(offsets[i0], offsets[i1])
+        t = t[i0:i1]
+        offsets = offsets[i0:i1 + 1] - offsets[i0]
+    data = {"t": t, "offsets": offsets}
+    for j, col in enumerate(index["columns"]):
+        fpath = os.path.join(out_dir, "{:03d}.f32".format(j))
+        if index["nrows"]:
+            data[col] = np.memmap(fpath, dtype=np.float32, mode="r",
+                                  shape=(index["nrows"],))[rows]
+        else:
+            data[col] = np.zeros(0, dtype=np.float32)
+    return data
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Convert large CACTUS "
+                                     "outputs to columnar float32 files.")
+    parser.add_argument("kind", nargs="*",
+                        help="Outputs to convert ({})".format(
+                        ", ".join(OUTPUTS)))
+    parser.add_argument("--output-dir", default="output", nargs="+",
+                        help="CACTUS output directories")
+    parser.add_argument("--csv", default=False, action="store_true",
+                        help="Convert time, revolution, and parameter CSV "
+                        "outputs")
+    parser.add_argument("--steps", nargs=3, type=int,
+                        metavar=("START", "STOP", "STRIDE"),
+                        help="Range of time steps to convert")
+    parser.add_argument("--blades", nargs="+", type=int,
+                        help="Blades to convert (element and dynamic stall "
+                        "data)")
+    parser.add_argument("--elements", nargs="+", type=int,
+                        help="Elements to convert (element and dynamic "
+                        "stall data)")
+    parser.add_argument("--chunksize", type=int, default=200000,
+                        help="Rows read at once")
+    parser.add_argument("--force", "-f", default=False, action="store_true",
+                        help="Convert even if up to date")
+    args = parser.parse_args()
+
+    for kind in args.kind:
+        if kind not in OUTPUTS:
+            parser.error("unknown output: {}".format(kind))
+    steps = slice(*args.steps) if args.steps else None
+    where = {}
+    if args.blades:
+        where["Blade"] = args.blades
+    if args.elements:
+        where["Element"] = args.elements
+    output_dirs = args.output_dir
+    if isinstance(output_dirs, str):
+        output_dirs = [output_dirs]
+    for output_dir in output_dirs:
+        if args.csv:
+            convert_csvs(output_dir)
+        for kind in args.kind:
+            if not output_files(kind, output_dir):
+                print("No {} output found in {}; skipping".format(kind,
+                      output_dir))
+                continue
+            out_dir = convert_output(kind, output_dir, steps=steps,
+                                     where=where if kind in ["element",
+                                                             "dynstall"]
+                                     else None,
+                                     chunksize=args.chunksize,
+                                     force=args.force)
+            print("Converted {} output to {}".format(kind, out_dir))
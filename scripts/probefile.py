@@ -1,32 +1,175 @@
 #!/usr/bin/env python
-"""This script creates the probe specification file to match experiments."""
+"""This script creates the probe specification file, by default to match
+experiments, or from plane, line, and volume definitions for wake studies.
+
+Probe regions are given in a JSON (or YAML) file as a list of definitions
+with turbine-centered coordinates `x_R` or `x_D` (streamwise), `y_R`
+(cross-stream), and `z_R` or `z_H` (vertical). Each coordinate is a value, a
+list of values, or a range as `{"start": 0, "stop": 1, "num": 11}`. A single
+varying coordinate defines a line, two a plane, and three a volume, e.g.,
+
+    [{"x_D": [1, 2, 4, 6], "y_R": {"start": -3, "stop": 3, "num": 61},
+      "z_H": {"start": 0, "stop": 0.75, "num": 25}}]
+"""
 
 from __future__ import division, print_function
+import os
+import json
 import numpy as np
 import pandas as pd
 
 H = 0.807
 R = 0.5375
+D = 2*R
+
+# Approximate size of a probe output line (7 values) in bytes
+PROBE_LINE_BYTES = 7*15
+
+# Numbers of blades and struts, which shed wake elements
+NBLADE = 3
+NSTRUT = 3
+
+
+def coord_values(spec, names, scales):
+    """Return values of a coordinate normalized by R from the first of
+    `names` present in `spec`, scaled by the corresponding `scales`.
+    """
+    for name, scale in zip(names, scales):
+        if name in spec:
+            val = spec[name]
+            if isinstance(val, dict):
+                if "num" in val:
+                    val = np.linspace(val["start"], val["stop"], val["num"])
+                else:
+                    val = np.arange(val["start"], val["stop"] + val["step"]/2,
+                                    val["step"])
+            return np.atleast_1d(np.asarray(val, dtype=float))*scale
+    raise KeyError("Probe definition needs one of {}".format(names))
+
+
+def grid_probes(x_R, y_R, z_R):
+    """Return probe coordinates for all combinations of `x_R`, `y_R`, and
+    `z_R`, ordered with y varying fastest, then z, then x, as an array of
+    shape (nprobes, 3) in the CACTUS y-up coordinate system.
+    """
+    x, z, y = np.meshgrid(np.atleast_1d(x_R), np.atleast_1d(z_R),
+                          np.atleast_1d(y_R), indexing="ij")
+    # Swap y and z
+    return np.column_stack([x.ravel(), z.ravel(), -y.ravel()])
+
+
+def spec_probes(specs):
+    """Return probe coordinates for a list of plane, line, or volume
+    definitions (see module docstring).
+    """
+    coords = []
+    for spec in specs:
+        x_R = coord_values(spec, ["x_R", "x_D"], [1.0, D/R])
+        y_R = coord_values(spec, ["y_R"], [1.0])
+        z_R = coord_values(spec, ["z_R", "z_H"], [1.0, H/R])
+        coords.append(grid_probes(x_R, y_R, z_R))
+    return np.vstack(coords)
+
+
+def experiment_probes(x=1.0):
+    """Return probe coordinates matching the experimental wake measurements
+    at `x` meters downstream.
+    """
+    # All coordinates should be normalized by radius
+    z_H = np.arange(0.0, 0.751, 0.125)
+    z_R = z_H * H / R
+
+    # Load y_R locations from experimental test plan
+    df = pd.read_csv("RM2-tow-tank/Config/Test plan/Wake-1.0-0.0.csv")
+    y_R = df["y/R"].values
+
+    return grid_probes(x/R, y_R, z_R)
+
+
+def write_probes(coords, fpath="./config/probes.txt"):
+    """Write probe specification file."""
+    with open(fpath, "w") as f:
+        f.write(str(len(coords)) + "\n")
+        np.savetxt(f, coords, fmt="%.10g")
+
+
+def estimate_cost(nprobes, nti=24, nrevs=8, nbelem=16):
+    """Estimate the output volume and runtime overhead of probes.
+
+    Each probe writes one line per time step. Computing probe velocities
+    costs one induced velocity evaluation per wake node per time step, while
+    convecting the wake costs one per pair of wake nodes, so the fractional
+    overhead is approximately `1.5*nprobes/nwake`, where `nwake` is the
+    number of wake nodes at the end of the run.
+
+    Returns
+    -------
+    estimate : dict
+        Number of probes, total output size in MB, and runtime overhead as a
+        fraction of the run time without probes.
+    """
+    nt = nti*nrevs
+    nshed = NBLADE*(nbelem + 1) + NSTRUT*(int(round(nbelem/2)) + 1)
+    nwake = nshed*nt
+    return {"nprobes": nprobes,
+            "output_mb": nprobes*(nt + 4)*PROBE_LINE_BYTES/1e6,
+            "overhead": 1.5*nprobes/nwake}
 
-# All coordinates should be normalized by radius
-z_H = np.arange(0.0, 0.751, 0.125)
-z_R = z_H * H / R
 
-# Load y_R locations from experimental test plan
-df = pd.read_csv("RM2-tow-tank/Config/Test plan/Wake-1.0-0.0.csv")
-y_R = df["y/R"].values
+def load_spec(fpath):
+    """Load probe definitions from a JSON or YAML file."""
+    with open(fpath) as f:
+        if os.path.splitext(fpath)[-1] in [".yml", ".yaml"]:
+            import yaml
+            return yaml.safe_load(f)
+        return json.load(f)
 
-x = 1.0
-x_R = x/R
 
-coords = []
-for z in z_R:
-    for y in y_R:
-        coords.append("{} {} {}".format(x_R, z, -y)) # Swap y and z
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Create probe "
+                                     "specification file.")
+    parser.add_argument("--spec", help="Probe definition file (JSON or YAML);"
+                        " default matches experiments")
+    parser.add_argument("--planes", nargs="+", type=float, metavar="X_D",
+                        help="Create cross-stream planes at these x/D")
+    parser.add_argument("--ny", type=int, default=61,
+                        help="Cross-stream points per plane")
+    parser.add_argument("--nz", type=int, default=25,
+                        help="Vertical points per plane")
+    parser.add_argument("--y-range", nargs=2, type=float, default=[-3, 3],
+                        help="Cross-stream extent of planes in y/R")
+    parser.add_argument("--z-range", nargs=2, type=float, default=[0, 0.75],
+                        help="Vertical extent of planes in z/H")
+    parser.add_argument("--nti", type=int, default=24,
+                        help="Time steps per rev for cost estimate")
+    parser.add_argument("--nrevs", type=int, default=8,
+                        help="Revolutions for cost estimate")
+    parser.add_argument("--nbelem", type=int, default=16,
+                        help="Elements per blade for cost estimate")
+    parser.add_argument("--dry-run", default=False, action="store_true",
+                        help="Only print cost estimate")
+    parser.add_argument("--output", "-o", default="./config/probes.txt",
+                        help="Probe specification file path")
+    args = parser.parse_args()
 
-nprobes = len(coords)
+    if args.spec:
+        coords = spec_probes(load_spec(args.spec))
+    elif args.planes:
+        coords = spec_probes([{"x_D": args.planes,
+                               "y_R": {"start": args.y_range[0],
+                                       "stop": args.y_range[1],
+                                       "num": args.ny},
+                               "z_H": {"start": args.z_range[0],
+                                       "stop": args.z_range[1],
+                                       "num": args.nz}}])
+    else:
+        coords = experiment_probes()
 
-with open("./config/probes.txt", "w") as f:
-    f.write(str(nprobes) + "\n")
-    for coord in coords:
-        f.write(coord + "\n")
+    est = estimate_cost(len(coords), nti=args.nti, nrevs=args.nrevs,
+                        nbelem=args.nbelem)
+    print("{} probes: {:.1f} MB of output, approx. {:.0f}% runtime "
+          "overhead".format(est["nprobes"], est["output_mb"],
+                            100*est["overhead"]))
+    if not args.dry_run:
+        write_probes(coords, args.output)
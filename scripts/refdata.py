@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+"""Local store of reference data for comparison with CACTUS results, i.e.,
+the RM2 tow tank experiments, turbinesFoam actuator line model (ALM), and 2-D
+CFD foil data, so that figures can be made without network access.
+
+Each data set is a CSV file from a GitHub repository, stored under
+`config/refdata/<repo>/<path>`. Missing files are copied from a local
+checkout of the repository, e.g., the `RM2-tow-tank` submodule, found in this
+directory or next to it. On machines without either, the store can be seeded
+once by downloading (`--download`) or importing a copy of it made elsewhere
+(`--import-dir`):
+
+    python -m scripts.refdata --download
+    python -m scripts.refdata --import-dir /path/to/refdata
+"""
+
+from __future__ import division, print_function
+import os
+import shutil
+import pandas as pd
+from functools import lru_cache
+from urllib.request import urlopen
+from urllib.parse import quote
+
+REFDATA_DIR = "config/refdata"
+
+# GitHub user of each repository
+REPOS = {"RM2-tow-tank": "UNH-CORE",
+         "RM2-turbinesFoam": "petebachant",
+         "NACAFoil-OpenFOAM": "petebachant"}
+
+# Repository and path of each data set
+DATASETS = {"exp-perf": ("RM2-tow-tank", "Data/Processed/Perf-1.0.csv"),
+            "exp-perf-b": ("RM2-tow-tank", "Data/Processed/Perf-1.0-b.csv"),
+            "exp-re-dep": ("RM2-tow-tank", "Data/Processed/Perf-tsr_0.csv"),
+            "exp-re-dep-b": ("RM2-tow-tank",
+                             "Data/Processed/Perf-tsr_0-b.csv"),
+            "alm-perf": ("RM2-turbinesFoam", "processed/tsr_sweep.csv"),
+            "cfd-foildata": ("NACAFoil-OpenFOAM",
+                             "processed/NACA0021_2.0e+05.csv")}
+
+
+def fpath(name):
+    """Return the path of a data set in the store."""
+    repo, path = DATASETS[name]
+    return os.path.join(REFDATA_DIR, repo, *path.split("/"))
+
+
+def url(name):
+    """Return the URL of a data set's raw file on GitHub."""
+    repo, path = DATASETS[name]
+    return "https://raw.githubusercontent.com/{}/{}/master/{}".format(
+        REPOS[repo], repo, quote(path))
+
+
+def _store(name, src):
+    """Copy the file-like object `src` into the store atomically."""
+    dest = fpath(name)
+    if not os.path.isdir(os.path.dirname(dest)):
+        os.makedirs(os.path.dirname(dest))
+    tmp = "{}.tmp{}".format(dest, os.getpid())
+    with open(tmp, "wb") as f:
+        shutil.copyfileobj(src, f)
+    os.replace(tmp, dest)
+
+
+def find_local(name, search_dirs=(".", "..")):
+    """Return the path of a data set in a local checkout of its repository
+    in any of `search_dirs`, or None.
+    """
+    repo, path = DATASETS[name]
+    for d in search_dirs:
+        for root in (os.path.join(d, repo), d):
+            p = os.path.join(root, *path.split("/"))
+            if os.path.isfile(p):
+                return p
+    return None
+
+
+def seed(names=None, search_dirs=(".", ".."), download=False, force=False):
+    """Add data sets to the store from local checkouts of their
+    repositories in `search_dirs`, or optionally by downloading them.
+
+    Returns
+    -------
+    added : list
+        Names of the data sets added.
+    """
+    if names is None:
+        names = sorted(DATASETS)
+    added = []
+    for name in names:
+        if os.path.isfile(fpath(name)) and not force:
+            continue
+        local = find_local(name, search_dirs)
+        if local is not None:
+            with open(local, "rb") as src:
+                _store(name, src)
+        elif download:
+            src = urlopen(url(name), timeout=30)
+            try:
+                _store(name, src)
+            finally:
+                src.close()
+        else:
+            continue
+        added.append(name)
+    if added:
+        load.cache_clear()
+    return added
+
+
+@lru_cache(maxsize=None)
+def load(name):
+    """Load a data set as a DataFrame, read once per process and shared, so
+    it should not be modified.
+    """
+    if not os.path.isfile(fpath(name)):
+        seed([name])
+    if not os.path.isfile(fpath(name)):
+        raise IOError("Reference data {} not found in {} or a local "
+                      "checkout of {}; seed it with "
+                      "`python -m scripts.refdata --download` or "
+                      "`--import-dir`".format(name, REFDATA_DIR,
+                                              DATASETS[name][0]))
+    return pd.read_csv(fpath(name))
+
+
+def load_exp_perf():
+    """Load the experimental performance curve averaged over both sets of
+    runs at each nominal tip speed ratio.
+    """
+    df = pd.concat([load("exp-perf"), load("exp-perf-b")],
+                   ignore_index=True)
+    return df.groupby("tsr_nom").mean()
+
+
+def load_exp_re_dep():
+    """Load the experimental Reynolds number dependence of performance
+    averaged over both sets of runs at each nominal tow speed.
+    """
+    df = pd.concat([load("exp-re-dep"), load("exp-re-dep-b")],
+                   ignore_index=True)
+    return df.groupby("tow_speed_nom").mean()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Seed the local reference "
+                                     "data store.")
+    parser.add_argument("--download", default=False, action="store_true",
+                        help="Download data sets not found locally")
+    parser.add_argument("--import-dir", nargs="+", default=[".", ".."],
+                        help="Directories to search for the data sets or "
+                        "checkouts of their repositories")
+    parser.add_argument("--force", "-f", default=False, action="store_true",
+                        help="Replace data sets already in the store")
+    args = parser.parse_args()
+
+    added = seed(search_dirs=args.import_dir, download=args.download,
+                 force=args.force)
+    for name in sorted(DATASETS):
+        status = "added" if name in added else (
+            "stored" if os.path.isfile(fpath(name)) else "missing")
+        print("{:14s} {:8s} {}".format(name, status, fpath(name)))
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+"""Stub CACTUS solver for measuring pipeline overhead.
+
+Reads a CACTUS input file and writes output files with the same names,
+columns, and sizes as CACTUS would, using a simple model of the RM2 power
+and drag curves instead of solving for the flow. Usage:
+
+    python scripts/stubcactus.py ./config/RM2.in
+"""
+
+from __future__ import division, print_function
+import os
+import re
+import sys
+import time
+import numpy as np
+
+R = 0.5375
+ft_per_m = 1/0.3048
+
+REVDATA_COLS = ["Rev", "Power Coeff. (-)", "Tip Power Coeff. (-)",
+                "Torque Coeff. (-)", "Fx Coeff. (-)", "Fy Coeff. (-)",
+                "Fz Coeff. (-)", "Power (kW)", "Torque (ft-lbs)"]
+TIMEDATA_COLS = ["Normalized Time (-)", "Theta (rad)", "Rev",
+                 "Torque Coeff. (-)", "Power Coeff. (-)", "Fx Coeff. (-)",
+                 "Fy Coeff. (-)", "Fz Coeff. (-)"]
+ELEMDATA_COLS = ["Normalized Time (-)", "Theta (rad)", "Blade", "Element",
+                 "Rev", "x/R (-)", "y/R (-)", "z/R (-)", "AOA25 (deg)",
+                 "AOA50 (deg)", "AOA75 (deg)", "AdotNorm (-)", "Re (-)",
+                 "Mach (-)", "Ur (-)", "CL (-)", "CD (-)", "CM25 (-)",
+                 "CLCirc (-)", "CN (-)", "CT (-)", "Fx (-)", "Fy (-)",
+                 "Fz (-)", "te (-)"]
+PROBE_COLS = ["Normalized Time (-)", "U/Uinf (-)", "V/Uinf (-)",
+              "W/Uinf (-)", "Ufs/Uinf (-)", "Vfs/Uinf (-)", "Wfs/Uinf (-)"]
+
+
+def read_inputs(fpath):
+    """Read CACTUS namelist input values into a dictionary with lowercase
+    keys.
+    """
+    inputs = {}
+    with open(fpath) as f:
+        for line in f:
+            line = line.split("!")[0]
+            m = re.match(r"\s*(\w+)\s*=\s*(.+)", line)
+            if m:
+                inputs[m.group(1).lower()] = m.group(2).strip().strip("'\"")
+    return inputs
+
+
+def read_geom_counts(fpath):
+    """Return the number of blades and elements per blade of a geometry
+    file.
+    """
+    nblade, nelem = 3, 16
+    with open(fpath) as f:
+        for line in f:
+            name, _, val = line.strip().partition(":")
+            if name == "NBlade":
+                nblade = int(val)
+            elif name == "NElem":
+                nelem = int(val)
+                break
+    return nblade, nelem
+
+
+def read_probes(fpath):
+    """Read probe coordinates from a probe specification file."""
+    with open(fpath) as f:
+        nprobes = int(f.readline())
+        return np.loadtxt(f, ndmin=2)[:nprobes]
+
+
+def model_coeffs(tsr, theta, nblade=3):
+    """Return power, drag, and lateral force coefficients from a simple model
+    of the RM2 performance curves with blade passage oscillations.
+    """
+    cp = 0.3 - 0.05*(tsr - 3)**2
+    cd = 0.8 + 0.05*(tsr - 3)
+    osc = np.cos(nblade*theta)
+    return cp*(1 + 0.8*osc), cd*(1 + 0.2*osc), 0.1*np.sin(nblade*theta)
+
+
+def write_csv(f, rows):
+    """Write rows of a 2-D array as CSV lines."""
+    np.savetxt(f, rows, delimiter=",", fmt="%.7e")
+
+
+def run(fpath):
+    t0 = time.time()
+    inputs = read_inputs(fpath)
+    tsr = float(inputs["ut"])
+    rpm = float(inputs["rpm"])
+    nti = int(inputs["nti"])
+    nr = int(inputs["nr"])
+    omega = rpm*2*np.pi/60
+    u_infty = omega*R/tsr
+    nblade, nelem = read_geom_counts(inputs["geomfilepath"])
+    elem_out = int(inputs.get("bladeelemoutflag", 0))
+    probe_out = int(inputs.get("probeflag", 0))
+    outdir = "output"
+    if not os.path.isdir(outdir):
+        os.makedirs(outdir)
+    with open(os.path.join(outdir, "RM2_Param.csv"), "w") as f:
+        f.write("TSR (-),U (ft/s),RPM,nti (-),nr (-),NBlade (-),NElem (-)\n")
+        f.write("{},{},{},{},{},{},{}\n".format(tsr, u_infty*ft_per_m, rpm,
+                                                nti, nr, nblade, nelem))
+    probe_files = []
+    if probe_out:
+        probes = read_probes(inputs["probespecpath"])
+        probe_dir = os.path.join(outdir, "probe")
+        if not os.path.isdir(probe_dir):
+            os.makedirs(probe_dir)
+        for n, coords in enumerate(probes):
+            f = open(os.path.join(probe_dir,
+                                  "probe_{:05d}.csv".format(n + 1)), "w")
+            f.write("x/R (-),y/R (-),z/R (-)\n")
+            f.write(",".join(str(c) for c in coords) + "\n")
+            f.write("Probe {} time series\n".format(n + 1))
+            f.write(",".join(PROBE_COLS) + "\n")
+            probe_files.append((f, coords))
+    f_rev = open(os.path.join(outdir, "RM2_RevData.csv"), "w")
+    f_time = open(os.path.join(outdir, "RM2_TimeData.csv"), "w")
+    f_rev.write(",".join(REVDATA_COLS) + "\n")
+    f_time.write(",".join(TIMEDATA_COLS) + "\n")
+    if elem_out:
+        f_elem = open(os.path.join(outdir, "RM2_ElementData.csv"), "w")
+        f_elem.write(",".join(ELEMDATA_COLS) + "\n")
+    blade = np.repeat(np.arange(1, nblade + 1), nelem)
+    elem = np.tile(np.arange(1, nelem + 1), nblade)
+    z_R = np.tile(np.linspace(-0.75, 0.75, nelem), nblade)
+    phase = 2*np.pi*(blade - 1)/nblade
+    for rev in range(1, nr + 1):
+        # Start-up transient decaying over the first revolutions
+        transient = 0.1/rev
+        theta = 2*np.pi*(rev - 1 + np.arange(1, nti + 1)/nti)
+        t = theta/(2*np.pi)*tsr
+        cp, cd, cy = model_coeffs(tsr, theta, nblade)
+        cp += transient
+        cd += transient
+        write_csv(f_time, np.column_stack([t, theta, np.full(nti, rev),
+                                           cp/tsr, cp, cd, cy, 0*cy]))
+        if elem_out:
+            th = theta[:, None] + phase
+            aoa = np.rad2deg(np.arctan2(np.sin(th), tsr + np.cos(th)))
+            cl = 2*np.pi*np.deg2rad(aoa)
+            ones = np.ones_like(th)
+            cols = [t[:, None]*ones, theta[:, None]*ones, blade*ones,
+                    elem*ones, rev*ones, np.sin(th), z_R*ones, np.cos(th),
+                    aoa, aoa, aoa, 0*th, 1.5e5*ones, 0*th, tsr*ones, cl,
+                    0.02 + 0.01*cl**2, 0*th, cl, cl*np.cos(th),
+                    cl*np.sin(th), cl*np.cos(th), cl*np.sin(th), 0*th,
+                    0*th]
+            write_csv(f_elem, np.column_stack([c.ravel() for c in cols]))
+        for f, coords in probe_files:
+            deficit = 0.5*np.exp(-coords[2]**2)*(1 - np.exp(-rev))
+            u = 1 - deficit + 0.05*np.sin(nblade*theta)
+            v = 0.02*np.cos(nblade*theta)
+            write_csv(f, np.column_stack([t, u, v, 0*v, 0*v + 1, 0*v,
+                                          0*v]))
+        cp_rev, cd_rev = cp.mean(), cd.mean()
+        power = cp_rev*0.5*1000*(2*R*0.807)*u_infty**3/1000
+        torque = power*1000/omega*0.737562
+        f_rev.write("{},{},{},{},{},{},{},{},{}\n".format(
+                    rev, cp_rev, cp_rev, cp_rev/tsr, cd_rev, cy.mean(), 0.0,
+                    power, torque))
+        f_rev.flush()
+        print("Revolution {} of {}: C_P = {:.4f}".format(rev, nr, cp_rev))
+    for f in [f_rev, f_time] + [p[0] for p in probe_files]:
+        f.close()
+    if elem_out:
+        f_elem.close()
+    print("Total elapsed time (s): {:.3f}".format(time.time() - t0))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("Usage: stubcactus.py [input file]")
+    run(sys.argv[1])
@@ -0,0 +1,34 @@
+"""Tests for the NumPy RM2 geometry against the output of `makegeom.m`."""
+
+import os
+import pytest
+from conftest import ROOT
+from scripts import makegeom
+
+REFERENCE = os.path.join(ROOT, makegeom.REFERENCE_FPATH)
+
+
+@pytest.mark.skipif(not os.path.isfile(REFERENCE),
+                    reason="Octave reference geometry not committed; create "
+                    "it with `python scripts/makegeom.py 20 "
+                    "--make-reference`")
+def test_matches_octave_reference():
+    assert makegeom.check_reference(REFERENCE) == []
+
+
+def test_compare_geom_finds_differences():
+    text = makegeom.rm2_geom_text(8)
+    ref = makegeom.parse_geom(text.splitlines())
+    assert makegeom.compare_geom(ref, ref) == []
+    changed = makegeom.parse_geom(
+        text.replace("FlipN: 1", "FlipN: 0", 1).splitlines())
+    assert makegeom.compare_geom(ref, changed) == ["Blade 1/FlipN"]
+    del changed["Blade 2/QCx"]
+    assert "Blade 2/QCx" in makegeom.compare_geom(ref, changed)
+
+
+def test_geom_text_format():
+    lines = makegeom.rm2_geom_text(8).splitlines()
+    assert lines[:3] == ["NBlade: 3", "NStrut: 3", "RotN: 0 1 0"]
+    assert "    FlipN: 1" in lines
+    assert "    NElem: 8" in lines
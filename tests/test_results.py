@@ -0,0 +1,89 @@
+"""Tests for logging sweep results to the results database."""
+
+import os
+import shutil
+import sys
+import pandas as pd
+import pytest
+import run
+from conftest import ROOT
+
+LEGACY = os.path.join(ROOT, "processed", "tsr_sweep_Jacobs.csv")
+
+# Case of the rerun at TSR 2.1, as logged by `log_perf`
+RERUN = {"tsr": 2.1, "cp": 0.05, "cd": 0.45, "u_infty": 1.0, "dsflag": 2,
+         "tp": 1.7, "nbelem": 16, "nti": 24, "nrevs": 8, "walls": 1,
+         "foildata": "Jacobs", "iwall": 0, "wall_ds_right": 0.5,
+         "wall_ds_top": 0.5, "wall_ds_left": 0.5, "wall_ds_bottom": 0.5}
+
+
+@pytest.fixture
+def sweep(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.mkdir("processed")
+    fpath = os.path.join("processed", "tsr_sweep_Jacobs.csv")
+    shutil.copy(LEGACY, fpath)
+    return fpath
+
+
+def test_rerun_replaces_imported_legacy_row(sweep):
+    nrows = len(pd.read_csv(sweep))
+    run.store_result(RERUN, sweep)
+    run.export_results(sweep, sort_by="tsr")
+    df = pd.read_csv(sweep)
+    assert len(df) == nrows
+    assert (df.tsr == 2.1).sum() == 1
+    assert (df.foildata == "Jacobs").all()
+    assert df[df.tsr == 2.1].cp.iloc[0] == RERUN["cp"]
+
+
+def test_rerun_replaces_legacy_row_imported_without_foildata(sweep):
+    nrows = len(pd.read_csv(sweep))
+    # Import the legacy rows as older versions did, with null foildata
+    con = run.results_db(sweep)
+    with con:
+        for row in pd.read_csv(sweep).to_dict("records"):
+            con.execute("INSERT INTO perf (sweep, {}) VALUES ({})".format(
+                        ", ".join(row), ", ".join("?"*(len(row) + 1))),
+                        ["tsr_sweep_Jacobs"] + list(row.values()))
+    con.close()
+    run.store_result(RERUN, sweep)
+    run.export_results(sweep, sort_by="tsr")
+    df = pd.read_csv(sweep)
+    assert len(df) == nrows
+    assert (df.tsr == 2.1).sum() == 1
+
+
+def test_legacy_rows_match_sweep_case(sweep):
+    nrows = len(pd.read_csv(sweep))
+    case = {k: v for k, v in RERUN.items() if k in run.CASE_COLS}
+    case.pop("tsr")
+    assert len(run.matching_rows(pd.read_csv(sweep), **case)) == nrows
+    run.store_result(RERUN, sweep)
+    run.export_results(sweep, sort_by="tsr")
+    assert len(run.matching_rows(pd.read_csv(sweep), **case)) == nrows
+
+
+def test_log_perf_ignores_partial_revdata_line(tmp_path, monkeypatch):
+    monkeypatch.chdir(ROOT)
+    case_dir = str(tmp_path / "case")
+    stub = [sys.executable, os.path.join(ROOT, "scripts", "stubcactus.py")]
+    run.run_cactus(tsr=3.1, nbelem=8, case_dir=case_dir, use_cache=False,
+                   solver=stub, walls=0, nti=16, nrevs=4, tp=1.7,
+                   foildata="Sheldahl", probes=0)
+    # As left by a run stopped while writing a revolution
+    with open(os.path.join(case_dir, "output", "RM2_RevData.csv"), "a") as f:
+        f.write("5,0.3")
+    fpath = str(tmp_path / "tsr_sweep.csv")
+    run.log_perf(fpath=fpath, case_dir=case_dir)
+    df = pd.read_csv(fpath)
+    assert df.nrevs.tolist() == [4]
+    assert 0.3 < df.cp.iloc[0] < 0.35
+
+
+def test_export_ignores_sort_by_missing_columns(sweep):
+    run.store_result(RERUN, sweep)
+    run.export_results(sweep, sort_by=["probes", "tsr", "nbelem"])
+    df = pd.read_csv(sweep)
+    assert "probes" not in df
+    assert df.tsr.is_monotonic_increasing
@@ -0,0 +1,16 @@
+"""Tests for timing stages of the run pipeline."""
+
+import subprocess
+import sys
+import run
+
+
+def test_timed_stage_includes_child_cpu_time():
+    stages = {}
+    with run.timed_stage(stages, "child"):
+        subprocess.check_call([sys.executable, "-c",
+                               "import time\n"
+                               "t0 = time.process_time()\n"
+                               "while time.process_time() - t0 < 0.3: pass"])
+    stage = stages["child"]
+    assert stage["user_time"] + stage["sys_time"] > 0.25